@@ -0,0 +1,366 @@
+"""Accumulate the results of a simulation hand by hand in constant memory."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Sequence
+import copy
+import math
+
+import numpy as np
+
+"""The edges of the true count bins. A true count is in bin `i` if `edges[i] <= true_count < edges[i + 1]`."""
+TRUE_COUNT_BINS: tuple[float, ...] = (-21, -1, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 21)
+
+
+def batch_means(totals: Sequence[float], counts: Sequence[float]) -> tuple[float, float]:
+    """
+    Estimate the mean per unit and its standard error from the totals of batches (e.g. the profit of chunks of shoes).
+
+    The batches can have different sizes, so the mean is the ratio of the sums, and its standard error is the one of a
+    ratio estimator.
+
+    :param totals: The total of every batch.
+    :param counts: The number of units in every batch.
+    :return: The mean per unit, and its standard error (NaN with fewer than 2 batches).
+    """
+    totals_array = np.asarray(totals, dtype=float)
+    counts_array = np.asarray(counts, dtype=float)
+    mean = float(totals_array.sum() / counts_array.sum())
+    batches = len(totals_array)
+    if batches < 2:
+        return mean, math.nan
+    residuals = totals_array - mean * counts_array
+    return mean, float(np.sqrt(np.sum(residuals ** 2) / (batches * (batches - 1))) / counts_array.mean())
+
+
+class RunningStats:
+    """The count, mean and variance of a stream of numbers, updated with Welford's algorithm."""
+
+    def __init__(self) -> None:
+        """Start with no numbers."""
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.  # The sum of the squared differences from the mean.
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> RunningStats:
+        """
+        Get the statistics of many numbers at once.
+
+        :param values: The numbers.
+        :return: Their statistics.
+        """
+        stats = cls()
+        stats.count = len(values)
+        if stats.count:
+            stats.mean = float(np.mean(values))
+            stats.m2 = float(np.sum((values - stats.mean) ** 2))
+        return stats
+
+    def add(self, value: float) -> None:
+        """
+        Add a number.
+
+        :param value: The number.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: RunningStats) -> None:
+        """
+        Add the numbers of another `RunningStats`.
+
+        :param other: The statistics to add.
+        """
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+    def std(self) -> float:
+        """
+        Get the standard deviation of the numbers, like `np.std`.
+
+        :return: The population standard deviation, or NaN if there are no numbers.
+        """
+        return math.sqrt(self.m2 / self.count) if self.count else math.nan
+
+
+class ResultAccumulator:
+    """
+    Accumulate the bets, rewards and true counts of every hand without storing them.
+
+    Accumulators of different parts of a simulation can be merged with `merge`, in the order the hands were played.
+    """
+
+    def __init__(self, chunk_size: int = 100, true_count_bins: Sequence[float] = TRUE_COUNT_BINS,
+                 max_curve_points: int = 10_000) -> None:
+        """
+        Start with no hands.
+
+        :param chunk_size: How many consecutive hands are summed to calculate the EV and standard deviation per chunk.
+        :param true_count_bins: The edges of the bins where the rewards are grouped by the true count at the start of
+            the hand, in increasing order. True counts outside the edges are not put in a bin.
+        :param max_curve_points: How many points of the profit curve to keep. When there are more, every other point
+            is dropped.
+        """
+        if len(true_count_bins) < 2 or any(low >= high for low, high in zip(true_count_bins, true_count_bins[1:])):
+            raise ValueError("The true count bins need at least 2 edges, in increasing order.")
+        self.chunk_size = chunk_size
+        self.true_count_bins = tuple(true_count_bins)
+        self.max_curve_points = max_curve_points
+
+        self.rewards = RunningStats()
+        self.total_bet = 0.
+        self.total_win = 0.
+        self.total_loss = 0.
+        self.wins = 0
+        self.losses = 0
+
+        self.chunk_sums = RunningStats()
+        self.chunk_sum = 0.  # The sum of the chunk that isn't full yet.
+        self.chunk_count = 0
+
+        self.profit = 0.
+        self.peak = -math.inf  # The highest profit after any hand.
+        self.peak_index = 0
+        self.trough = math.inf  # The lowest profit after any hand.
+        self.trough_index = 0
+        self.max_drawdown = 0.
+        self.drawdown_start = 0  # The hand where the profit peaked before the maximum drawdown.
+        self.drawdown_end = 0  # The hand at the bottom of the maximum drawdown.
+
+        self.bins = [RunningStats() for _ in range(len(self.true_count_bins) - 1)]
+        self.bin_bets = [0.] * len(self.bins)  # The total initial bet of the hands of every bin.
+
+        self.curve_stride = 1
+        self.curve_hands: list[int] = []
+        self.curve_profits: list[float] = []
+
+        self.rounds_sat_out = 0  # The rounds watched without playing (see `betting_strategies.SIT_OUT`).
+
+    @property
+    def hands(self) -> int:
+        """
+        Get the number of hands played.
+
+        :return: The number of hands.
+        """
+        return self.rewards.count
+
+    def add(self, bet: float, reward: float, true_count: float) -> None:
+        """
+        Add a hand.
+
+        :param bet: The initial bet.
+        :param reward: The profit/loss of the hand.
+        :param true_count: The true count at the start of the hand.
+        """
+        index = self.rewards.count
+        self.rewards.add(reward)
+        self.total_bet += bet
+        if reward > 0:
+            self.total_win += reward
+            self.wins += 1
+        elif reward < 0:
+            self.total_loss -= reward
+            self.losses += 1
+
+        self.chunk_sum += reward
+        self.chunk_count += 1
+        if self.chunk_count == self.chunk_size:
+            self.chunk_sums.add(self.chunk_sum)
+            self.chunk_sum = 0.
+            self.chunk_count = 0
+
+        self.profit += reward
+        if self.profit > self.peak:
+            self.peak = self.profit
+            self.peak_index = index
+        if self.profit < self.trough:
+            self.trough = self.profit
+            self.trough_index = index
+        if self.peak - self.profit > self.max_drawdown:
+            self.max_drawdown = self.peak - self.profit
+            self.drawdown_start = self.peak_index
+            self.drawdown_end = index
+
+        true_count_bin = bisect_right(self.true_count_bins, true_count) - 1
+        if 0 <= true_count_bin < len(self.bins):
+            self.bins[true_count_bin].add(reward)
+            self.bin_bets[true_count_bin] += bet
+
+        if (index + 1) % self.curve_stride == 0:
+            self.curve_hands.append(index + 1)
+            self.curve_profits.append(self.profit)
+            self._thin_curve()
+
+    def sit_out(self, rounds: int = 1) -> None:
+        """
+        Count rounds that were watched without playing. They aren't hands, so no other statistic changes.
+
+        :param rounds: The number of rounds.
+        """
+        self.rounds_sat_out += rounds
+
+    def add_arrays(self, bets: np.ndarray, rewards: np.ndarray, true_counts: np.ndarray) -> None:
+        """
+        Add many hands at once. Gives the same result as calling `add` for every hand.
+
+        :param bets: The initial bets.
+        :param rewards: The profit/loss of the hands.
+        :param true_counts: The true counts at the start of the hands.
+        """
+        if len(rewards) == 0:
+            return
+        start = self.rewards.count
+        self.rewards.merge(RunningStats.from_array(rewards))
+        self.total_bet += float(np.sum(bets))
+        self.total_win += float(np.sum(rewards[rewards > 0]))
+        self.total_loss -= float(np.sum(rewards[rewards < 0]))
+        self.wins += int(np.count_nonzero(rewards > 0))
+        self.losses += int(np.count_nonzero(rewards < 0))
+
+        # Fill the chunk that isn't full yet, then sum the full chunks and keep the rest for later.
+        first = min(self.chunk_size - self.chunk_count, len(rewards))
+        self.chunk_sum += float(np.sum(rewards[:first]))
+        self.chunk_count += first
+        if self.chunk_count == self.chunk_size:
+            self.chunk_sums.add(self.chunk_sum)
+            full = (len(rewards) - first) // self.chunk_size * self.chunk_size
+            self.chunk_sums.merge(RunningStats.from_array(
+                rewards[first:first + full].reshape(-1, self.chunk_size).sum(axis=1)))
+            self.chunk_sum = float(np.sum(rewards[first + full:]))
+            self.chunk_count = len(rewards) - first - full
+
+        profits = self.profit + np.cumsum(rewards)
+        running_peaks = np.maximum(np.maximum.accumulate(profits), self.peak)
+        drawdowns = running_peaks - profits
+        deepest = int(np.argmax(drawdowns))
+        if drawdowns[deepest] > self.max_drawdown:
+            self.max_drawdown = float(drawdowns[deepest])
+            highest = int(np.argmax(profits[:deepest + 1]))
+            self.drawdown_start = start + highest if profits[highest] > self.peak else self.peak_index
+            self.drawdown_end = start + deepest
+        highest = int(np.argmax(profits))
+        if profits[highest] > self.peak:
+            self.peak = float(profits[highest])
+            self.peak_index = start + highest
+        lowest = int(np.argmin(profits))
+        if profits[lowest] < self.trough:
+            self.trough = float(profits[lowest])
+            self.trough_index = start + lowest
+        self.profit = float(profits[-1])
+
+        true_count_bins = np.searchsorted(self.true_count_bins, true_counts, side="right") - 1
+        for true_count_bin, stats in enumerate(self.bins):
+            in_bin = true_count_bins == true_count_bin
+            stats.merge(RunningStats.from_array(rewards[in_bin]))
+            self.bin_bets[true_count_bin] += float(np.sum(bets[in_bin]))
+
+        self._add_curve(start, profits)
+
+    def merge(self, other: ResultAccumulator) -> None:
+        """
+        Add the hands of another accumulator, which were played after the hands of this one.
+
+        The chunk that isn't full yet is counted as a chunk of its own, so the chunks don't cross from one accumulator
+        to the other.
+
+        :param other: The accumulator to add. It must use the same true count bins and chunk size.
+        """
+        if self.true_count_bins != other.true_count_bins or self.chunk_size != other.chunk_size:
+            raise ValueError("Only accumulators with the same true count bins and chunk size can be merged.")
+        rounds_sat_out = self.rounds_sat_out + other.rounds_sat_out
+        if other.hands == 0:
+            self.rounds_sat_out = rounds_sat_out
+            return
+        if self.hands == 0:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            self.rounds_sat_out = rounds_sat_out
+            return
+        self.rounds_sat_out = rounds_sat_out
+        start = self.hands
+        self.rewards.merge(other.rewards)
+        self.total_bet += other.total_bet
+        self.total_win += other.total_win
+        self.total_loss += other.total_loss
+        self.wins += other.wins
+        self.losses += other.losses
+
+        if self.chunk_count:
+            self.chunk_sums.add(self.chunk_sum)
+        self.chunk_sums.merge(other.chunk_sums)
+        self.chunk_sum = other.chunk_sum
+        self.chunk_count = other.chunk_count
+
+        # The deepest drawdown is in this part, in the other part, or from our peak to the other part's trough.
+        if other.max_drawdown > self.max_drawdown:
+            self.max_drawdown = other.max_drawdown
+            self.drawdown_start = start + other.drawdown_start
+            self.drawdown_end = start + other.drawdown_end
+        crossing_drawdown = self.peak - (self.profit + other.trough)
+        if crossing_drawdown > self.max_drawdown or (crossing_drawdown == self.max_drawdown
+                                                     and start + other.trough_index < self.drawdown_end):
+            self.max_drawdown = crossing_drawdown
+            self.drawdown_start = self.peak_index
+            self.drawdown_end = start + other.trough_index
+        if self.profit + other.peak > self.peak:
+            self.peak = self.profit + other.peak
+            self.peak_index = start + other.peak_index
+        if self.profit + other.trough < self.trough:
+            self.trough = self.profit + other.trough
+            self.trough_index = start + other.trough_index
+
+        for stats, other_stats in zip(self.bins, other.bins):
+            stats.merge(other_stats)
+        self.bin_bets = [bet + other_bet for bet, other_bet in zip(self.bin_bets, other.bin_bets)]
+
+        self.curve_hands += [start + hand for hand in other.curve_hands]
+        self.curve_profits += [self.profit + profit for profit in other.curve_profits]
+        self.profit += other.profit
+        self._thin_curve()
+
+    def _add_curve(self, start: int, profits: np.ndarray) -> None:
+        """
+        Add the points of the profit curve after some new hands.
+
+        :param start: The number of hands before the new hands.
+        :param profits: The total profit after each new hand.
+        """
+        hands = np.arange(start + 1, start + len(profits) + 1)
+        sampled = hands % self.curve_stride == 0
+        self.curve_hands += hands[sampled].tolist()
+        self.curve_profits += profits[sampled].tolist()
+        self._thin_curve()
+
+    def _thin_curve(self) -> None:
+        """Drop every other point of the profit curve until it fits in `max_curve_points`."""
+        while len(self.curve_hands) > self.max_curve_points:
+            self.curve_hands = self.curve_hands[1::2]
+            self.curve_profits = self.curve_profits[1::2]
+            self.curve_stride *= 2
+
+    def drawdown_duration(self) -> int:
+        """
+        Get the number of hands from the peak before the maximum drawdown to its bottom (both included).
+
+        :return: The duration of the maximum drawdown.
+        """
+        return self.drawdown_end - self.drawdown_start + 1
+
+    def chunk_stats(self) -> RunningStats:
+        """
+        Get the statistics of the sums of the chunks, including the chunk that isn't full yet.
+
+        :return: The statistics of the chunk sums.
+        """
+        chunk_sums = copy.copy(self.chunk_sums)
+        if self.chunk_count:
+            chunk_sums.add(self.chunk_sum)
+        return chunk_sums
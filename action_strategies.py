@@ -1,7 +1,153 @@
 """Action strategies to be used in expected value."""
+from __future__ import annotations
+
 from best_move import perfect_mover_cache
 from utils import get_cards_seen, get_hilo_running_count
+from bisect import bisect_right
+from typing import Collection, Optional, Sequence
 import csv
+import math
+
+import numpy as np
+
+"""A strategy as read from a file: the actions of hard hands, soft hands and pairs, indexed by [total][dealer up card]."""
+StrategyTables = tuple[dict[int, dict[int, str]], dict[int, dict[int, str]], dict[int, dict[int, str]]]
+
+"""The actions of a compiled strategy, indexed by their code."""
+ACTIONS = "shdpu"
+
+"""The tables of a compiled strategy."""
+HARD, SOFT, PAIR = range(3)
+
+
+def read_strategy_file(filename: str) -> StrategyTables:
+    """
+    Read a file with a strategy.
+
+    :param filename: The file where the strategy is stored.
+    :return: The actions for hard hands (indexed by total), soft hands (indexed by total) and pairs (indexed by the
+        card), each indexed by the dealer's up card next.
+    """
+    no_ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
+    ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
+    split = {k: {d: "s" for d in range(2, 12)} for k in range(12)}
+    with open(filename, newline='') as csv_file:
+        reader = csv.reader(csv_file, delimiter=',')
+        for row in reader:
+            identifier = row[0]
+            hand_value = int(identifier[1:])
+            column = 1
+            if identifier.startswith("n"):
+                for dealer_up_card in range(2, 12):
+                    no_ace[hand_value][dealer_up_card] = row[column]
+                    column += 1
+            elif identifier.startswith("a"):
+                for dealer_up_card in range(2, 12):
+                    ace[hand_value][dealer_up_card] = row[column]
+                    column += 1
+            elif identifier.startswith("s"):
+                for dealer_up_card in range(2, 12):
+                    split[hand_value][dealer_up_card] = row[column]
+                    column += 1
+            else:
+                raise ValueError
+    return no_ace, ace, split
+
+
+def resolve_action(action: str, can_double: bool, can_surrender: bool) -> tuple[str, bool]:
+    """
+    Get the action to play from an entry of a strategy file.
+
+    :param action: The entry of the strategy file (e.g. "ius" is insure, then surrender or else stand).
+    :param can_double: Whether we can double.
+    :param can_surrender: Whether we can surrender.
+    :return: The action to do, and whether the entry says to take insurance.
+    """
+    insure = action[0] == "i"
+    if action[0] == "i":
+        action = action[1:]
+    if action[0] == "u" and not can_surrender:
+        action = action[1:]
+    if action[0] == "d" and not can_double:
+        action = action[1:]
+    return action[0], insure
+
+
+class CompiledStrategy:
+    """
+    Strategies compiled into arrays, so that every decision is a couple of array reads instead of parsing strings.
+
+    The true counts are split into buckets and every bucket has its own strategy. `actions` is indexed by
+    `[bucket, table (HARD, SOFT or PAIR), total (or the card for pairs), dealer up card, can_double + 2 * can_surrender]`
+    and holds the code of the action in `ACTIONS`, already resolved for when doubling or surrendering isn't possible.
+    `insurance` is indexed the same way without the last axis.
+    """
+
+    def __init__(self, strategies: Sequence[Optional[StrategyTables]], boundaries: Sequence[float] = ()) -> None:
+        """
+        Compile the strategies.
+
+        :param strategies: The strategy of every true count bucket, or None for the buckets that don't have one.
+        :param boundaries: The true counts where each bucket after the first starts, in ascending order. Bucket `i`
+            is used for `boundaries[i - 1] <= true_count < boundaries[i]`.
+        """
+        if len(strategies) != len(boundaries) + 1:
+            raise ValueError("There must be one strategy more than the boundaries.")
+        self.boundaries = list(boundaries)
+        self.available = [strategy is not None for strategy in strategies]
+        self.actions = np.zeros((len(strategies), 3, 22, 12, 4), dtype=np.int8)
+        self.insurance = np.zeros((len(strategies), 3, 22, 12), dtype=bool)
+        for bucket, strategy in enumerate(strategies):
+            if strategy is None:
+                continue
+            for table, rows in enumerate(strategy):
+                for total, row in rows.items():
+                    for dealer_up_card, action in row.items():
+                        for permissions in range(4):
+                            move, insure = resolve_action(action, bool(permissions & 1), bool(permissions & 2))
+                            if move not in ACTIONS:
+                                raise ValueError(f"{action!r} doesn't resolve to a valid action.")
+                            self.actions[bucket, table, total, dealer_up_card, permissions] = ACTIONS.index(move)
+                        self.insurance[bucket, table, total, dealer_up_card] = insure
+        # Flat lists are faster than NumPy to index one element at a time.
+        self._actions = self.actions.ravel().tolist()
+        self._insurance = self.insurance.ravel().tolist()
+
+    def bucket(self, true_count: float) -> int:
+        """
+        Get the bucket of a true count.
+
+        :param true_count: The true count.
+        :return: The index of the bucket.
+        """
+        bucket = bisect_right(self.boundaries, true_count)
+        if not self.available[bucket]:
+            raise IndexError(f"There is no file provided for a true count of {true_count}.")
+        return bucket
+
+    def get_move(self, bucket: int, hand_value: int, hand_has_ace: bool, dealer_up_card: int, can_double: bool,
+                 can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int]) -> tuple[str, bool]:
+        """
+        Get the move to play.
+
+        :param bucket: The true count bucket, from `bucket`.
+        :param hand_value: The value of the hand (e.g. 18).
+        :param hand_has_ace: Whether the hand has an ace that is counted as 11.
+        :param dealer_up_card: The dealer's up card.
+        :param can_double: Whether we can double.
+        :param can_split: Whether we can split.
+        :param can_surrender: Whether we can surrender.
+        :param can_insure: Whether we can take insurance.
+        :param hand_cards: The cards in our hand (e.g. 8, 7, 3).
+        :return: The action to do, and whether to take insurance.
+        """
+        if can_split:
+            index = ((bucket * 3 + PAIR) * 22 + hand_cards[0]) * 12 + dealer_up_card
+        elif hand_has_ace:
+            index = ((bucket * 3 + SOFT) * 22 + hand_value) * 12 + dealer_up_card
+        else:
+            index = ((bucket * 3 + HARD) * 22 + hand_value) * 12 + dealer_up_card
+        return ACTIONS[self._actions[index * 4 + can_double + 2 * can_surrender]], can_insure and self._insurance[index]
 
 
 class BaseMover:
@@ -9,7 +155,7 @@ class BaseMover:
 
     @staticmethod
     def get_move(hand_value: int, hand_has_ace: bool, dealer_up_card: int, can_double: bool, can_split: bool,
-                 can_surrender: bool, can_insure: bool, hand_cards: list[int], cards_seen: list[int], deck_number: int,
+                 can_surrender: bool, can_insure: bool, hand_cards: list[int], cards_seen: Collection[int], deck_number: int,
                  dealer_peeks_for_blackjack: bool, das: bool, dealer_stands_soft_17: bool) -> tuple[str, bool]:
         """
         Raise `NotImplementedError`. To be overwritten in the other classes.
@@ -22,7 +168,8 @@ class BaseMover:
         :param can_surrender: Whether we can surrender.
         :param can_insure: Whether we can take insurance.
         :param hand_cards: The cards in our hand (e.g. 8, 7, 3).
-        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting. During a simulation
+            this is a `utils.ShoeState`, which keeps the running count without rescanning the cards.
         :param deck_number: The number of decks in the starting shoe.
         :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
         :param das: Whether we can double after splitting.
@@ -37,7 +184,7 @@ class SimpleMover(BaseMover):
 
     @staticmethod
     def get_move(hand_value: int, hand_has_ace: bool, dealer_up_card: int, can_double: bool, can_split: bool,
-                 can_surrender: bool, can_insure: bool, hand_cards: list[int], cards_seen: list[int], deck_number: int,
+                 can_surrender: bool, can_insure: bool, hand_cards: list[int], cards_seen: Collection[int], deck_number: int,
                  dealer_peeks_for_blackjack: bool, das: bool, dealer_stands_soft_17: bool) -> tuple[str, bool]:
         """
         Hit (value <= 16) or stand (value >= 17). Never take insurance.
@@ -72,37 +219,19 @@ class BasicStrategyMover(BaseMover):
         :param filename: The file where the basic strategy is stored.
         """
         self.filename = filename
-        self.no_ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
-        self.ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
-        self.split = {k: {d: "s" for d in range(2, 12)} for k in range(12)}
+        self.no_ace: dict[int, dict[int, str]] = {}
+        self.ace: dict[int, dict[int, str]] = {}
+        self.split: dict[int, dict[int, str]] = {}
         self.read_file()
+        self.compiled = CompiledStrategy([(self.no_ace, self.ace, self.split)])
 
     def read_file(self) -> None:
         """Read the file with the basic strategy."""
-        with open(self.filename, newline='') as csv_file:
-            reader = csv.reader(csv_file, delimiter=',')
-            for row in reader:
-                identifier = row[0]
-                hand_value = int(identifier[1:])
-                column = 1
-                if identifier.startswith("n"):
-                    for dealer_up_card in range(2, 12):
-                        self.no_ace[hand_value][dealer_up_card] = row[column]
-                        column += 1
-                elif identifier.startswith("a"):
-                    for dealer_up_card in range(2, 12):
-                        self.ace[hand_value][dealer_up_card] = row[column]
-                        column += 1
-                elif identifier.startswith("s"):
-                    for dealer_up_card in range(2, 12):
-                        self.split[hand_value][dealer_up_card] = row[column]
-                        column += 1
-                else:
-                    raise ValueError
+        self.no_ace, self.ace, self.split = read_strategy_file(self.filename)
 
     def get_move(self, hand_value: int, hand_has_ace: bool, dealer_up_card: int,  # type: ignore[override]
                  can_double: bool, can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int],
-                 cards_seen: list[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
+                 cards_seen: Collection[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
                  dealer_stands_soft_17: bool) -> tuple[str, bool]:
         """
         Get the move to play from basic strategy.
@@ -122,30 +251,16 @@ class BasicStrategyMover(BaseMover):
         :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
         :return: The action to do, and whether to take insurance.
         """
-        insure = False
-        if can_split:
-            card = hand_cards[0]
-            action = self.split[card][dealer_up_card]
-        elif hand_has_ace:
-            action = self.ace[hand_value][dealer_up_card]
-        else:
-            action = self.no_ace[hand_value][dealer_up_card]
-        if can_insure and action[0] == "i":
-            insure = True
-
-        if action[0] == "i":
-            action = action[1:]
-        if action[0] == "u" and not can_surrender:
-            action = action[1:]
-        if action[0] == "d" and not can_double:
-            action = action[1:]
-
-        return action[0], insure
+        return self.compiled.get_move(0, hand_value, hand_has_ace, dealer_up_card, can_double, can_split, can_surrender,
+                                      can_insure, hand_cards)
 
 
 class BasicStrategyDeviationsMover(BaseMover):
     """Move according to the basic strategy with the most common deviations."""
 
+    """The true counts where a deviation starts or stops being played."""
+    DEVIATION_TRUE_COUNTS = (-2, -1, 0, 1, 2, 3, 4, 5)
+
     def __init__(self, filename: str) -> None:
         """
         Get the move to play for each hand-dealer combination.
@@ -153,68 +268,31 @@ class BasicStrategyDeviationsMover(BaseMover):
         :param filename: The file where the basic strategy is stored.
         """
         self.filename = filename
-        self.no_ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
-        self.ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
-        self.split = {k: {d: "s" for d in range(2, 12)} for k in range(12)}
+        self.no_ace: dict[int, dict[int, str]] = {}
+        self.ace: dict[int, dict[int, str]] = {}
+        self.split: dict[int, dict[int, str]] = {}
         self.read_file()
+        self.compiled = self.compile()
 
     def read_file(self) -> None:
         """Read the file with the basic strategy with the most common deviations."""
-        with open(self.filename, newline='') as csv_file:
-            reader = csv.reader(csv_file, delimiter=',')
-            for row in reader:
-                identifier = row[0]
-                hand_value = int(identifier[1:])
-                column = 1
-                if identifier.startswith("n"):
-                    for dealer_up_card in range(2, 12):
-                        self.no_ace[hand_value][dealer_up_card] = row[column]
-                        column += 1
-                elif identifier.startswith("a"):
-                    for dealer_up_card in range(2, 12):
-                        self.ace[hand_value][dealer_up_card] = row[column]
-                        column += 1
-                elif identifier.startswith("s"):
-                    for dealer_up_card in range(2, 12):
-                        self.split[hand_value][dealer_up_card] = row[column]
-                        column += 1
-                else:
-                    raise ValueError
+        self.no_ace, self.ace, self.split = read_strategy_file(self.filename)
 
-    def get_move(self, hand_value: int, hand_has_ace: bool, dealer_up_card: int,  # type: ignore[override]
-                 can_double: bool, can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int],
-                 cards_seen: list[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
-                 dealer_stands_soft_17: bool) -> tuple[str, bool]:
+    @staticmethod
+    def deviate(action: str, hand_value: int, hand_has_ace: bool, dealer_up_card: int, hand_cards: list[int],
+                can_split: bool, true_count: float) -> str:
         """
-        Get the move to play from basic strategy.
+        Apply the deviations to an entry of the basic strategy.
 
+        :param action: The entry of the basic strategy.
         :param hand_value: The value of the hand (e.g. 18).
         :param hand_has_ace: Whether the hand has an ace that is counted as 11.
         :param dealer_up_card: The dealer's up card.
-        :param can_double: Whether we can double.
-        :param can_split: Whether we can split.
-        :param can_surrender: Whether we can surrender.
-        :param can_insure: Whether we can take insurance.
         :param hand_cards: The cards in our hand (e.g. 8, 7, 3).
-        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
-        :param deck_number: The number of decks in the starting shoe.
-        :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
-        :param das: Whether we can double after splitting.
-        :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
-        :return: The action to do, and whether to take insurance.
+        :param can_split: Whether we can split.
+        :param true_count: The true count.
+        :return: The entry to play at this true count.
         """
-        true_count = get_hilo_running_count(cards_seen) / (deck_number - (len(cards_seen) + 1) / 52)
-        insure = False
-        if can_split:
-            card = hand_cards[0]
-            action = self.split[card][dealer_up_card]
-        elif hand_has_ace:
-            action = self.ace[hand_value][dealer_up_card]
-        else:
-            action = self.no_ace[hand_value][dealer_up_card]
-        if can_insure and action[0] == "i":
-            insure = True
-
         if hand_has_ace is False:
             if hand_value == 12 and dealer_up_card == 2 and true_count >= 3:
                 action = "s"
@@ -258,15 +336,60 @@ class BasicStrategyDeviationsMover(BaseMover):
                 action = "u" + action
         if true_count >= 3:
             action = "i" + action
+        return action
+
+    def compile(self) -> CompiledStrategy:
+        """
+        Compile the basic strategy with the deviations of every true count bucket.
 
-        if action[0] == "i":
-            action = action[1:]
-        if action[0] == "u" and not can_surrender:
-            action = action[1:]
-        if action[0] == "d" and not can_double:
-            action = action[1:]
+        Every deviation starts at one of `DEVIATION_TRUE_COUNTS`, so the strategy is the same in each bucket.
 
-        return action[0], insure
+        :return: The compiled strategy.
+        """
+        strategies: list[Optional[StrategyTables]] = []
+        for bucket in range(len(self.DEVIATION_TRUE_COUNTS) + 1):
+            true_count = self.DEVIATION_TRUE_COUNTS[bucket - 1] if bucket else self.DEVIATION_TRUE_COUNTS[0] - 1
+            no_ace = {total: {dealer_up_card: self.deviate(action, total, False, dealer_up_card, [], False, true_count)
+                              for dealer_up_card, action in row.items()} for total, row in self.no_ace.items()}
+            ace = {total: {dealer_up_card: self.deviate(action, total, True, dealer_up_card, [], False, true_count)
+                           for dealer_up_card, action in row.items()} for total, row in self.ace.items()}
+            split = {card: {dealer_up_card: self.deviate(action, 12 if card == 11 else 2 * card, card == 11,
+                                                         dealer_up_card, [card, card], True, true_count)
+                            for dealer_up_card, action in row.items()} for card, row in self.split.items()}
+            # Whether to take insurance comes from the basic strategy. The "i" added by `deviate` is only a reminder.
+            for deviated, table in ((no_ace, self.no_ace), (ace, self.ace), (split, self.split)):
+                for total, row in deviated.items():
+                    for dealer_up_card, action in row.items():
+                        action = action.lstrip("i")
+                        row[dealer_up_card] = "i" + action if table[total][dealer_up_card][0] == "i" else action
+            strategies.append((no_ace, ace, split))
+        return CompiledStrategy(strategies, self.DEVIATION_TRUE_COUNTS)
+
+    def get_move(self, hand_value: int, hand_has_ace: bool, dealer_up_card: int,  # type: ignore[override]
+                 can_double: bool, can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int],
+                 cards_seen: Collection[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
+                 dealer_stands_soft_17: bool) -> tuple[str, bool]:
+        """
+        Get the move to play from basic strategy.
+
+        :param hand_value: The value of the hand (e.g. 18).
+        :param hand_has_ace: Whether the hand has an ace that is counted as 11.
+        :param dealer_up_card: The dealer's up card.
+        :param can_double: Whether we can double.
+        :param can_split: Whether we can split.
+        :param can_surrender: Whether we can surrender.
+        :param can_insure: Whether we can take insurance.
+        :param hand_cards: The cards in our hand (e.g. 8, 7, 3).
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param deck_number: The number of decks in the starting shoe.
+        :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+        :param das: Whether we can double after splitting.
+        :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+        :return: The action to do, and whether to take insurance.
+        """
+        true_count = get_hilo_running_count(cards_seen) / (deck_number - (len(cards_seen) + 1) / 52)
+        return self.compiled.get_move(self.compiled.bucket(true_count), hand_value, hand_has_ace, dealer_up_card,
+                                      can_double, can_split, can_surrender, can_insure, hand_cards)
 
 
 class CardCountMover(BaseMover):
@@ -293,40 +416,38 @@ class CardCountMover(BaseMover):
         self.ace: dict[tuple[float, float], dict[int, dict[int, str]]] = {}
         self.split: dict[tuple[float, float], dict[int, dict[int, str]]] = {}
         self.read_files()
+        self.compiled = self.compile()
 
     def read_files(self) -> None:
         """Read the files with the basic strategy and deviations."""
         for min_tc_max_tc in self.filenames:
-            no_ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
-            ace = {k: {d: "s" for d in range(2, 12)} for k in range(22)}
-            split = {k: {d: "s" for d in range(2, 12)} for k in range(12)}
-            with open(self.filenames[min_tc_max_tc], newline='') as csv_file:
-                reader = csv.reader(csv_file, delimiter=',')
-                for row in reader:
-                    identifier = row[0]
-                    hand_value = int(identifier[1:])
-                    column = 1
-                    if identifier.startswith("n"):
-                        for dealer_up_card in range(2, 12):
-                            no_ace[hand_value][dealer_up_card] = row[column]
-                            column += 1
-                    elif identifier.startswith("a"):
-                        for dealer_up_card in range(2, 12):
-                            ace[hand_value][dealer_up_card] = row[column]
-                            column += 1
-                    elif identifier.startswith("s"):
-                        for dealer_up_card in range(2, 12):
-                            split[hand_value][dealer_up_card] = row[column]
-                            column += 1
-                    else:
-                        raise ValueError
+            no_ace, ace, split = read_strategy_file(self.filenames[min_tc_max_tc])
             self.no_ace[min_tc_max_tc] = no_ace
             self.ace[min_tc_max_tc] = ace
             self.split[min_tc_max_tc] = split
 
+    def compile(self) -> CompiledStrategy:
+        """
+        Compile the strategies, with a bucket between every two consecutive ends of the true count ranges.
+
+        :return: The compiled strategy.
+        """
+        boundaries = sorted({end for min_tc_max_tc in self.filenames for end in min_tc_max_tc})
+        strategies: list[Optional[StrategyTables]] = []
+        for bucket in range(len(boundaries) + 1):
+            true_count = boundaries[bucket - 1] if bucket else -math.inf
+            for min_tc, max_tc in self.filenames:
+                if min_tc <= true_count < max_tc:
+                    tc_range = (min_tc, max_tc)
+                    strategies.append((self.no_ace[tc_range], self.ace[tc_range], self.split[tc_range]))
+                    break
+            else:
+                strategies.append(None)
+        return CompiledStrategy(strategies, boundaries)
+
     def get_move(self, hand_value: int, hand_has_ace: bool, dealer_up_card: int,  # type: ignore[override]
                  can_double: bool, can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int],
-                 cards_seen: list[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
+                 cards_seen: Collection[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
                  dealer_stands_soft_17: bool) -> tuple[str, bool]:
         """
         Get the move to play.
@@ -347,35 +468,8 @@ class CardCountMover(BaseMover):
         :return: The action to do, and whether to take insurance.
         """
         true_count = get_hilo_running_count(cards_seen) / (deck_number - (len(cards_seen) + 1) / 52)
-
-        for min_tc, max_tc in self.filenames:
-            if min_tc <= true_count < max_tc:
-                split = self.split[(min_tc, max_tc)]
-                ace = self.ace[(min_tc, max_tc)]
-                no_ace = self.no_ace[(min_tc, max_tc)]
-                break
-        else:
-            raise IndexError(f"There is no file provided for a true count of {true_count}.")
-
-        insure = False
-        if can_split:
-            card = hand_cards[0]
-            action = split[card][dealer_up_card]
-        elif hand_has_ace:
-            action = ace[hand_value][dealer_up_card]
-        else:
-            action = no_ace[hand_value][dealer_up_card]
-        if can_insure and action[0] == "i":
-            insure = True
-
-        if action[0] == "i":
-            action = action[1:]
-        if action[0] == "u" and not can_surrender:
-            action = action[1:]
-        if action[0] == "d" and not can_double:
-            action = action[1:]
-
-        return action[0], insure
+        return self.compiled.get_move(self.compiled.bucket(true_count), hand_value, hand_has_ace, dealer_up_card,
+                                      can_double, can_split, can_surrender, can_insure, hand_cards)
 
 
 class PerfectMover(BaseMover):
@@ -383,7 +477,7 @@ class PerfectMover(BaseMover):
 
     @staticmethod
     def get_move(hand_value: int, hand_has_ace: bool, dealer_up_card: int, can_double: bool, can_split: bool,
-                 can_surrender: bool, can_insure: bool, hand_cards: list[int], cards_seen: list[int], deck_number: int,
+                 can_surrender: bool, can_insure: bool, hand_cards: list[int], cards_seen: Collection[int], deck_number: int,
                  dealer_peeks_for_blackjack: bool, das: bool, dealer_stands_soft_17: bool) -> tuple[str, bool]:
         """
         Get the best move to play by taking into account every available information. Uses the best move analysis.
@@ -0,0 +1,233 @@
+"""Simulate many bankroll paths at once from the results of a simulation, for the risk of ruin and the trip outcomes."""
+from __future__ import annotations
+
+from typing import Any, Callable, Sequence
+import argparse
+
+import numpy as np
+
+from accumulators import RunningStats
+from hand_records import read_hand_records
+
+"""How a trip ends: the bankroll is lost, the stop-loss or the win goal is reached, or all the hands are played."""
+RUIN, STOP_LOSS, WIN_GOAL, END = 0, 1, 2, 3
+
+"""How many results are sampled at once, at most. Every path of a batch keeps its bankroll after every hand."""
+MAX_BATCH_RESULTS = 4_000_000
+
+"""The quantiles of the trip results and of the hands to double that are reported."""
+QUANTILES = (.01, .05, .25, .5, .75, .95, .99)
+
+
+def outcomes_from_records(records: np.ndarray, bets: np.ndarray | None = None,
+                          chunk_size: int = 10_000_000) -> np.ndarray:
+    """
+    Get the profit of every recorded hand, reading the records a chunk at a time.
+
+    :param records: The hand records, e.g. from `hand_records.read_hand_records`.
+    :param bets: If given, the bet of every hand instead of the recorded one, e.g. from `bet_ramps.bets_from_records`
+        to follow the bankroll of another better. A bet of `betting_strategies.SIT_OUT` gives a round with no result.
+    :param chunk_size: How many records are read at a time.
+    :return: The profit of every hand, in units.
+    """
+    outcomes = np.empty(len(records), dtype=np.float32)
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        chunk_bets = chunk["bet"] if bets is None else bets[start:start + chunk_size]
+        outcomes[start:start + len(chunk)] = chunk_bets * chunk["result"]
+    return outcomes
+
+
+def play_paths(increments: np.ndarray, units: float, stop_loss: float | None = None,
+               win_goal: float | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Follow bankroll paths hand by hand, all at once.
+
+    A path stops at the first hand where the bankroll is lost (at most 0), the loss reaches the stop-loss or the win
+    reaches the win goal, in this order of priority, or after the last hand.
+
+    :param increments: The profit of every hand of every path, one path per row.
+    :param units: The starting bankroll.
+    :param stop_loss: If given, stop a trip once this much is lost.
+    :param win_goal: If given, stop a trip once this much is won.
+    :return: For every path: the result of the trip, the hands played, how it ended (`RUIN`, `STOP_LOSS`, `WIN_GOAL`
+        or `END`), and the hands it took to double the bankroll before the trip ended, or -1.
+    """
+    paths, hands = increments.shape
+    bankrolls = units + np.cumsum(increments, axis=1, dtype=float)
+
+    def first_hand(hit: np.ndarray) -> np.ndarray:
+        """Get the index of the first hand where the condition holds on every path, or `hands` if it never does."""
+        first: np.ndarray = np.where(hit.any(axis=1), hit.argmax(axis=1), hands)
+        return first
+
+    never = np.full(paths, hands)
+    ruined = first_hand(bankrolls <= 0)
+    stopped = first_hand(bankrolls <= units - stop_loss) if stop_loss is not None else never
+    reached = first_hand(bankrolls >= units + win_goal) if win_goal is not None else never
+    doubled = first_hand(bankrolls >= 2 * units)
+    ends = np.minimum(np.minimum(ruined, stopped), reached)
+    played = np.minimum(ends + 1, hands)
+    results = bankrolls[np.arange(paths), played - 1] - units
+    endings = np.select([(ruined == ends) & (ends < hands), (stopped == ends) & (ends < hands), ends < hands],
+                        [RUIN, STOP_LOSS, WIN_GOAL], END)
+    hands_to_double = np.where((doubled < hands) & (doubled <= ends), doubled + 1, -1)
+    return results, played, endings, hands_to_double
+
+
+def _simulate(sample: Callable[[np.random.Generator, int], np.ndarray], units: float, hands: int, paths: int,
+              stop_loss: float | None, win_goal: float | None, seed: int | None) -> dict[str, Any]:
+    """
+    Play the paths in batches that fit in `MAX_BATCH_RESULTS`, and summarize them.
+
+    :param sample: Get the profit of every hand of a number of paths.
+    :param units: The starting bankroll.
+    :param hands: How many hands every path plays at most.
+    :param paths: How many paths to play.
+    :param stop_loss: If given, stop a trip once this much is lost.
+    :param win_goal: If given, stop a trip once this much is won.
+    :param seed: The seed of the paths. If None, a random seed is used.
+    :return: The summary of the paths (see `summarize_paths`).
+    """
+    rng = np.random.default_rng(seed)
+    batch = max(1, MAX_BATCH_RESULTS // hands)
+    parts = [play_paths(sample(rng, min(batch, paths - start)), units, stop_loss, win_goal)
+             for start in range(0, paths, batch)]
+    return summarize_paths(*(np.concatenate(arrays) for arrays in zip(*parts)))
+
+
+def simulate_bankroll(outcomes: np.ndarray, units: float, hands: int, paths: int = 10_000,
+                      stop_loss: float | None = None, win_goal: float | None = None, block_size: int = 1,
+                      seed: int | None = None) -> dict[str, Any]:
+    """
+    Simulate bankroll paths by resampling the results of recorded hands.
+
+    :param outcomes: The profit of every hand of a simulation, e.g. from `outcomes_from_records`.
+    :param units: The starting bankroll, in the same units as the outcomes.
+    :param hands: How many hands every path plays at most (a trip).
+    :param paths: How many paths to play.
+    :param stop_loss: If given, stop a trip once this much is lost.
+    :param win_goal: If given, stop a trip once this much is won.
+    :param block_size: How many consecutive hands are resampled together. The hands of a shoe depend on each other
+        through the count, so blocks of about the hands of a shoe keep the streaks that single hands lose.
+    :param seed: The seed of the paths. If None, a random seed is used.
+    :return: The summary of the paths (see `summarize_paths`).
+    """
+    outcomes = np.asarray(outcomes)
+    if len(outcomes) < block_size:
+        raise ValueError("There are fewer outcomes than the hands of a block.")
+    blocks = -(-hands // block_size)
+
+    def sample(rng: np.random.Generator, number: int) -> np.ndarray:
+        """Resample blocks of consecutive outcomes for every path."""
+        starts = rng.integers(0, len(outcomes) - block_size + 1, (number, blocks))
+        indices = (starts[:, :, None] + np.arange(block_size)).reshape(number, -1)[:, :hands]
+        sampled: np.ndarray = outcomes[indices]
+        return sampled
+
+    return _simulate(sample, units, hands, paths, stop_loss, win_goal, seed)
+
+
+def simulate_bankroll_by_true_count(stats: Sequence[RunningStats], units: float, hands: int, paths: int = 10_000,
+                                    stop_loss: float | None = None, win_goal: float | None = None,
+                                    seed: int | None = None) -> dict[str, Any]:
+    """
+    Simulate bankroll paths from the distribution of the results of every true count bin.
+
+    The true count bin of every hand is drawn with the frequency of the bin, and its result from a normal distribution
+    with the mean and the variance of the bin, which only needs the statistics kept during the simulation.
+
+    :param stats: The statistics of the profit of the hands of every bin, e.g. the `bins` of a `ResultAccumulator`.
+    :param units: The starting bankroll, in the same units as the profits.
+    :param hands: How many hands every path plays at most (a trip).
+    :param paths: How many paths to play.
+    :param stop_loss: If given, stop a trip once this much is lost.
+    :param win_goal: If given, stop a trip once this much is won.
+    :param seed: The seed of the paths. If None, a random seed is used.
+    :return: The summary of the paths (see `summarize_paths`).
+    """
+    counts = np.array([bin_stats.count for bin_stats in stats], dtype=float)
+    if counts.sum() == 0:
+        raise ValueError("The true count bins have no hands.")
+    means = np.array([bin_stats.mean for bin_stats in stats])
+    stds = np.array([np.sqrt(bin_stats.m2 / bin_stats.count) if bin_stats.count else 0. for bin_stats in stats])
+
+    cumulative = np.cumsum(counts) / counts.sum()
+
+    def sample(rng: np.random.Generator, number: int) -> np.ndarray:
+        """Draw the bin and the result of every hand of every path."""
+        bins = np.minimum(np.searchsorted(cumulative, rng.random((number, hands)), side="right"), len(counts) - 1)
+        return means[bins] + stds[bins] * rng.standard_normal((number, hands))
+
+    return _simulate(sample, units, hands, paths, stop_loss, win_goal, seed)
+
+
+def summarize_paths(results: np.ndarray, played: np.ndarray, endings: np.ndarray,
+                    hands_to_double: np.ndarray) -> dict[str, Any]:
+    """
+    Summarize the trips of many bankroll paths.
+
+    :param results: The result of every trip.
+    :param played: The hands played in every trip.
+    :param endings: How every trip ended (`RUIN`, `STOP_LOSS`, `WIN_GOAL` or `END`).
+    :param hands_to_double: The hands every path took to double the bankroll, or -1.
+    :return: The paths, the share of the trips that lost the bankroll (`risk_of_ruin`), hit the stop-loss
+        (`stop_loss_rate`) or the win goal (`win_goal_rate`), the mean result and hands of a trip, the `QUANTILES` of
+        the results (`result_quantiles`), the share of the paths that doubled the bankroll (`double_rate`), the
+        quantiles of the hands they took (`hands_to_double_quantiles`, NaN if none did), and the results and the hands
+        to double themselves (`results`, `hands_to_double`), e.g. to plot them.
+    """
+    doubled = hands_to_double[hands_to_double >= 0]
+    return {"paths": len(results),
+            "risk_of_ruin": float(np.mean(endings == RUIN)),
+            "stop_loss_rate": float(np.mean(endings == STOP_LOSS)),
+            "win_goal_rate": float(np.mean(endings == WIN_GOAL)),
+            "mean_result": float(np.mean(results)),
+            "mean_hands": float(np.mean(played)),
+            "result_quantiles": dict(zip(QUANTILES, np.quantile(results, QUANTILES).tolist())),
+            "double_rate": len(doubled) / len(results),
+            "hands_to_double_quantiles": dict(zip(QUANTILES, np.quantile(doubled, QUANTILES).tolist()
+                                                  if len(doubled) else [np.nan] * len(QUANTILES))),
+            "results": results,
+            "hands_to_double": doubled}
+
+
+def format_bankroll(summary: dict[str, Any]) -> str:
+    """
+    Describe the summary of bankroll paths.
+
+    :param summary: The summary, from `summarize_paths`.
+    :return: A few lines with the rates, the quantiles of the results and of the hands to double.
+    """
+    lines = [f"paths: {summary['paths']}, risk of ruin: {summary['risk_of_ruin']:.4f}, "
+             f"stop-loss: {summary['stop_loss_rate']:.4f}, win goal: {summary['win_goal_rate']:.4f}, "
+             f"doubled: {summary['double_rate']:.4f}",
+             f"mean result: {summary['mean_result']:.3f} in {summary['mean_hands']:.1f} hands",
+             "result quantiles: " + ", ".join(f"{100 * quantile:g}%: {value:.2f}"
+                                              for quantile, value in summary["result_quantiles"].items()),
+             "hands to double quantiles: " + ", ".join(f"{100 * quantile:g}%: {value:.0f}"
+                                                       for quantile, value in
+                                                       summary["hands_to_double_quantiles"].items())]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='Bankroll simulation',
+                                     description='Simulate bankroll paths from the hand records of a simulation '
+                                                 '(`python expected_value.py --records FILE`).')
+    parser.add_argument("records", help='The hand records file.')
+    parser.add_argument("--units", default=200, type=float, help='The starting bankroll, in units. (default: 200)')
+    parser.add_argument("--hands", default=1000, type=int, help='How many hands a trip plays. (default: 1000)')
+    parser.add_argument("--paths", default=10_000, type=int, help='How many paths to simulate. (default: 10,000)')
+    parser.add_argument("--stop-loss", default=None, type=float,
+                        help='Stop a trip once this many units are lost. (default: none)')
+    parser.add_argument("--win-goal", default=None, type=float,
+                        help='Stop a trip once this many units are won. (default: none)')
+    parser.add_argument("--block-size", default=1, type=int,
+                        help='How many consecutive hands are resampled together, e.g. the hands of a shoe. '
+                             '(default: 1)')
+    parser.add_argument("--seed", default=None, type=int, help='The seed of the paths. (default: random)')
+    args = parser.parse_args()
+    print(format_bankroll(simulate_bankroll(outcomes_from_records(read_hand_records(args.records)), args.units,
+                                            args.hands, args.paths, args.stop_loss, args.win_goal, args.block_size,
+                                            args.seed)))
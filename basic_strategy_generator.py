@@ -1,5 +1,6 @@
 """Generate basic strategy and plot it in graphs."""
 from best_move import perfect_mover_cache
+import hand_state
 from shoe_generators import hilo_generator
 from utils import DECK
 from utils import list_range_str
@@ -23,6 +24,7 @@ class Hand:
         :param cards: The cards the hand started with.
         """
         self.cards = list(cards)
+        self.state = hand_state.from_cards(self.cards)
 
     def add_card(self, card: int) -> None:
         """
@@ -31,6 +33,7 @@ class Hand:
         :param card: The new card to add for the hand (an ace is symbolised as 11).
         """
         self.cards.append(card)
+        self.state = hand_state.add_card(self.state, card)
 
     def value(self) -> int:
         """
@@ -38,16 +41,7 @@ class Hand:
 
         :return: The hand's value.
         """
-        aces = 0
-        score = 0
-        for card in self.cards:
-            if card == 11:
-                aces += 1
-            score += card
-        while score > 21 and aces > 0:
-            aces -= 1
-            score -= 10
-        return score
+        return hand_state.hand_value(self.state)
 
     def value_aces(self) -> tuple[int, int]:
         """
@@ -55,16 +49,7 @@ class Hand:
 
         :return: The hand's value and how many aces are counted as 11 (0 or 1).
         """
-        aces = 0
-        score = 0
-        for card in self.cards:
-            if card == 11:
-                aces += 1
-            score += card
-        while score > 21 and aces > 0:
-            aces -= 1
-            score -= 10
-        return score, aces
+        return hand_state.hand_value(self.state), int(hand_state.is_soft(self.state))
 
 
 def argmax(*profits: float) -> tuple[float, str]:
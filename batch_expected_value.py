@@ -0,0 +1,484 @@
+"""Estimate the expected value of a table-driven strategy by playing thousands of shoes at once with NumPy."""
+from __future__ import annotations
+
+import numpy as np
+
+import action_strategies
+import betting_strategies
+import hand_records
+from accumulators import ResultAccumulator
+from hand_records import HandRecordWriter
+from other_players import basic_strategy, check_other_players
+from action_strategies import CompiledStrategy, HARD, SOFT, PAIR
+from betting_strategies import MAX_SPOTS, SIT_OUT
+from utils import DECK, HILO_VALUES
+
+"""The codes of the actions in `action_strategies.ACTIONS`."""
+STAND, HIT, DOUBLE, SPLIT, SURRENDER = (action_strategies.ACTIONS.index(action) for action in "shdpu")
+
+"""The maximum number of hands a player can end up with. Every hand can be split again up to three times."""
+MAX_HANDS = 8
+
+HILO = np.array(HILO_VALUES, dtype=np.int64)
+
+
+class _Batch:
+    """The shoes being played in lockstep, one per row."""
+
+    def __init__(self, rows: int, deck_number: int, rng: np.random.Generator) -> None:
+        """
+        Allocate the shoes.
+
+        :param rows: How many shoes to play at once.
+        :param deck_number: The number of decks in the initial shoe.
+        :param rng: The random number generator used to shuffle the shoes.
+        """
+        self.rng = rng
+        self.starting_shoe = np.array(DECK * deck_number, dtype=np.int8)
+        self.shoes = np.empty((rows, len(self.starting_shoe)), dtype=np.int8)
+        self.positions = np.zeros(rows, dtype=np.int64)
+        self.running_counts = np.zeros(rows, dtype=np.int64)
+
+    def shuffle(self, rows: np.ndarray) -> None:
+        """
+        Start new shoes.
+
+        :param rows: The rows that get a new shoe.
+        """
+        self.shoes[rows] = self.rng.permuted(np.broadcast_to(self.starting_shoe, (len(rows), len(self.starting_shoe))),
+                                             axis=1)
+        self.positions[rows] = 0
+        self.running_counts[rows] = 0
+
+    def draw(self, rows: np.ndarray, hidden: bool = False) -> np.ndarray:
+        """
+        Deal one card from each shoe.
+
+        :param rows: The rows to deal from.
+        :param hidden: Whether the cards are dealt face down, so they don't change the running count yet.
+        :return: The cards dealt.
+        """
+        cards: np.ndarray = self.shoes[rows, self.positions[rows]].astype(np.int64)
+        self.positions[rows] += 1
+        if not hidden:
+            self.running_counts[rows] += HILO[cards]
+        return cards
+
+
+def _add_card(totals: np.ndarray, soft: np.ndarray, cards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Add a card to many hands.
+
+    :param totals: The values of the hands.
+    :param soft: How many aces are counted as 11 in each hand.
+    :param cards: The card to add to each hand.
+    :return: The new values of the hands and the new number of aces counted as 11.
+    """
+    totals = totals + cards
+    soft = soft + (cards == 11)
+    for _ in range(2):
+        reduce = (totals > 21) & (soft > 0)
+        totals = totals - 10 * reduce
+        soft = soft - reduce
+    return totals, soft
+
+
+def _play_dealer(batch: _Batch, rows: np.ndarray, dealer_up_cards: np.ndarray, dealer_down_cards: np.ndarray,
+                 dealer_stands_soft_17: bool) -> np.ndarray:
+    """
+    Play the dealer's hands.
+
+    :param batch: The shoes.
+    :param rows: The rows of the shoes where the dealer plays.
+    :param dealer_up_cards: The dealer's up cards.
+    :param dealer_down_cards: The dealer's down cards.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :return: The final value of the dealer's hands, with busted hands counted as 0.
+    """
+    totals, soft = _add_card(dealer_up_cards, (dealer_up_cards == 11).astype(np.int64), dealer_down_cards)
+    while True:
+        draws = (totals < 17) | ((totals == 17) & (soft > 0) & (not dealer_stands_soft_17))
+        if not draws.any():
+            break
+        totals[draws], soft[draws] = _add_card(totals[draws], soft[draws], batch.draw(rows[draws]))
+    return np.where(totals > 21, 0, totals)
+
+
+def _play_hands(batch: _Batch, rows: np.ndarray, strategy: CompiledStrategy, deck_number: int,
+                first_cards: np.ndarray, second_cards: np.ndarray, dealer_up_cards: np.ndarray, finished: np.ndarray,
+                das: bool, surrender_allowed: bool
+                ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Play the hands of one seat in every shoe of `rows`, but don't play the dealer.
+
+    :param batch: The shoes.
+    :param rows: The rows of the shoes to play.
+    :param strategy: The compiled strategy of the seat.
+    :param deck_number: The number of decks in the initial shoe.
+    :param first_cards: The first card of the seat.
+    :param second_cards: The second card of the seat.
+    :param dealer_up_cards: The dealer's up cards.
+    :param finished: The rows where the hands are over before they are played (e.g. after a blackjack). Insurance is
+        still decided there.
+    :param das: Whether we can double after splitting.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :return: The values of the hands (`MAX_HANDS` per row), whether each hand is doubled, the number of hands, whether
+        insurance is taken and whether the hand is surrendered.
+    """
+    boundaries = np.array(strategy.boundaries, dtype=float)
+    available = np.array(strategy.available)
+    n = len(rows)
+    cards_in_shoe = deck_number * 52
+
+    totals = np.zeros((n, MAX_HANDS), dtype=np.int64)
+    soft = np.zeros((n, MAX_HANDS), dtype=np.int64)
+    doubled = np.zeros((n, MAX_HANDS), dtype=bool)
+    totals[:, 0], soft[:, 0] = _add_card(first_cards, (first_cards == 11).astype(np.int64), second_cards)
+    card_numbers = np.full(n, 2)
+    is_pair = first_cards == second_cards
+    current = np.zeros(n, dtype=np.int64)
+    hand_numbers = np.ones(n, dtype=np.int64)
+    splits_remaining = np.full(n, 3)
+    pending = np.zeros((n, 3), dtype=np.int64)  # The splits remaining of the hands waiting for their second card.
+    pending_number = np.zeros(n, dtype=np.int64)
+
+    def get_moves(local: np.ndarray, can_surrender: bool) -> tuple[np.ndarray, np.ndarray]:
+        """Look up the action for the current hand of every row in `local`."""
+        local_rows = rows[local]
+        true_counts = batch.running_counts[local_rows] / ((cards_in_shoe - batch.positions[local_rows]) / 52)
+        buckets = np.searchsorted(boundaries, true_counts, side="right")
+        if not available[buckets].all():
+            raise IndexError("There is no file provided for some of the true counts.")
+        hand = current[local]
+        can_split = (is_pair[local] & (card_numbers[local] == 2) & (splits_remaining[local] > 0)
+                     & ((first_cards[local] != 11) | (splits_remaining[local] == 3)))
+        can_double = (card_numbers[local] == 2) & (das | (splits_remaining[local] == 3))
+        hand_soft = soft[local, hand] > 0
+        table = np.where(can_split, PAIR, np.where(hand_soft, SOFT, HARD))
+        index = np.where(can_split, first_cards[local], totals[local, hand])
+        permissions = can_double + 2 * can_surrender
+        moves = strategy.actions[buckets, table, index, dealer_up_cards[local], permissions]
+        return moves, strategy.insurance[buckets, table, index, dealer_up_cards[local]]
+
+    # The first decision, where insurance and surrender are possible.
+    moves, insure = get_moves(np.arange(n), surrender_allowed)
+    surrenders = ~finished & (moves == SURRENDER)
+
+    live = np.flatnonzero(~finished & ~surrenders)
+    moves = moves[live]
+    while len(live):
+        hand = current[live]
+        done = np.zeros(len(live), dtype=bool)
+
+        done |= moves == STAND
+
+        hits = np.flatnonzero((moves == HIT) | (moves == DOUBLE))
+        if len(hits):
+            local = live[hits]
+            new_totals, new_soft = _add_card(totals[local, hand[hits]], soft[local, hand[hits]],
+                                             batch.draw(rows[local]))
+            totals[local, hand[hits]] = new_totals
+            soft[local, hand[hits]] = new_soft
+            card_numbers[local] += 1
+            doubles = moves[hits] == DOUBLE
+            doubled[local[doubles], hand[hits][doubles]] = True
+            done[hits] |= doubles | (new_totals > 21)
+
+        splits = np.flatnonzero(moves == SPLIT)
+        if len(splits):
+            local = live[splits]
+            aces = first_cards[local] == 11
+            # Split aces get one card each and can't be played any further.
+            ace_rows = local[aces]
+            if len(ace_rows):
+                for hand_index in range(2):
+                    totals[ace_rows, hand_index], soft[ace_rows, hand_index] = _add_card(
+                        np.full(len(ace_rows), 11), np.ones(len(ace_rows), dtype=np.int64), batch.draw(rows[ace_rows]))
+                hand_numbers[ace_rows] = 2
+                done[splits[aces]] = True
+                pending_number[ace_rows] = 0
+            other_rows = local[~aces]
+            if len(other_rows):
+                splits_remaining[other_rows] -= 1
+                pending[other_rows, pending_number[other_rows]] = splits_remaining[other_rows]
+                pending_number[other_rows] += 1
+                split_cards = first_cards[other_rows]
+                new_cards = batch.draw(rows[other_rows])
+                totals[other_rows, current[other_rows]], soft[other_rows, current[other_rows]] = _add_card(
+                    split_cards, (split_cards == 11).astype(np.int64), new_cards)
+                card_numbers[other_rows] = 2
+                is_pair[other_rows] = new_cards == split_cards
+
+        # Start the hands waiting for their second card.
+        next_hands = live[done & (pending_number[live] > 0)]
+        if len(next_hands):
+            pending_number[next_hands] -= 1
+            splits_remaining[next_hands] = pending[next_hands, pending_number[next_hands]]
+            current[next_hands] = hand_numbers[next_hands]
+            hand_numbers[next_hands] += 1
+            split_cards = first_cards[next_hands]
+            new_cards = batch.draw(rows[next_hands])
+            totals[next_hands, current[next_hands]], soft[next_hands, current[next_hands]] = _add_card(
+                split_cards, (split_cards == 11).astype(np.int64), new_cards)
+            card_numbers[next_hands] = 2
+            is_pair[next_hands] = new_cards == split_cards
+            done[np.isin(live, next_hands)] = False
+
+        live = live[~done]
+        if len(live):
+            moves = get_moves(live, False)[0]
+    return totals, doubled, hand_numbers, insure, surrenders
+
+
+def _play_other_seat(batch: _Batch, rows: np.ndarray, strategy: CompiledStrategy, deck_number: int,
+                     first_cards: np.ndarray, second_cards: np.ndarray, dealer_up_cards: np.ndarray,
+                     dealer_finished: np.ndarray, das: bool, surrender_allowed: bool) -> np.ndarray:
+    """
+    Play the hands of a seat whose results don't matter, only to draw its cards.
+
+    :param batch: The shoes.
+    :param rows: The rows of the shoes to play.
+    :param strategy: The compiled strategy of the seat.
+    :param deck_number: The number of decks in the initial shoe.
+    :param first_cards: The first card of the seat.
+    :param second_cards: The second card of the seat.
+    :param dealer_up_cards: The dealer's up cards.
+    :param dealer_finished: The rows where the dealer has a blackjack and has peeked, so no hand is played.
+    :param das: Whether the player can double after splitting.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :return: Whether any hand of the seat is still standing, so the dealer has to play.
+    """
+    finished = (first_cards + second_cards == 21) | dealer_finished
+    totals, _, hand_numbers, _, surrenders = _play_hands(batch, rows, strategy, deck_number, first_cards, second_cards,
+                                                         dealer_up_cards, finished, das, surrender_allowed)
+    slots = np.arange(MAX_HANDS) < hand_numbers[:, None]
+    standing: np.ndarray = ~finished & ~surrenders & (slots & (totals <= 21)).any(axis=1)
+    return standing
+
+
+def _play_round(batch: _Batch, rows: np.ndarray, strategy: CompiledStrategy,
+                deck_number: int, dealer_peeks_for_blackjack: bool, das: bool, dealer_stands_soft_17: bool,
+                surrender_allowed: bool, num_of_other_players: int, flags: np.ndarray | None = None,
+                other_players_strategy: CompiledStrategy | None = None, spots: np.ndarray | None = None,
+                sitting_out: np.ndarray | None = None, phantom_seat: bool = False) -> np.ndarray:
+    """
+    Play one round in every shoe of `rows`, like `expected_value.simulate_spots` does for one shoe.
+
+    :param batch: The shoes.
+    :param rows: The rows of the shoes to play.
+    :param strategy: The compiled strategy of the mover.
+    :param deck_number: The number of decks in the initial shoe.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param num_of_other_players: The number of players in front of us. They are dealt and play before us.
+    :param flags: If given, it is filled with the `hand_records` flags of every round (of every spot, with the same
+        shape as the profit/loss, when `spots` is given).
+    :param other_players_strategy: The strategy of the other players. Defaults to `other_players.basic_strategy`.
+    :param spots: The number of spots played in every row, up to `betting_strategies.MAX_SPOTS`. One spot if not
+        given.
+    :param sitting_out: The rows where we sit out the round, which must have one spot. Our seat is left empty there,
+        like `expected_value.burn_round` does, and its profit/loss is 0.
+    :param phantom_seat: Whether our seat is dealt and played with the strategy of the other players where we sit out.
+    :return: The profit/loss of every round for a bet of 1. When `spots` is given, there is one column per spot, and
+        the spots that aren't played are 0.
+    """
+    n = len(rows)
+    everyone = np.arange(n)
+    spot_rows = [everyone] if spots is None else [np.flatnonzero(spots > spot) for spot in range(MAX_SPOTS)]
+    if sitting_out is not None and not phantom_seat:
+        # Our seat gets no cards where we sit out.
+        spot_rows[0] = spot_rows[0][~sitting_out[spot_rows[0]]]
+    other_first_cards = [batch.draw(rows) for _ in range(num_of_other_players)]
+    first_cards = [batch.draw(rows[local]) for local in spot_rows]
+    dealer_up_cards = batch.draw(rows)
+    other_second_cards = [batch.draw(rows) for _ in range(num_of_other_players)]
+    second_cards = [batch.draw(rows[local]) for local in spot_rows]
+    dealer_down_cards = batch.draw(rows, hidden=True)
+    dealer_blackjack = dealer_up_cards + dealer_down_cards == 21
+
+    # The other players play first, unless the dealer peeks and has blackjack. Only their cards matter.
+    needs_dealer = np.zeros(n, dtype=bool)
+    dealer_finished = dealer_peeks_for_blackjack & dealer_blackjack
+    if other_players_strategy is None:
+        other_players_strategy = basic_strategy(dealer_stands_soft_17)
+    for seat_first_cards, seat_second_cards in zip(other_first_cards, other_second_cards):
+        needs_dealer |= _play_other_seat(batch, rows, other_players_strategy, deck_number, seat_first_cards,
+                                         seat_second_cards, dealer_up_cards, dealer_finished, das, surrender_allowed)
+    if sitting_out is not None and phantom_seat:
+        # Our seat is played like another seat where we sit out, and our first spot only where we play.
+        absent = np.flatnonzero(sitting_out)
+        needs_dealer[absent] = _play_other_seat(batch, rows[absent], other_players_strategy, deck_number,
+                                                first_cards[0][absent], second_cards[0][absent],
+                                                dealer_up_cards[absent], dealer_finished[absent], das,
+                                                surrender_allowed) | needs_dealer[absent]
+        present = np.flatnonzero(~sitting_out)
+        spot_rows[0] = present
+        first_cards[0] = first_cards[0][present]
+        second_cards[0] = second_cards[0][present]
+
+    # Our spots play in order, and the dealer plays once for all of them.
+    rewards = np.zeros((n, len(spot_rows)))
+    spot_flags = None if flags is None else flags.reshape(n, -1)
+    played_spots = []
+    for spot, (local, spot_first_cards, spot_second_cards) in enumerate(zip(spot_rows, first_cards, second_cards)):
+        if not len(local):
+            continue
+        up_cards = dealer_up_cards[local]
+        down_cards = dealer_down_cards[local]
+        spot_dealer_blackjack = dealer_blackjack[local]
+        player_blackjack = spot_first_cards + spot_second_cards == 21
+        if dealer_peeks_for_blackjack:
+            finished = spot_dealer_blackjack | player_blackjack
+        else:
+            finished = player_blackjack
+        totals, doubled, hand_numbers, insure, surrenders = _play_hands(
+            batch, rows[local], strategy, deck_number, spot_first_cards, spot_second_cards, up_cards, finished, das,
+            surrender_allowed)
+        spot_rewards = np.where(insure & (up_cards == 11), np.where(down_cards == 10, 1., -.5), 0.)
+        if dealer_peeks_for_blackjack:
+            spot_rewards += np.where(player_blackjack, np.where(spot_dealer_blackjack, 0., 1.5), -1.) * finished
+        else:
+            spot_rewards += np.where(spot_dealer_blackjack, 0., 1.5) * finished
+        player_loses_all_bets = spot_dealer_blackjack & ~player_blackjack & ~finished
+        spot_rewards -= .5 * surrenders
+        played = ~finished & ~surrenders
+        # The dealer only plays if at least one hand at the table isn't busted.
+        hand_slots = np.arange(MAX_HANDS) < hand_numbers[:, None]
+        busted = totals > 21
+        needs_dealer[local] |= played & (hand_slots & ~busted).any(axis=1) & ~player_loses_all_bets
+        rewards[local, spot] = spot_rewards
+        played_spots.append((spot, local, totals, doubled, hand_slots, busted, played, player_loses_all_bets))
+        if spot_flags is not None:
+            spot_flags[local, spot] = (
+                hand_records.BLACKJACK * player_blackjack + hand_records.INSURANCE * (insure & (up_cards == 11))
+                + hand_records.SURRENDER * surrenders
+                + played * (hand_records.SPLIT * (hand_numbers > 1) + hand_records.DOUBLE * doubled.any(axis=1)))
+
+    dealer_values = np.zeros(n, dtype=np.int64)
+    dealer_rows = np.flatnonzero(needs_dealer)
+    if len(dealer_rows):
+        dealer_values[dealer_rows] = _play_dealer(batch, rows[dealer_rows], dealer_up_cards[dealer_rows],
+                                                  dealer_down_cards[dealer_rows], dealer_stands_soft_17)
+    for spot, local, totals, doubled, hand_slots, busted, played, player_loses_all_bets in played_spots:
+        outcomes = np.sign(totals - dealer_values[local, None])
+        outcomes = np.where(busted | player_loses_all_bets[:, None], -1, outcomes)
+        outcomes = outcomes * np.where(doubled, 2, 1) * hand_slots
+        rewards[local, spot] += outcomes.sum(axis=1) * played
+
+    batch.running_counts[rows] += HILO[dealer_down_cards]  # The down card is turned over at the end of the round.
+    return rewards[:, 0] if spots is None else rewards
+
+
+def batch_expected_value(action_class: action_strategies.BaseMover, betting_class: betting_strategies.BaseBetter,
+                         simulations: int, deck_number: int = 6, shoe_penetration: float = .25,
+                         dealer_peeks_for_blackjack: bool = True, das: bool = True,
+                         dealer_stands_soft_17: bool = True, surrender_allowed: bool = True,
+                         num_of_other_players: int = 0, batch_size: int = 10_000, seed: int | None = None,
+                         accumulator: ResultAccumulator | None = None, records: HandRecordWriter | None = None,
+                         other_players_strategy: CompiledStrategy | None = None, phantom_seat: bool = False
+                         ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estimate the expected value of a strategy by playing many shoes in lockstep.
+
+    Every round is played in all the shoes at once, and every decision is an array lookup in the mover's tables.
+    When a shoe reaches the reshuffle point, its row is refilled with a new shoe until `simulations` shoes are played.
+
+    :param action_class: The class that chooses the action. Must have a compiled strategy, like
+        `BasicStrategyMover`, `BasicStrategyDeviationsMover` and `CardCountMover`.
+    :param betting_class: The class that chooses the bet. Its bet and its number of spots must only depend on the
+        running count and the number of cards seen.
+    :param simulations: How many shoes to play.
+    :param deck_number: The number of decks in the initial shoe.
+    :param shoe_penetration: When to reshuffle the shoe. Reshuffles when cards remaining < starting cards * deck penetration.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param num_of_other_players: number of players in front of us on the same table, ranging from 0 to 6.
+    :param batch_size: How many shoes to play at once.
+    :param seed: The seed of the random number generator.
+    :param accumulator: If given, every hand is added to it instead of being recorded, and the arrays returned are
+        empty.
+    :param records: If given, a record of every hand is written to it.
+    :param other_players_strategy: The strategy of the other players. Only its first bucket is used. Defaults to the
+        basic strategy of `other_players.basic_strategy`.
+    :param phantom_seat: Whether our seat is still dealt in the rounds we sit out, and played with the strategy of the
+        other players, instead of being left empty. The shoe is then dealt in the same rounds as when we play every
+        round, like the evaluation of betters from hand records does (see `bet_ramps.evaluate_betters`).
+    :return: The bet, the profit/loss and the true count at the start of every hand. Every spot is a hand. The rounds
+        sat out aren't hands: they are only counted in the accumulator.
+    """
+    check_other_players(num_of_other_players)
+    compiled = getattr(action_class, "compiled", None)
+    if not isinstance(compiled, CompiledStrategy):
+        raise TypeError(f"{type(action_class).__name__} doesn't have a compiled strategy.")
+    bet_table = betting_class.get_bet_table(deck_number)
+    spots_table = betting_class.get_spots_table(deck_number)
+    multi_spot = bool(spots_table.max() > 1)
+    wonging = bool((bet_table == SIT_OUT).any())
+    max_running_count = 20 * deck_number
+    cards_in_shoe = deck_number * 52
+    reshuffle_at = int(cards_in_shoe * shoe_penetration)
+
+    batch = _Batch(min(batch_size, simulations), deck_number, np.random.default_rng(seed))
+    rows = np.arange(len(batch.shoes))
+    batch.shuffle(rows)
+    shoes_started = len(rows)
+
+    bets = []
+    rewards = []
+    true_counts = []
+    while len(rows):
+        cards_remaining = cards_in_shoe - batch.positions[rows]
+        round_true_counts = batch.running_counts[rows] / (cards_remaining / 52)
+        running_counts = batch.running_counts[rows]
+        round_bets = bet_table[running_counts + max_running_count, batch.positions[rows]]
+        sitting_out = round_bets == SIT_OUT
+        round_spots = spots_table[running_counts + max_running_count, batch.positions[rows]]
+        if multi_spot and wonging:
+            round_spots[sitting_out] = 1
+        flags = None if records is None else np.zeros((len(rows), MAX_SPOTS) if multi_spot else len(rows), np.uint8)
+        unit_rewards = _play_round(batch, rows, compiled, deck_number, dealer_peeks_for_blackjack, das,
+                                   dealer_stands_soft_17, surrender_allowed, num_of_other_players, flags,
+                                   other_players_strategy, round_spots if multi_spot else None,
+                                   sitting_out if wonging else None, phantom_seat)
+        if multi_spot:
+            # Every spot is a hand of its own, with the counts and the bet of the round.
+            if wonging:
+                round_spots[sitting_out] = 0
+            played = np.arange(MAX_SPOTS) < round_spots[:, None]
+            unit_rewards = unit_rewards[played]
+            flags = None if flags is None else flags[played]
+            cards_remaining, round_true_counts, running_counts, round_bets = (
+                np.repeat(values, round_spots)
+                for values in (cards_remaining, round_true_counts, running_counts, round_bets))
+        elif wonging:
+            playing = ~sitting_out
+            unit_rewards = unit_rewards[playing]
+            flags = None if flags is None else flags[playing]
+            cards_remaining, round_true_counts, running_counts, round_bets = (
+                values[playing] for values in (cards_remaining, round_true_counts, running_counts, round_bets))
+        if wonging and accumulator is not None:
+            accumulator.sit_out(int(np.count_nonzero(sitting_out)))
+        round_rewards = unit_rewards * round_bets
+        if records is not None and flags is not None:
+            records.add_arrays(round_true_counts, running_counts, cards_remaining, round_bets, unit_rewards, flags)
+        if accumulator is not None:
+            accumulator.add_arrays(round_bets, round_rewards, round_true_counts)
+        else:
+            bets.append(round_bets)
+            rewards.append(round_rewards)
+            true_counts.append(round_true_counts)
+
+        finished = rows[cards_in_shoe - batch.positions[rows] < reshuffle_at]
+        refills = finished[:max(0, simulations - shoes_started)]
+        if len(refills):
+            batch.shuffle(refills)
+            shoes_started += len(refills)
+        rows = np.setdiff1d(rows, finished[len(refills):], assume_unique=True)
+
+    if not bets:
+        return np.array([]), np.array([]), np.array([])
+    return np.concatenate(bets), np.concatenate(rewards), np.concatenate(true_counts)
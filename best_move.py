@@ -1,6 +1,7 @@
 """Calculate the best move to play by taking into account all available information."""
 from functools import lru_cache
 from utils import DECK
+import hand_state
 from typing import Iterable
 import matplotlib.pyplot as plt
 import argparse
@@ -16,30 +17,23 @@ class HandPlayer:
         :param cards: The cards the hand has at the moment.
         """
         self.cards = cards
-        value = sum(cards)
-        aces = cards.count(11)
-        while value > 21 and aces > 0:
-            value -= 10
-            aces -= 1
-        self.value = value
-        self.aces = aces
+        self.state = hand_state.from_cards(cards)
+        self.value = hand_state.hand_value(self.state)
+        self.aces = int(hand_state.is_soft(self.state))
 
 
 class HandDealer:
     """Hold information about the dealer's hand."""
 
-    def __init__(self, value: int, aces: int) -> None:
+    def __init__(self, state: int) -> None:
         """
-        Calculate the value of the hand the number of aces it has.
+        Read the value of the hand and the number of aces it has.
 
-        :param value: The hand's value (can be over 21).
-        :param aces: How many aces that are counted as 11 the hand has.
+        :param state: The state of the hand (see `hand_state`).
         """
-        if value > 21 and aces:
-            value -= 10
-            aces -= 1
-        self.value = value
-        self.aces = aces
+        self.state = state
+        self.value = hand_state.hand_value(state)
+        self.aces = int(hand_state.is_soft(state))
 
 
 def tuple_sort(cards: Iterable[int]) -> tuple[int, ...]:
@@ -176,12 +170,13 @@ def chances_of_beating_dealer(hand_value: int, dealer_value: int, dealer_has_ace
         probabilities = {k: counts[k] / amount_of_cards_not_seen for k in range(2, 12)}
 
     beat_probability = 0.
+    dealer_state = hand_state.from_value(dealer_value, dealer_has_ace)
     for card in range(2, 12):
         # In this loop, you probably need to use dealer.property instead of dealer_property.
         # e.g. dealer.value instead of dealer_value.
         if probabilities[card] == 0:
             continue
-        dealer = HandDealer(dealer_value + card, dealer_has_ace + (card == 11))
+        dealer = HandDealer(hand_state.add_card(dealer_state, card))
         # If dealer_peeks_for_blackjack is true, then we use the probabilities of the card occurring without the one
         # that would have caused the blackjack.
         if dealer.value < 17 or dealer.value == 17 and dealer.aces > 0 and not dealer_stands_soft_17:
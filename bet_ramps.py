@@ -0,0 +1,157 @@
+"""Evaluate and optimize betting strategies after a simulation, from the results of a single run with unit bets."""
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from accumulators import ResultAccumulator, RunningStats, TRUE_COUNT_BINS
+from betting_strategies import BaseBetter, RampBetter, SIT_OUT
+
+"""The bet used for the true counts where a ramp wongs out, like the wonging betters of `betting_strategies`."""
+WONG_OUT_BET = SIT_OUT
+
+
+def bets_from_records(records: np.ndarray, bet_table: np.ndarray, deck_number: int) -> np.ndarray:
+    """
+    Look up the bet of every recorded hand.
+
+    The play of a hand doesn't depend on the bet, so the result of any better is its bet times the recorded result for
+    a bet of 1.
+
+    :param records: The hand records (see `hand_records.HAND_RECORD_DTYPE`).
+    :param bet_table: The bet table of the better (see `betting_strategies.BaseBetter.get_bet_table`).
+    :param deck_number: The number of decks in the starting shoe.
+    :return: The bet of every hand.
+    """
+    running_counts = records["running_count"].astype(np.int64) + 20 * deck_number
+    cards_seen = deck_number * 52 - records["cards_remaining"].astype(np.int64)
+    return bet_table[running_counts, cards_seen]
+
+
+def evaluate_betters(records: np.ndarray, betters: Sequence[BaseBetter], deck_number: int,
+                     chunk_size: int = 1_000_000) -> list[ResultAccumulator]:
+    """
+    Get the results every better would have had on the recorded hands, reading the records a chunk at a time.
+
+    :param records: The hand records of a simulation, e.g. from `hand_records.read_hand_records`. Their bets are
+        ignored.
+    :param betters: The betters to evaluate. Their bet must only depend on the running count and the number of cards
+        seen, like all the betters in `betting_strategies`.
+    :param deck_number: The number of decks in the starting shoe.
+    :param chunk_size: How many records are read at a time.
+    :return: The results of every better. The hands where a better sits out are counted as rounds sat out. Their cards
+        are still dealt to our seat, so the results are those of a simulation with `phantom_seat`: when our seat is
+        left empty, the next rounds get other cards.
+    """
+    bet_tables = [better.get_bet_table(deck_number) for better in betters]
+    accumulators = [ResultAccumulator() for _ in betters]
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        results = chunk["result"].astype(float)
+        true_counts = chunk["true_count"].astype(float)
+        for bet_table, accumulator in zip(bet_tables, accumulators):
+            bets = bets_from_records(chunk, bet_table, deck_number)
+            playing = bets != SIT_OUT
+            accumulator.add_arrays(bets[playing], results[playing] * bets[playing], true_counts[playing])
+            accumulator.sit_out(len(bets) - int(np.count_nonzero(playing)))
+    return accumulators
+
+
+def count_table(stats: Sequence[RunningStats]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the frequency, the EV and the second moment of the result of a hand for every true count range.
+
+    :param stats: The statistics of the results for a bet of 1 of every true count range, e.g. from
+        `hand_records.ev_by_true_count`, or the `bins` of the `ResultAccumulator` of a run with `SimpleBetter`.
+    :return: The share of the hands in every range, the mean result and the mean squared result.
+    """
+    counts = np.array([bin_stats.count for bin_stats in stats], dtype=float)
+    evs = np.array([bin_stats.mean for bin_stats in stats])
+    variances = np.array([bin_stats.m2 / bin_stats.count if bin_stats.count else 0. for bin_stats in stats])
+    return counts / counts.sum(), evs, variances + evs ** 2
+
+
+def ramp_metrics(bets: np.ndarray, frequencies: np.ndarray, evs: np.ndarray, second_moments: np.ndarray,
+                 units: float = 200) -> dict[str, np.ndarray]:
+    """
+    Score ramps without simulating them.
+
+    The bet only scales the result of a hand, so the EV and the variance per hand of a ramp follow from the EV and the
+    second moment of the result in every true count range. The ranges where a ramp sits out count as hands with no
+    result, so ramps that wong out are scored per round watched, like the ramps that play every round.
+
+    :param bets: The bet of every true count range. Can have more dimensions, to score many ramps at once (the ranges
+        are on the last axis).
+    :param frequencies: The share of the hands in every true count range.
+    :param evs: The mean result for a bet of 1 in every true count range.
+    :param second_moments: The mean squared result for a bet of 1 in every true count range.
+    :param units: The bankroll, in the same units as the bets.
+    :return: The EV per hand (`ev_per_hand`), the standard deviation per hand (`std_per_hand`), SCORE (the EV per 100
+        hands with optimal bets for a bankroll of 10,000, `score`) and the risk of ruin (`risk_of_ruin`).
+    """
+    ev = np.sum(bets * frequencies * evs, axis=-1)
+    variance = np.sum(bets ** 2 * frequencies * second_moments, axis=-1) - ev ** 2
+    std = np.sqrt(np.maximum(variance, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.where(ev > 0, 1_000_000 * ev ** 2 / variance, 0.)
+        ratio = ev / std
+        # The same formula as `expected_value.calc_ror`. Ruin is certain without an edge.
+        risk_of_ruin = np.where(ev > 0, ((1 - ratio) / (1 + ratio)) ** (units / std), 1.)
+    return {"ev_per_hand": ev, "std_per_hand": std, "score": score, "risk_of_ruin": np.clip(risk_of_ruin, 0, 1)}
+
+
+def optimize_ramp(stats: Sequence[RunningStats], true_count_bins: Sequence[float] = TRUE_COUNT_BINS,
+                  objective: str = "score", units: float = 200, min_bet: float = 1, max_spread: float = 8,
+                  wong_out: Sequence[float | None] = (None,), bet_step: float | None = None,
+                  monotonic: bool = True, scales: int = 400) -> RampBetter:
+    """
+    Find the ramp that maximizes SCORE or minimizes the risk of ruin, scoring every candidate with array operations.
+
+    The candidates bet in proportion to the optimal (Kelly) bet of every true count range, the EV divided by the
+    second moment of the result, for many proportions. The bets are capped to the spread and rounded to the bet step.
+
+    :param stats: The statistics of the results for a bet of 1 of every true count range (see `count_table`).
+    :param true_count_bins: The edges of the true count ranges of `stats`.
+    :param objective: "score" to maximize SCORE, or "ror" to minimize the risk of ruin for `units`.
+    :param units: The bankroll, in the same units as the bets.
+    :param min_bet: The smallest bet when playing.
+    :param max_spread: The largest bet, as a multiple of `min_bet`.
+    :param wong_out: The true counts to try as wong-out thresholds. Below the range that starts at the threshold, the
+        ramp bets `WONG_OUT_BET`. None means never wonging out.
+    :param bet_step: If given, the bets are multiples of this (but at least `min_bet`).
+    :param monotonic: Whether the bets can only go up with the true count. Smooths out the noise of the EV in the
+        rare high counts.
+    :param scales: How many proportions to try.
+    :return: The better with the best ramp.
+    """
+    if objective not in ("score", "ror"):
+        raise ValueError(f"Unknown objective: {objective}.")
+    frequencies, evs, second_moments = count_table(stats)
+    max_bet = min_bet * max_spread
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kelly = np.where((evs > 0) & (second_moments > 0), evs / second_moments, 0.)
+    positive = kelly[kelly > 0]
+    if len(positive):
+        factors = np.geomspace(min_bet / positive.max(), max_bet / positive.min(), scales)
+    else:
+        factors = np.zeros(1)
+    candidates = np.clip(factors[:, None] * kelly, min_bet, max_bet)
+    if bet_step is not None:
+        candidates = np.maximum(np.round(candidates / bet_step) * bet_step, min_bet)
+        candidates = np.minimum(candidates, np.floor(max_bet / bet_step) * bet_step)
+    if monotonic:
+        candidates = np.maximum.accumulate(candidates, axis=1)
+
+    edges = np.asarray(true_count_bins[:-1], dtype=float)
+    wonging_candidates = []
+    for threshold in wong_out:
+        ramp = candidates.copy()
+        if threshold is not None:
+            ramp[:, edges < threshold] = WONG_OUT_BET
+        wonging_candidates.append(ramp)
+    ramps = np.concatenate(wonging_candidates)
+
+    metrics = ramp_metrics(ramps, frequencies, evs, second_moments, units)
+    best = int(np.argmax(metrics["score"]) if objective == "score" else np.argmin(metrics["risk_of_ruin"]))
+    return RampBetter(true_count_bins, ramps[best])
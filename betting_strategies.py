@@ -1,29 +1,132 @@
 """Betting strategies to be used in expected value."""
+from bisect import bisect_right
+from collections import OrderedDict
 import logging
+import pickle
+from typing import Callable, Collection, Sequence
 
-from utils import get_hilo_running_count
+import numpy as np
+
+from utils import get_hilo_running_count, ShoeState
+
+"""The most spots a better can play in a round."""
+MAX_SPOTS = 3
+
+"""The bet of a round sat out. The simulators only deal its cards, to keep the count, and don't count it as a hand."""
+SIT_OUT = 0
+
+"""How many bet and spots tables every process keeps, so that the chunks of a run don't build them again."""
+MAX_CACHED_TABLES = 32
+
+_cached_tables: OrderedDict[tuple[bytes, str, int], np.ndarray] = OrderedDict()
 
 
 class BaseBetter:
     """Base better. The parent class of all betters."""
 
-    @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(self, cards_seen: Collection[int], deck_number: int) -> float:
         """
         Raise `NotImplementedError`. To be overridden in the other classes.
 
-        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting. During a simulation
+            this is a `utils.ShoeState`, which keeps the running count without rescanning the cards.
         :param deck_number: The number of decks in the starting shoe.
-        :return: How much money to bet.
+        :return: How much money to bet, or `SIT_OUT` to watch the round without playing.
         """
         raise NotImplementedError("The `get_bet` method hasn't been overridden.")
 
+    def get_spots(self, cards_seen: Collection[int], deck_number: int) -> int:
+        """
+        Get how many spots to play. Every spot gets the bet of `get_bet`. Override it to play more than one spot.
+
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param deck_number: The number of decks in the starting shoe.
+        :return: The number of spots, from 1 to `MAX_SPOTS`.
+        """
+        return 1
+
+    def get_bet_table(self, deck_number: int) -> np.ndarray:
+        """
+        Get the bet for every possible running count and number of cards seen, to look up many bets at once.
+
+        Only valid for betters whose bet depends on nothing but the running count and the number of cards seen,
+        like all the betters in this file.
+
+        :param deck_number: The number of decks in the starting shoe.
+        :return: A read-only array where `table[running_count + 20 * deck_number, cards_seen]` is the bet. Entries where
+            the better can't calculate a bet (e.g. no cards are left) are NaN.
+        """
+        return _cached_table(self, "get_bet", deck_number, np.nan)
+
+    def get_spots_table(self, deck_number: int) -> np.ndarray:
+        """
+        Get the number of spots for every possible running count and number of cards seen, like `get_bet_table`.
+
+        :param deck_number: The number of decks in the starting shoe.
+        :return: A read-only array where `table[running_count + 20 * deck_number, cards_seen]` is the number of
+            spots. Entries where the better can't calculate it are 1.
+        """
+        return _cached_table(self, "get_spots", deck_number, 1)
+
+
+def _cached_table(better: BaseBetter, method: str, deck_number: int, default: float) -> np.ndarray:
+    """
+    Get the table of a method of a better, built with `_count_table` the first time it is asked for in this process.
+
+    Building a table calls the method about 75,000 times with 6 decks, which takes longer than playing a small chunk of
+    shoes. The tables are kept by the pickled better, so a copy of the better sent with every chunk finds them.
+
+    :param better: The better.
+    :param method: The name of the method, `get_bet` or `get_spots`, whose table is of integers.
+    :param deck_number: The number of decks in the starting shoe.
+    :param default: The entry where the method divides by zero.
+    :return: The table, read-only because it is shared.
+    """
+    key = (pickle.dumps(better, protocol=4), method, deck_number)
+    table = _cached_tables.get(key)
+    if table is None:
+        table = _count_table(getattr(better, method), deck_number, default)
+        if method == "get_spots":
+            table = table.astype(np.int64)
+        table.setflags(write=False)
+        _cached_tables[key] = table
+        if len(_cached_tables) > MAX_CACHED_TABLES:
+            _cached_tables.popitem(last=False)
+    else:
+        _cached_tables.move_to_end(key)
+    return table
+
+
+def _count_table(function: Callable[[Collection[int], int], float], deck_number: int, default: float) -> np.ndarray:
+    """
+    Call a function of the cards seen for every possible running count and number of cards seen.
+
+    :param function: The function, e.g. `BaseBetter.get_bet`.
+    :param deck_number: The number of decks in the starting shoe.
+    :param default: The entry where the function divides by zero (e.g. no cards are left).
+    :return: An array where `table[running_count + 20 * deck_number, cards_seen]` is the result of the function.
+    """
+    max_running_count = 20 * deck_number
+    cards = deck_number * 52
+    table = np.full((2 * max_running_count + 1, cards + 1), default, dtype=float)
+    shoe_state = ShoeState(deck_number)
+    for cards_seen in range(cards + 1):
+        shoe_state.cards_seen_number = cards_seen
+        shoe_state.cards_remaining = cards - cards_seen
+        for running_count in range(-max_running_count, max_running_count + 1):
+            shoe_state.running_count = running_count
+            try:
+                table[running_count + max_running_count, cards_seen] = function(shoe_state, deck_number)
+            except ZeroDivisionError:
+                pass
+    return table
+
 
 class SimpleBetter(BaseBetter):
     """Simple better. Bets the same amount every time."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet 1 every time. The bet doesn't change.
 
@@ -38,7 +141,7 @@ class CardCountBetter(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet true_count ^ 2 / 2 if true_count >= +1 else 1. Cap at 15 (using a 1-15 spread).
 
@@ -57,7 +160,7 @@ class LinearBetter(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -76,7 +179,7 @@ class LinearBetterWongIn(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -92,13 +195,13 @@ class LinearBetterWongIn(BaseBetter):
         # logging.debug("true_count = {}".format(true_count))
         if true_count >= 1:
             return max(min(int(true_count), 10), 1)
-        return 0.001
+        return SIT_OUT
 
 class Linear4(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -115,7 +218,7 @@ class Linear2D(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> float:
         running_count = get_hilo_running_count(cards_seen)
         cards_left = deck_number * 52 - len(cards_seen)
         true_count = running_count / (cards_left / 52)
@@ -125,7 +228,7 @@ class Linear4Passive(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> float:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -142,7 +245,7 @@ class Wong6(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -158,13 +261,13 @@ class Wong6(BaseBetter):
         # logging.debug("true_count = {}".format(true_count))
         if true_count >= 1:
             return max(min(int(true_count), 6), 1)
-        return 0.001
+        return SIT_OUT
 
 class WongBJA7(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> float:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -176,7 +279,7 @@ class WongBJA7(BaseBetter):
         cards_left = deck_number * 52 - len(cards_seen) - 1
         true_count = running_count / (cards_left / 52)
         if true_count < 0:
-            return 0.001
+            return SIT_OUT
         if true_count < 1:
             return 1
         if true_count < 2:
@@ -196,7 +299,7 @@ class Wong20(BaseBetter):
     """Change the bet according to the true count."""
 
     @staticmethod
-    def get_bet(cards_seen: list[int], deck_number: int) -> int:
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
         """
         Bet (true_count - 1) / 2 if true_count >= +2 else 1. Cap at 10 (using a 1-10 spread).
 
@@ -212,4 +315,91 @@ class Wong20(BaseBetter):
         # logging.debug("true_count = {}".format(true_count))
         if true_count >= 1:
             return max(min(int(true_count), 20), 1)
-        return 0.001
\ No newline at end of file
+        return SIT_OUT
+
+
+class RampBetter(BaseBetter):
+    """Bet a fixed amount for every range of the true count, e.g. a ramp found by `bet_ramps.optimize_ramp`."""
+
+    def __init__(self, true_count_bins: Sequence[float], bets: Sequence[float]) -> None:
+        """
+        Save the ramp.
+
+        :param true_count_bins: The edges of the true count ranges. A true count is in range `i` if
+            `edges[i] <= true_count < edges[i + 1]`. True counts outside the edges use the first or the last range.
+        :param bets: The bet of every range.
+        """
+        if len(bets) != len(true_count_bins) - 1:
+            raise ValueError("There must be one bet per true count range.")
+        self.true_count_bins = tuple(true_count_bins)
+        self.bets = tuple(float(bet) for bet in bets)
+
+    def get_bet(self, cards_seen: Collection[int], deck_number: int) -> float:
+        """
+        Bet the amount of the range of the true count, calculated like the simulators do at the start of a hand.
+
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param deck_number: The number of decks in the starting shoe.
+        :return: How much money to bet.
+        """
+        running_count = get_hilo_running_count(cards_seen)
+        cards_left = deck_number * 52 - len(cards_seen)
+        true_count = running_count / (cards_left / 52)
+        index = bisect_right(self.true_count_bins, true_count) - 1
+        return self.bets[min(max(index, 0), len(self.bets) - 1)]
+
+    def __repr__(self) -> str:
+        """
+        Show the ramp.
+
+        :return: The class, the true count ranges and their bets.
+        """
+        return f"RampBetter({list(self.true_count_bins)}, {list(self.bets)})"
+
+
+class MultiSpotBetter(BaseBetter):
+    """Play more spots at high true counts, with the bet of another better on every spot."""
+
+    def __init__(self, better: BaseBetter, spot_true_counts: Sequence[float] = (3,)) -> None:
+        """
+        Save the better and when to play more spots.
+
+        :param better: The better that chooses the bet of every spot.
+        :param spot_true_counts: The true counts from which a second spot, then a third, are played, in ascending
+            order.
+        """
+        if len(spot_true_counts) >= MAX_SPOTS:
+            raise ValueError(f"At most {MAX_SPOTS} spots can be played.")
+        self.better = better
+        self.spot_true_counts = tuple(spot_true_counts)
+
+    def get_bet(self, cards_seen: Collection[int], deck_number: int) -> float:
+        """
+        Bet like the other better on every spot.
+
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param deck_number: The number of decks in the starting shoe.
+        :return: How much money to bet on every spot.
+        """
+        return self.better.get_bet(cards_seen, deck_number)
+
+    def get_spots(self, cards_seen: Collection[int], deck_number: int) -> int:
+        """
+        Play one more spot for every threshold the true count, calculated like the simulators do, has reached.
+
+        :param cards_seen: The cards we have already seen from the shoe. Used when card counting.
+        :param deck_number: The number of decks in the starting shoe.
+        :return: The number of spots.
+        """
+        running_count = get_hilo_running_count(cards_seen)
+        cards_left = deck_number * 52 - len(cards_seen)
+        true_count = running_count / (cards_left / 52)
+        return 1 + bisect_right(self.spot_true_counts, true_count)
+
+    def __repr__(self) -> str:
+        """
+        Show the better and the thresholds.
+
+        :return: The class, the better of every spot and the true counts where more spots are played.
+        """
+        return f"MultiSpotBetter({self.better!r}, {list(self.spot_true_counts)})"
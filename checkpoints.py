@@ -0,0 +1,159 @@
+"""Save the results of a run as its chunks are merged, to resume it, extend it with more shoes or reuse it from a cache."""
+from __future__ import annotations
+
+from typing import Any, Sequence, cast
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+from accumulators import ResultAccumulator, TRUE_COUNT_BINS
+
+"""The name of the checkpoint file in a checkpoint directory."""
+CHECKPOINT_FILE = "checkpoint.pkl"
+
+"""How often a checkpoint is saved while a run is playing, in seconds."""
+CHECKPOINT_INTERVAL = 60.
+
+"""The attributes that only tell where the data of an object was read from (e.g. the strategy files of a mover), left
+out of the fingerprint of a configuration."""
+SOURCE_ATTRIBUTES = ("filename", "filenames")
+
+
+class _FingerprintPickler(pickle.Pickler):
+    """Pickle the objects of a configuration without their `SOURCE_ATTRIBUTES`."""
+
+    def reducer_override(self, obj: Any) -> Any:
+        """
+        Pickle the objects with source attributes as their class and the rest of their attributes.
+
+        :param obj: The object to pickle.
+        :return: How to pickle the object, or `NotImplemented` to pickle it as usual.
+        """
+        state = getattr(obj, "__dict__", None)
+        if not isinstance(state, dict) or not any(name in state for name in SOURCE_ATTRIBUTES):
+            return NotImplemented
+        return type(obj), (), {name: value for name, value in state.items() if name not in SOURCE_ATTRIBUTES}
+
+
+def config_fingerprint(*config: Any) -> str:
+    """
+    Get a fingerprint of the configuration of a run, to check that a checkpoint belongs to it.
+
+    The fingerprint is of the content of the configuration, e.g. the class and the strategy tables of a mover rather
+    than the paths of their files, so that the same strategy read from another path has the same fingerprint.
+
+    :param config: Everything the results depend on (e.g. the configurations played and the simulator), picklable.
+    :return: The SHA-256 of the pickled configuration, in hexadecimal.
+    """
+    buffer = io.BytesIO()
+    _FingerprintPickler(buffer, protocol=4).dump(config)
+    return hashlib.sha256(buffer.getvalue()).hexdigest()
+
+
+def cache_directory(cache: str, seed: int, *config: Any) -> str:
+    """
+    Get the directory of a run in a result cache, where its checkpoint is kept.
+
+    The directory is addressed by the seed and the fingerprint of the configuration, so that a run with the same
+    configuration finds the results of the previous ones.
+
+    :param cache: The directory of the cache.
+    :param seed: The seed of the run.
+    :param config: Everything the results depend on, except the number of shoes (see `config_fingerprint`).
+    :return: The checkpoint directory of the run.
+    """
+    return os.path.join(cache, config_fingerprint(seed, *config))
+
+
+class Checkpoint:
+    """
+    The results of the chunks of a run merged so far, in order, and what is needed to play the next chunks.
+
+    Every chunk is shuffled from the entropy of the run and its index (see `expected_value.play_chunks`), so the random
+    state of the run is only the entropy and the number of chunks and shoes played. A run resumed from a checkpoint
+    with the same chunk size gives the same results as if it hadn't stopped, and a run extended with more shoes can
+    play them in bigger chunks than the ones already played.
+    """
+
+    def __init__(self, fingerprint: str, entropy: int, chunk_size: int, directory: str | None = None,
+                 true_count_bins: Sequence[float] = TRUE_COUNT_BINS) -> None:
+        """
+        Start a run without any chunk played.
+
+        :param fingerprint: The fingerprint of the configuration of the run (see `config_fingerprint`).
+        :param entropy: The entropy of the run, from which the seed of every chunk is derived.
+        :param chunk_size: How many shoes are in each of the next chunks.
+        :param directory: The directory the checkpoint is saved to. If None, it is only kept in memory.
+        :param true_count_bins: The edges of the true count bins of the results (see `ResultAccumulator`).
+        """
+        self.fingerprint = fingerprint
+        self.entropy = entropy
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.chunks = 0
+        self.shoes = 0
+        self.accumulator = ResultAccumulator(true_count_bins=true_count_bins)
+        self.chunk_profits: list[float] = []
+        self.chunk_hands: list[int] = []
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def open(cls, directory: str, fingerprint: str, seed: int | None, chunk_size: int,
+             true_count_bins: Sequence[float] = TRUE_COUNT_BINS) -> Checkpoint:
+        """
+        Load the checkpoint of a run, or start a new one if the directory doesn't have one.
+
+        :param directory: The checkpoint directory. It is created if needed.
+        :param fingerprint: The fingerprint of the configuration of the run.
+        :param seed: The seed of the run. If None, the seed of the checkpoint is used, or a random one for a new run.
+        :param chunk_size: How many shoes are in each of the next chunks, also those of a loaded run.
+        :param true_count_bins: The edges of the true count bins of a new run. They should be part of the fingerprint.
+        :return: The checkpoint.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            entropy = cast(int, np.random.SeedSequence(seed).entropy)  # An int, as the seed is an int or None.
+            return cls(fingerprint, entropy, chunk_size, directory, true_count_bins)
+        with open(path, "rb") as file:
+            checkpoint: Checkpoint = pickle.load(file)
+        if checkpoint.fingerprint != fingerprint:
+            raise ValueError(f"The checkpoint in {directory} is of a run with another configuration.")
+        if seed is not None and np.random.SeedSequence(seed).entropy != checkpoint.entropy:
+            raise ValueError(f"The checkpoint in {directory} is of a run with another seed.")
+        checkpoint.directory = directory
+        checkpoint.chunk_size = chunk_size
+        checkpoint._last_save = time.monotonic()
+        return checkpoint
+
+    def add(self, shoes: int, result: ResultAccumulator) -> None:
+        """
+        Merge the results of the next chunk.
+
+        :param shoes: The number of shoes of the chunk.
+        :param result: The results of the chunk.
+        """
+        self.accumulator.merge(result)
+        self.chunks += 1
+        self.shoes += shoes
+        self.chunk_profits.append(result.profit)
+        self.chunk_hands.append(result.hands)
+
+    def save(self, force: bool = True) -> None:
+        """
+        Save the checkpoint to its directory, replacing the previous one at once, so that a crash while saving keeps it.
+
+        :param force: Whether to save even if the last save is more recent than `CHECKPOINT_INTERVAL`.
+        """
+        if self.directory is None or not force and time.monotonic() - self._last_save < CHECKPOINT_INTERVAL:
+            return
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump(self, file, protocol=4)
+        os.replace(temporary, os.path.join(self.directory, CHECKPOINT_FILE))
+        self._last_save = time.monotonic()
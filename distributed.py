@@ -0,0 +1,361 @@
+"""Play the chunks of a run on worker processes of other machines, handed out by a coordinator over TCP."""
+from __future__ import annotations
+
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Iterable, Iterator
+import argparse
+import atexit
+import collections
+import importlib
+import ipaddress
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+
+"""The key the coordinator and the workers authenticate each other with on the loopback interface, unless
+`BLACKJACK_AUTHKEY` is set. The messages are pickled, so anyone who can connect with the key can run code on the other
+side: on other addresses, the key must be set."""
+DEFAULT_AUTHKEY = b"blackjack-strategy-simulator"
+
+"""How long the coordinator waits for a worker before warning that none is connected, in seconds."""
+WORKER_WAIT_WARNING = 10.
+
+
+def is_loopback(host: str) -> bool:
+    """
+    Check whether a host is on the loopback interface, i.e. only reachable from this machine.
+
+    :param host: The name or the IP address of the host.
+    :return: Whether the host resolves to a loopback address.
+    """
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def get_authkey(host: str = "127.0.0.1") -> bytes:
+    """
+    Get the key the coordinator and the workers authenticate each other with.
+
+    :param host: The host the coordinator listens on or the workers connect to.
+    :return: The value of the `BLACKJACK_AUTHKEY` environment variable, or `DEFAULT_AUTHKEY` on the loopback interface.
+    """
+    key = os.environ.get("BLACKJACK_AUTHKEY")
+    if key:
+        return key.encode()
+    if not is_loopback(host):
+        raise ValueError(f"Set the BLACKJACK_AUTHKEY environment variable to the same secret key on every machine to "
+                         f"use {host}: the default key is public, and anyone with the key can run code on the "
+                         f"coordinator and the workers.")
+    return DEFAULT_AUTHKEY
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """
+    Read the address of a coordinator.
+
+    :param address: The address, as `HOST:PORT` (e.g. `0.0.0.0:5870` to listen on every interface, or
+        `192.168.1.10:5870` to connect to it).
+    :return: The host and the port.
+    """
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"The address {address!r} isn't of the form HOST:PORT.")
+    return host, int(port)
+
+
+def function_reference(function: Callable[[Any], Any]) -> tuple[str, str]:
+    """
+    Get how a worker finds a function, also when it is defined in the script the coordinator runs.
+
+    :param function: A function defined at the top level of a module.
+    :return: The name of the module and the name of the function.
+    """
+    module = function.__module__
+    if module == "__main__":
+        main = sys.modules["__main__"]
+        spec = getattr(main, "__spec__", None)
+        module = spec.name if spec is not None else os.path.splitext(os.path.basename(str(main.__file__)))[0]
+    return module, function.__qualname__
+
+
+def resolve_function(reference: tuple[str, str]) -> Callable[[Any], Any]:
+    """
+    Find a function from its reference.
+
+    :param reference: The name of the module and the name of the function (see `function_reference`).
+    :return: The function.
+    """
+    module, name = reference
+    function: Callable[[Any], Any] = getattr(importlib.import_module(module), name)
+    return function
+
+
+class _Job:
+    """The tasks of one call of `Coordinator.play` and the results received so far."""
+
+    def __init__(self, function: tuple[str, str], tasks: list[Any]) -> None:
+        """
+        Start a job.
+
+        :param function: The reference of the function the workers call on every task (see `function_reference`).
+        :param tasks: The tasks, in order.
+        """
+        self.function = function
+        self.tasks = tasks
+        self.issued = 0  # How many tasks have been handed out, not counting those handed out again.
+        self.next = 0  # The index of the next result to yield.
+        self.retry: collections.deque[int] = collections.deque()  # The tasks of the workers that were lost.
+        self.results: dict[int, Any] = {}
+        self.error: str | None = None
+
+
+class Coordinator:
+    """
+    Hand out tasks to the workers that connect to it, one task per worker at a time, and collect the results in order.
+
+    Workers connect with `work` (e.g. `python distributed.py HOST:PORT --cores 6` on every machine), and can join or
+    leave at any time. The task of a worker that is lost is handed out again. Only a few tasks are handed out ahead of
+    the results taken, so that nothing more is played once the caller stops iterating.
+    """
+
+    def __init__(self, address: tuple[str, int], authkey: bytes | None = None) -> None:
+        """
+        Listen for workers.
+
+        :param address: The host and the port to listen on. With port 0, a free port is chosen (see `address`).
+        :param authkey: The key the workers authenticate with. Defaults to `get_authkey`, which only has a default on the
+            loopback interface.
+        """
+        self._listener = Listener(address, authkey=authkey if authkey is not None else get_authkey(address[0]))
+        self.address: tuple[str, int] = self._listener.address
+        self.workers = 0
+        self._condition = threading.Condition()
+        self._job: _Job | None = None
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def play(self, function: Callable[[Any], Any], tasks: Iterable[Any]) -> Iterator[Any]:
+        """
+        Call a function on every task on the workers.
+
+        :param function: The function, defined at the top level of a module the workers can import.
+        :param tasks: The arguments of the function, picklable.
+        :return: An iterator over the results, in the order of the tasks.
+        """
+        job = _Job(function_reference(function), list(tasks))
+        with self._condition:
+            self._job = job
+            self._condition.notify_all()
+        try:
+            waiting_since = time.monotonic()
+            warned = False
+            while job.next < len(job.tasks):
+                with self._condition:
+                    while job.next not in job.results and job.error is None:
+                        self._condition.wait(1.)
+                        if self.workers:
+                            waiting_since = time.monotonic()
+                        elif not warned and time.monotonic() - waiting_since >= WORKER_WAIT_WARNING:
+                            logging.warning(f"no worker is connected to {self.address[0]}:{self.address[1]}.")
+                            warned = True
+                    if job.error is not None:
+                        raise RuntimeError(f"A worker failed:\n{job.error}")
+                    result = job.results.pop(job.next)
+                    job.next += 1
+                    self._condition.notify_all()
+                yield result
+        finally:
+            with self._condition:
+                if self._job is job:
+                    self._job = None
+
+    def close(self) -> None:
+        """Stop listening and disconnect the workers. The workers stop once their task is done."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._listener.close()
+
+    def _accept(self) -> None:
+        """Accept the connections of the workers, each served by its own thread."""
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except multiprocessing.AuthenticationError:
+                logging.warning("a worker failed to authenticate.")
+                continue
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue  # The worker disconnected during the handshake.
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: Connection) -> None:
+        """
+        Hand out the tasks to a worker until it is lost or the coordinator is closed.
+
+        :param connection: The connection to the worker.
+        """
+        with self._condition:
+            self.workers += 1
+            self._condition.notify_all()
+        try:
+            while True:
+                with self._condition:
+                    taken = self._take()
+                if taken is None:
+                    return
+                job, index = taken
+                try:
+                    connection.send((job.function, job.tasks[index]))
+                    succeeded, result = connection.recv()
+                except (OSError, EOFError):
+                    with self._condition:
+                        job.retry.append(index)
+                        self._condition.notify_all()
+                    logging.warning("a worker was lost. Its task is handed out again.")
+                    return
+                with self._condition:
+                    if succeeded:
+                        job.results[index] = result
+                    else:
+                        job.error = result
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self.workers -= 1
+            connection.close()
+
+    def _take(self) -> tuple[_Job, int] | None:
+        """
+        Wait for a task to hand out. Must be called with the condition held.
+
+        :return: The job and the index of the task, or None if the coordinator is closed.
+        """
+        while not self._closed:
+            job = self._job
+            if job is not None and job.error is None:
+                if job.retry:
+                    return job, job.retry.popleft()
+                # Two tasks per worker ahead of the results taken, like the local pool.
+                if job.issued < len(job.tasks) and job.issued - job.next < 2 * self.workers:
+                    job.issued += 1
+                    return job, job.issued - 1
+            self._condition.wait()
+        return None
+
+
+_coordinator: Coordinator | None = None
+_coordinator_address = ""
+
+
+def get_coordinator(address: str) -> Coordinator:
+    """
+    Get the coordinator listening on an address.
+
+    The coordinator is kept between calls, so that the workers stay connected between runs.
+
+    :param address: The address to listen on, as `HOST:PORT`. If the coordinator listens on another address, a new
+        coordinator is started.
+    :return: The coordinator.
+    """
+    global _coordinator, _coordinator_address
+    if _coordinator is None or _coordinator_address != address:
+        if _coordinator is None:
+            atexit.register(close_coordinator)
+        close_coordinator()
+        _coordinator = Coordinator(parse_address(address))
+        _coordinator_address = address
+        logging.info(f"waiting for workers on {address}.")
+    return _coordinator
+
+
+def close_coordinator() -> None:
+    """Stop the coordinator, if it has been started."""
+    global _coordinator, _coordinator_address
+    if _coordinator is not None:
+        _coordinator.close()
+        _coordinator = None
+        _coordinator_address = ""
+
+
+def work(address: tuple[str, int], authkey: bytes | None = None, wait: float = 0.) -> int:
+    """
+    Connect to a coordinator and play the tasks it hands out until it disconnects.
+
+    :param address: The host and the port of the coordinator.
+    :param authkey: The key to authenticate with. Defaults to `get_authkey`.
+    :param wait: How long to keep trying to connect if the coordinator isn't listening yet, in seconds.
+    :return: The number of tasks played.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            connection = Client(address, authkey=authkey if authkey is not None else get_authkey(address[0]))
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(.5)
+    played = 0
+    functions: dict[tuple[str, str], Callable[[Any], Any]] = {}
+    with connection:
+        while True:
+            try:
+                reference, task = connection.recv()
+            except (OSError, EOFError):
+                return played
+            try:
+                if reference not in functions:
+                    functions[reference] = resolve_function(reference)
+                reply = True, functions[reference](task)
+            except Exception:
+                reply = False, traceback.format_exc()
+            try:
+                connection.send(reply)
+            except OSError:
+                return played
+            played += 1
+
+
+def start_workers(address: tuple[str, int], cores: int, authkey: bytes | None = None,
+                  wait: float = 0.) -> list[multiprocessing.Process]:
+    """
+    Start worker processes connected to a coordinator.
+
+    :param address: The host and the port of the coordinator.
+    :param cores: How many worker processes to start.
+    :param authkey: The key to authenticate with. Defaults to `get_authkey`.
+    :param wait: How long every worker keeps trying to connect if the coordinator isn't listening yet, in seconds.
+    :return: The processes. They stop when the coordinator disconnects them.
+    """
+    processes = [multiprocessing.Process(target=work, args=(address, authkey, wait), daemon=True)
+                 for _ in range(cores)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
+    parser = argparse.ArgumentParser(prog='EV worker',
+                                     description='Play the chunks of shoes handed out by a coordinator, started with '
+                                                 '`python expected_value.py --listen HOST:PORT`.')
+    parser.add_argument("address", help='The address of the coordinator, as HOST:PORT.')
+    parser.add_argument("--cores", default=1, type=int,
+                        help='How many worker processes to start. (default: 1, use -1 for all cores)')
+    parser.add_argument("--wait", default=60., type=float,
+                        help='How long to keep trying to connect if the coordinator isn\'t listening yet, in seconds. '
+                             '(default: 60)')
+    args = parser.parse_args()
+    cores_used = args.cores if args.cores != -1 else multiprocessing.cpu_count()
+    coordinator_address = parse_address(args.address)
+    for worker in start_workers(coordinator_address, cores_used, get_authkey(coordinator_address[0]), args.wait):
+        worker.join()
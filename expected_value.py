@@ -2,19 +2,40 @@
 from __future__ import annotations
 
 import argparse
-import inspect
+import atexit
+import collections
+import itertools
 import logging
 import matplotlib.pyplot as plt
 import multiprocessing
+import multiprocessing.pool
 import numpy as np
 import os
 import pandas as pd
 import random
-from typing import Iterable
-
-from utils import get_args_info, get_cards_seen, get_hilo_running_count, DECK, readable_number
-from action_strategies import BaseMover
-from betting_strategies import BaseBetter
+import shutil
+import tempfile
+import time
+from typing import Any, Iterable, Iterator, MutableSequence, Sequence, cast
+
+from utils import get_args_info, ShoeState
+from action_strategies import BaseMover, CompiledStrategy
+from betting_strategies import BaseBetter, SIT_OUT
+from accumulators import ResultAccumulator, TRUE_COUNT_BINS, batch_means
+from bankroll import format_bankroll, simulate_bankroll_by_true_count
+from batch_expected_value import batch_expected_value
+from bet_ramps import evaluate_betters
+from hand_records import HandRecordWriter, concatenate_records, hand_flags, read_hand_records
+from hand_state import (CARDS_SHIFT, EMPTY, MAX_CARDS, RANK_SHIFT, SOFT, TRANSITIONS, VALUE_MASK, card_number,
+                        from_cards, pair_rank)
+from shoe_generators import SHOES_PER_REFILL, ShuffledShoes
+from other_players import basic_strategy, check_other_players, play_other_player
+from simulation_kernel import Kernel, NUMBA_AVAILABLE, supports
+from telemetry import ChunkReport, ProgressMonitor
+from profiling import PhaseProfile, ProfilingMover, ProfilingShoeState
+from checkpoints import Checkpoint, cache_directory, config_fingerprint
+from distributed import get_coordinator
+from tracing import Tracer, TracingMover
 import betting_strategies
 import action_strategies
 
@@ -29,6 +50,7 @@ class Hand:
         :param cards: The cards the hand started with.
         """
         self.cards = list(cards)
+        self.state = from_cards(self.cards)
 
     def add_card(self, card: int) -> None:
         """
@@ -37,6 +59,7 @@ class Hand:
         :param card: The new card to add for the hand (an ace is symbolised as 11).
         """
         self.cards.append(card)
+        self.state = TRANSITIONS[self.state << 4 | card]
 
     def value_ace(self) -> tuple[int, int]:
         """
@@ -44,12 +67,7 @@ class Hand:
 
         :return: The hand's value and how many aces are counted as 11 (0 or 1).
         """
-        value = sum(self.cards)
-        aces = self.cards.count(11)
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
-        return value, aces
+        return self.state & VALUE_MASK, (self.state & SOFT) >> 5
 
     def aces(self) -> int:
         """
@@ -57,7 +75,7 @@ class Hand:
 
         :return: The number of aces counted as 11.
         """
-        return self.value_ace()[1]
+        return (self.state & SOFT) >> 5
 
     def value(self) -> int:
         """
@@ -65,17 +83,21 @@ class Hand:
 
         :return: The hand's value.
         """
-        return self.value_ace()[0]
+        return self.state & VALUE_MASK
 
 
-def get_card_from_shoe(shoe: list[int]) -> int:
+def get_card_from_shoe(shoe: MutableSequence[int], shoe_state: ShoeState | None = None, hidden: bool = False) -> int:
     """
     Get a card from the shoe. Always returns the last item from the shoe, so the shoe must be shuffled before.
 
     :param shoe: The shoe to get a card from.
+    :param shoe_state: The state of the shoe, updated with the card dealt.
+    :param hidden: Whether the card is dealt face down (e.g. the dealer's down card).
     :return: The card we got from the shoe.
     """
     card = shoe.pop()
+    if shoe_state is not None:
+        shoe_state.deal(card, hidden)
     return card
 
 
@@ -134,30 +156,259 @@ def get_mover_and_better(mover_name: str, better_name: str
     return mover_class, better_class
 
 
-def play_dealer(dealer_cards: Iterable[int], shoe: list[int], dealer_stands_soft_17: bool) -> int:
+def play_dealer(dealer_cards: Iterable[int], shoe: MutableSequence[int], dealer_stands_soft_17: bool,
+                shoe_state: ShoeState | None = None) -> int:
     """
     Play the dealers hand to get its final value.
 
     :param dealer_cards: The cards the dealer already has.
     :param shoe: The shoe.
     :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param shoe_state: The state of the shoe, updated with the cards the dealer draws.
     :return: The final value of the dealer's hand. If the dealer busted, the value is 0.
     """
-    dealer = Hand(dealer_cards)
-    while dealer.value() < 17 or not dealer_stands_soft_17 and dealer.value() == 17 and dealer.aces():
-        dealer.add_card(get_card_from_shoe(shoe))
-    dealer_value = dealer.value()
-    logging.debug("dealer cards are: {}".format(dealer.cards))
-    logging.debug("dealer_value = {}".format(dealer_value))
+    state = from_cards(dealer_cards)
+    while state & VALUE_MASK < 17 or not dealer_stands_soft_17 and state & (VALUE_MASK | SOFT) == 17 | SOFT:
+        state = TRANSITIONS[state << 4 | get_card_from_shoe(shoe, shoe_state)]
+    dealer_value = state & VALUE_MASK
     return dealer_value if dealer_value <= 21 else 0
 
 
+"""A hand of a spot waiting for the dealer: the value and the number of bets that are compared with the dealer's."""
+OpenHand = tuple[int, int]
+
+
+class RoundEngine:
+    """
+    Play our spots of a round with one state machine, which every simulation of `expected_value` runs on.
+
+    The hands of a spot are played in slots allocated once for all the rounds: the cards, the state (see `hand_state`)
+    and the number of bets of every hand. A split leaves its second hand on a fixed-size stack of hands waiting for
+    their second card, which is played once the first hand is over, so the cards are drawn in the same order as at a
+    table. The rules are the same as in `batch_expected_value._play_hands`: every hand can be split again while it has
+    splits remaining, split aces get one card each, doubling after a split needs DAS, and surrendering and insurance
+    are only possible on the first decision.
+    """
+
+    def __init__(self, action_class: action_strategies.BaseMover, deck_number: int,
+                 dealer_peeks_for_blackjack: bool = True, das: bool = True, dealer_stands_soft_17: bool = True,
+                 surrender_allowed: bool = False, splits: int = 3, profile: PhaseProfile | None = None) -> None:
+        """
+        Set the rules of the game and allocate the hands.
+
+        :param action_class: The class that chooses the action.
+        :param deck_number: The number of decks in the initial shoe.
+        :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+        :param das: Whether we can double after splitting.
+        :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+        :param surrender_allowed: Whether the game rules allow surrendering.
+        :param splits: How many times a hand can be split (every hand split from it can be split again while the
+            splits last).
+        :param profile: If given, the time of the player's and the dealer's play-outs is counted in it (see
+            `profiling.PhaseProfile`).
+        """
+        self.action_class = action_class
+        self.deck_number = deck_number
+        self.dealer_peeks_for_blackjack = dealer_peeks_for_blackjack
+        self.das = das
+        self.dealer_stands_soft_17 = dealer_stands_soft_17
+        self.surrender_allowed = surrender_allowed
+        self.splits = splits
+        self.tracing_mover = action_class if isinstance(action_class, TracingMover) else None
+        self.profile = profile
+        self.hand_cards: list[list[int]] = [[] for _ in range(2 ** splits)]
+        self.states = [EMPTY] * 2 ** splits
+        self.bets = [1] * 2 ** splits
+        self._pending = [0] * splits  # The splits remaining of the hands waiting for their second card.
+
+    def play_hands(self, cards: list[int], dealer_up_card: int, shoe: MutableSequence[int], shoe_state: ShoeState,
+                   action: str | None = None) -> int:
+        """
+        Play a hand and every hand split from it, but don't play the dealer.
+
+        :param cards: The cards of the hand.
+        :param dealer_up_card: The dealer's up card.
+        :param shoe: The shoe. Cards are drawn from its end.
+        :param shoe_state: The state of the shoe, updated with the cards drawn.
+        :param action: The action already chosen for the first decision (see `play_spot`). Asked to the mover if not
+            given.
+        :return: The number of hands played. The cards, the state and the number of bets of every hand are in the first
+            slots of `hand_cards`, `states` and `bets`.
+        """
+        get_move = self.action_class.get_move
+        deck_number = self.deck_number
+        dealer_peeks_for_blackjack = self.dealer_peeks_for_blackjack
+        das = self.das
+        dealer_stands_soft_17 = self.dealer_stands_soft_17
+        hand_cards = self.hand_cards
+        bets = self.bets
+        pending = self._pending
+        pending_number = 0
+        splits_remaining = self.splits
+        split_rank = 0  # The rank of the pair split, 0 until the hand is split.
+        hand = 0
+        current = hand_cards[0]
+        current[:] = cards
+        state = from_cards(cards)
+        bets[0] = 1
+        while True:
+            if state & VALUE_MASK <= 21:
+                two_cards = (state >> CARDS_SHIFT) & MAX_CARDS == 2
+                pair = state >> RANK_SHIFT if two_cards else 0
+                can_split = splits_remaining > 0 and pair != 0 and (pair != 11 or not split_rank)
+                can_double = two_cards and (das or not split_rank)
+                if action is None:
+                    action = get_move(state & VALUE_MASK, state & SOFT != 0, dealer_up_card, can_double, can_split,
+                                      False, False, current, shoe_state, deck_number, dealer_peeks_for_blackjack, das,
+                                      dealer_stands_soft_17)[0]
+                if action == "h" or action == "d" and can_double:
+                    card = shoe.pop()
+                    shoe_state.deal(card)
+                    current.append(card)
+                    state = TRANSITIONS[state << 4 | card]
+                    if action == "h":
+                        action = None
+                        continue
+                    bets[hand] = 2
+                elif action == "p" and can_split:
+                    split_rank = pair
+                    splits_remaining -= 1
+                    current.pop()
+                    card = shoe.pop()
+                    shoe_state.deal(card)
+                    current.append(card)
+                    state = TRANSITIONS[TRANSITIONS[pair] << 4 | card]
+                    if pair == 11:  # Split aces get one card each, and can't be played any further.
+                        self.states[hand] = state
+                        hand += 1
+                        current = hand_cards[hand]
+                        current.clear()
+                        card = shoe.pop()
+                        shoe_state.deal(card)
+                        current.append(11)
+                        current.append(card)
+                        self.states[hand] = TRANSITIONS[TRANSITIONS[pair] << 4 | card]
+                        bets[hand] = 1
+                        return hand + 1
+                    pending[pending_number] = splits_remaining
+                    pending_number += 1
+                    action = None
+                    continue
+                elif action != "s":
+                    raise ValueError(f"invalid action: {action}.")
+            # The hand is over: start the last hand split, if any.
+            self.states[hand] = state
+            hand += 1
+            if not pending_number:
+                return hand
+            pending_number -= 1
+            splits_remaining = pending[pending_number]
+            current = hand_cards[hand]
+            current.clear()
+            card = shoe.pop()
+            shoe_state.deal(card)
+            current.append(split_rank)
+            current.append(card)
+            state = TRANSITIONS[TRANSITIONS[split_rank] << 4 | card]
+            bets[hand] = 1
+            action = None
+
+    def play_spot(self, cards: list[int], dealer_up_card: int, dealer_down_card: int, shoe: MutableSequence[int],
+                  shoe_state: ShoeState) -> tuple[float, list[OpenHand], bool]:
+        """
+        Play the hand of one spot, but don't play the dealer.
+
+        :param cards: The cards in our hand.
+        :param dealer_up_card: The dealer's up card.
+        :param dealer_down_card: The dealer's down card.
+        :param shoe: The shoe.
+        :param shoe_state: The state of the shoe, with the dealer's down card still hidden.
+        :return: The profit/loss that doesn't depend on the dealer's hand (insurance, blackjacks, surrender and busts),
+            the hands to compare with the dealer's, and whether the dealer has to play for this spot.
+        """
+        dealer_peeks_for_blackjack = self.dealer_peeks_for_blackjack
+        state = from_cards(cards)
+        pair = pair_rank(state)
+        can_split = self.splits > 0 and pair != 0
+        can_double = card_number(state) == 2
+        can_insure = dealer_up_card == 11
+        action, insure = self.action_class.get_move(state & VALUE_MASK, state & SOFT != 0, dealer_up_card,
+                                                    can_double, can_split, self.surrender_allowed, can_insure, cards,
+                                                    shoe_state, self.deck_number, dealer_peeks_for_blackjack, self.das,
+                                                    self.dealer_stands_soft_17)
+        profit = 0.
+        if insure and can_insure:
+            profit = 1 if dealer_down_card == 10 else -.5
+
+        dealer_has_blackjack = dealer_up_card + dealer_down_card == 21
+        player_has_blackjack = cards[0] + cards[1] == 21
+        if player_has_blackjack:
+            return profit + (0 if dealer_has_blackjack else 1.5), [], False
+        if dealer_has_blackjack and dealer_peeks_for_blackjack:
+            return profit - 1, [], False
+        if action == "u" and self.surrender_allowed:
+            return profit - .5, [], False
+
+        # Without the peek, the hands are played out, and all their bets are lost to a dealer blackjack.
+        player_loses_all_bets = dealer_has_blackjack
+        states = self.states
+        bets = self.bets
+        hands = []
+        for hand in range(self.play_hands(cards, dealer_up_card, shoe, shoe_state, action)):
+            value = states[hand] & VALUE_MASK
+            if value > 21 or player_loses_all_bets:
+                profit -= bets[hand]
+            else:
+                hands.append((value, bets[hand]))
+        return profit, hands, bool(hands)
+
+    def simulate_spots(self, spots: list[list[int]], dealer_up_card: int, dealer_down_card: int,
+                       shoe: MutableSequence[int], shoe_state: ShoeState, dealer_plays: bool = False) -> list[float]:
+        """
+        Play one round with one or more spots.
+
+        The spots are played in order, then the dealer plays once for all of them.
+
+        :param spots: The cards of every spot.
+        :param dealer_up_card: The dealer's up card.
+        :param dealer_down_card: The dealer's down card.
+        :param shoe: The shoe.
+        :param shoe_state: The state of the shoe, with the dealer's down card still hidden.
+        :param dealer_plays: Whether the dealer plays even when our hands don't need it, because other players still
+            have hands standing.
+        :return: The profit/loss of every spot.
+        """
+        profile = self.profile
+        if profile is not None:
+            profile.enter("player")
+        profits = []
+        open_hands = []
+        for cards in spots:
+            if self.tracing_mover is not None:
+                self.tracing_mover.new_spot()
+            profit, hands, needs_dealer = self.play_spot(cards, dealer_up_card, dealer_down_card, shoe, shoe_state)
+            profits.append(profit)
+            open_hands.append(hands)
+            dealer_plays = dealer_plays or needs_dealer
+        if profile is not None:
+            profile.exit()
+        if not dealer_plays:
+            return profits
+        if profile is not None:
+            profile.enter("dealer")
+        dealer_value = play_dealer((dealer_up_card, dealer_down_card), shoe, self.dealer_stands_soft_17, shoe_state)
+        if profile is not None:
+            profile.exit()
+        return [settle_spot(profit, hands, dealer_value) if hands else profit
+                for profit, hands in zip(profits, open_hands)]
+
+
 def play_hand(action_class: action_strategies.BaseMover,
-              hand_cards: list[list[int]], dealer_up_card: int, dealer_down_card: int, shoe: list[int],
+              hand_cards: list[list[int]], dealer_up_card: int, dealer_down_card: int, shoe: MutableSequence[int],
               splits_remaining: int, deck_number: int, dealer_peeks_for_blackjack: bool = True, das: bool = True,
-              dealer_stands_soft_17: bool = True) -> list[list[int]]:
+              dealer_stands_soft_17: bool = True, shoe_state: ShoeState | None = None) -> list[list[int]]:
     """
-    Play hands but don't play the dealer.
+    Play hands but don't play the dealer, with a `RoundEngine`.
 
     :param action_class: The class that chooses the action.
     :param hand_cards: The cards in our hand.
@@ -169,72 +420,106 @@ def play_hand(action_class: action_strategies.BaseMover,
     :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
     :param das: Whether we can double after splitting.
     :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
-    :return: The hands played out.
+    :param shoe_state: The state of the shoe, with the dealer's down card still hidden. Built from `shoe` if not given.
+    :return: The cards of the hands played out. A doubled hand is in the list twice, once per bet.
     """
+    if shoe_state is None:
+        shoe_state = ShoeState.from_shoe(deck_number, shoe, hidden=[dealer_down_card])
+    engine = RoundEngine(action_class, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17,
+                         splits=splits_remaining)
     done_hands = []
-    for hand_index, cards in enumerate(hand_cards):
-        if Hand(cards).value() > 21:
-            done_hands.append(cards)
-            continue
-        can_split = (splits_remaining > 0 and len(cards) == 2 and cards[0] == cards[1]
-                     and (not cards[0] == 11 or splits_remaining == 3))
-        can_double = len(cards) == 2 and (das or splits_remaining == 3)
-        cards_seen = get_cards_seen(deck_number, shoe)
-        cards_seen.remove(dealer_down_card)
-        hand = Hand(cards)
-        initial_hand_value, initial_hand_has_ace = hand.value_ace()
-        action, insure = action_class.get_move(initial_hand_value, bool(initial_hand_has_ace), dealer_up_card,
-                                               can_double,
-                                               can_split, False, False, cards, cards_seen, deck_number,
-                                               dealer_peeks_for_blackjack, das, dealer_stands_soft_17)
-
-        if action == "s":
-            logging.debug("[play_hand] player stands.")
-            done_hands.append(cards)
-
-        elif action == "d" and can_double:
-            card = get_card_from_shoe(shoe)
-            hand.add_card(card)
-            logging.debug("[play_hand] player doubles down and gets card {}. Current hand is {}.".format(card, hand.cards))
-            done_hands.append(hand.cards)
-            done_hands.append(hand.cards)  # Add the same hand twice instead of doubling the bet.
-
-        elif action == "h":
-            card = get_card_from_shoe(shoe)
-            hand.add_card(card)
-            logging.debug("[play_hand] player hits and gets card {}. Current hand is {}.".format(card, hand.cards))
-            done_hands.append(play_hand(action_class, [hand.cards], dealer_up_card, dealer_down_card, shoe,
-                                        0, deck_number, dealer_peeks_for_blackjack, das,
-                                        dealer_stands_soft_17)[0])
-
-        elif action == "p" and can_split:
-            hand1 = Hand([hand.cards[0]])
-            hand2 = Hand([hand.cards[1]])
-            card1 = get_card_from_shoe(shoe)
-            hand1.add_card(card1)
-            logging.debug("[play_hand] player splits and gets card {} for the 1st hand. Current hand is {}.".format(card1, hand1.cards))
-            done_hands.extend(play_hand(action_class, [hand1.cards] + hand_cards[hand_index + 1:],
-                                        dealer_up_card, dealer_down_card, shoe, splits_remaining - 1, deck_number,
-                                        dealer_peeks_for_blackjack, das, dealer_stands_soft_17))
-            card2 = get_card_from_shoe(shoe)
-            hand2.add_card(card2)
-            logging.debug("[play_hand] player splits and gets card {} for the 2nd hand. Current hand is {}.".format(card2, hand2.cards))
-            done_hands.extend(play_hand(action_class, [hand2.cards] + hand_cards[hand_index + 1:],
-                                        dealer_up_card, dealer_down_card, shoe, splits_remaining - 1, deck_number,
-                                        dealer_peeks_for_blackjack, das, dealer_stands_soft_17))
-            break
-
-        else:
-            raise ValueError(f"invalid action: {action}.")
-    logging.debug("[play_hand] done. return with hands = {}".format(done_hands))
+    for cards in hand_cards:
+        for hand in range(engine.play_hands(cards, dealer_up_card, shoe, shoe_state)):
+            done_hands.extend([engine.hand_cards[hand].copy()] * engine.bets[hand])
     return done_hands
 
 
+def settle_spot(profit: float, hands: list[OpenHand], dealer_value: int) -> float:
+    """
+    Compare the hands of a spot with the dealer's hand.
+
+    :param profit: The profit/loss of the spot that doesn't depend on the dealer's hand.
+    :param hands: The hands to compare with the dealer's.
+    :param dealer_value: The final value of the dealer's hand (0 if the dealer busted).
+    :return: The profit/loss of the spot.
+    """
+    for value, bets in hands:
+        if value > 21 or dealer_value > value:
+            profit -= bets
+        elif value > dealer_value:
+            profit += bets
+    return profit
+
+
+def play_spot(action_class: action_strategies.BaseMover,
+              cards: list[int], dealer_up_card: int,
+              dealer_down_card: int, shoe: MutableSequence[int],
+              splits_remaining: int, deck_number: int, dealer_peeks_for_blackjack: bool = True, das: bool = True,
+              dealer_stands_soft_17: bool = True, surrender_allowed: bool = False,
+              shoe_state: ShoeState | None = None) -> tuple[float, list[OpenHand], bool]:
+    """
+    Play the hand of one spot, but don't play the dealer (see `RoundEngine.play_spot`).
+
+    :param action_class: The class that chooses the action.
+    :param cards: The cards in our hand.
+    :param dealer_up_card: The dealer's up card.
+    :param dealer_down_card: The dealer's down card.
+    :param shoe: The shoe.
+    :param splits_remaining: How many more splits we can do.
+    :param deck_number: The number of decks in the initial shoe.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param shoe_state: The state of the shoe, with the dealer's down card still hidden. Built from `shoe` if not given.
+    :return: The profit/loss that doesn't depend on the dealer's hand (insurance, blackjacks, surrender and busts), the
+        hands to compare with the dealer's, and whether the dealer has to play for this spot.
+    """
+    if shoe_state is None:
+        shoe_state = ShoeState.from_shoe(deck_number, shoe, hidden=[dealer_down_card])
+    engine = RoundEngine(action_class, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17,
+                         surrender_allowed, splits_remaining)
+    return engine.play_spot(cards, dealer_up_card, dealer_down_card, shoe, shoe_state)
+
+
+def simulate_spots(action_class: action_strategies.BaseMover,
+                   spots: list[list[int]], dealer_up_card: int,
+                   dealer_down_card: int, shoe: MutableSequence[int],
+                   splits_remaining: int, deck_number: int, dealer_peeks_for_blackjack: bool = True, das: bool = True,
+                   dealer_stands_soft_17: bool = True, surrender_allowed: bool = False,
+                   shoe_state: ShoeState | None = None, dealer_plays: bool = False) -> list[float]:
+    """
+    Play one round with one or more spots. The spots are played in order, then the dealer plays once for all of them.
+
+    :param action_class: The class that chooses the action.
+    :param spots: The cards of every spot.
+    :param dealer_up_card: The dealer's up card.
+    :param dealer_down_card: The dealer's down card.
+    :param shoe: The shoe.
+    :param splits_remaining: How many more splits we can do in every spot.
+    :param deck_number: The number of decks in the initial shoe.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param shoe_state: The state of the shoe, with the dealer's down card still hidden. Built from `shoe` if not given.
+    :param dealer_plays: Whether the dealer plays even when our hands don't need it, because other players still have
+        hands standing.
+    :return: The profit/loss of every spot.
+    """
+    if shoe_state is None:
+        shoe_state = ShoeState.from_shoe(deck_number, shoe, hidden=[dealer_down_card])
+    engine = RoundEngine(action_class, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17,
+                         surrender_allowed, splits_remaining)
+    return engine.simulate_spots(spots, dealer_up_card, dealer_down_card, shoe, shoe_state, dealer_plays)
+
+
 def simulate_hand(action_class: action_strategies.BaseMover,
                   cards: list[int], dealer_up_card: int,
-                  dealer_down_card: int, shoe: list[int],
+                  dealer_down_card: int, shoe: MutableSequence[int],
                   splits_remaining: int, deck_number: int, dealer_peeks_for_blackjack: bool = True, das: bool = True,
-                  dealer_stands_soft_17: bool = True, surrender_allowed: bool = False) -> float:
+                  dealer_stands_soft_17: bool = True, surrender_allowed: bool = False,
+                  shoe_state: ShoeState | None = None, dealer_plays: bool = False) -> float:
     """
     Play one hand.
 
@@ -249,199 +534,71 @@ def simulate_hand(action_class: action_strategies.BaseMover,
     :param das: Whether we can double after splitting.
     :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
     :param surrender_allowed: Whether the game rules allow surrendering.
-    :return: The profit/loss from the hand, and how many times we split.
-    """
-    can_split = (splits_remaining > 0 and len(cards) == 2 and cards[0] == cards[1]
-                 and (not cards[0] == 11 or splits_remaining == 3))
-    can_double = len(cards) == 2 and (das or splits_remaining == 3)
-    can_surrender_now = surrender_allowed
-    can_insure = dealer_up_card == 11
-    insurance_profit = 0.
-    dealer_has_blackjack = dealer_up_card + dealer_down_card == 21
-    player_has_blackjack = cards[0] + cards[1] == 21
-    player_loses_all_bets = dealer_has_blackjack and not dealer_peeks_for_blackjack and not player_has_blackjack
-    cards_seen = get_cards_seen(deck_number, shoe)
-    cards_seen.remove(dealer_down_card)
-    hand = Hand(cards)
-    initial_hand_value, initial_hand_has_ace = hand.value_ace()
-    action, insure = action_class.get_move(initial_hand_value, bool(initial_hand_has_ace), dealer_up_card, can_double,
-                                           can_split, can_surrender_now, can_insure, cards, cards_seen, deck_number,
-                                           dealer_peeks_for_blackjack, das, dealer_stands_soft_17)
-
-    if insure and can_insure:
-        logging.debug("play takes insurance.")
-        insurance_profit = 1 if dealer_down_card == 10 else -.5
-
-    if dealer_peeks_for_blackjack:
-        if dealer_has_blackjack and player_has_blackjack:  # Push
-            logging.debug("dealer and player get natural blackjack. Push...")
-            return 0 + insurance_profit
-        elif dealer_has_blackjack:  # Dealer blackjack
-            logging.debug("dealer gets natural blackjack. Player loses...")
-            return -1 + insurance_profit
-        elif player_has_blackjack:  # Player blackjack
-            logging.debug("players gets natural blackjack. Player wins 3 to 2...")
-            return 1 * 3 / 2 + insurance_profit
-    else:
-        if player_has_blackjack and dealer_has_blackjack:
-            logging.debug("dealer and player get natural blackjack (no peeking). Push...")
-            return 0 + insurance_profit
-        elif player_has_blackjack:
-            logging.debug("players gets natural blackjack (no peeking). Player wins 3 to 2...")
-            return 1 * 3 / 2 + insurance_profit
-
-    if action == "u" and can_surrender_now:
-        logging.debug("player surrenders...")
-        return -.5 + insurance_profit
-
-    elif action == "s":
-        logging.debug("player stands...")
-        dealer_value = play_dealer((dealer_up_card, dealer_down_card), shoe, dealer_stands_soft_17)
-        if player_loses_all_bets:
-            logging.debug("player loses: {} to {}".format(initial_hand_value, dealer_value))
-            return -1 + insurance_profit
-        if initial_hand_value > dealer_value:
-            logging.debug("player wins: {} to {}".format(initial_hand_value, dealer_value))
-            return 1 + insurance_profit
-        elif initial_hand_value < dealer_value:
-            logging.debug("player loses: {} to {}".format(initial_hand_value, dealer_value))
-            return -1 + insurance_profit
-        logging.debug("push: {} to {}".format(initial_hand_value, dealer_value))
-        return 0 + insurance_profit
-
-    elif action == "d" and can_double:
-        card = get_card_from_shoe(shoe)
-        logging.debug("player doubling... get card {}".format(card))
-        hand.add_card(card)
-        if player_loses_all_bets:
-            logging.debug("player loses all bets")
-            return -2 + insurance_profit
-        if hand.value() > 21:
-            logging.debug("player busted at {}".format(hand.value()))
-            return -2 + insurance_profit
-        dealer_value = play_dealer((dealer_up_card, dealer_down_card), shoe, dealer_stands_soft_17)
-        if hand.value() > dealer_value:
-            logging.debug("player wins {} to {}".format(hand.value(), dealer_value))
-            return +2 + insurance_profit
-        elif hand.value() < dealer_value:
-            logging.debug("player loses {} to {}".format(hand.value(), dealer_value))
-            return -2 + insurance_profit
-        logging.debug("push {} to {}".format(hand.value(), dealer_value))
-        return 0 + insurance_profit
-
-    elif action == "h":
-        card = get_card_from_shoe(shoe)
-        hand.add_card(card)
-        logging.debug("player hits ... get new card {}. Hand is {}".format(card, hand.cards))
-        if player_loses_all_bets:
-            logging.debug("player loses all bets")
-            return -1 + insurance_profit
-        if hand.value() > 21:
-            logging.debug("player busted at {}".format(hand.value()))
-            return -1 + insurance_profit
-        hand_cards = play_hand(action_class, [hand.cards], dealer_up_card, dealer_down_card, shoe,
-                               splits_remaining, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17)[0]
-        hand = Hand(hand_cards)
-        logging.debug("player keeps hitting. hand is {}".format(hand.cards))
-        if hand.value() > 21:
-            logging.debug("player busted: {}".format(hand.value()))
-            return -1 + insurance_profit
-        dealer_value = play_dealer((dealer_up_card, dealer_down_card), shoe, dealer_stands_soft_17)
-        if dealer_value > hand.value():
-            logging.debug("player gets beat {} to {}".format(hand.value(), dealer_value))
-            return -1 + insurance_profit
-        elif hand.value() > dealer_value:
-            logging.debug("player wins {} to {}".format(hand.value(), dealer_value))
-            return 1 + insurance_profit
-        logging.debug("push: {} to {}".format(hand.value(), dealer_value))
-        return 0 + insurance_profit
-
-    elif action == "p" and can_split:
-        hand1 = Hand([hand.cards[0]])
-        hand2 = Hand([hand.cards[1]])
-        if hand.cards[0] == 11:
-            logging.debug("current 10 cards of the shoe: {}".format(shoe[-10:]))
-            card = get_card_from_shoe(shoe)
-            hand1.add_card(card)
-            logging.debug("player splits AA: first new card = {}. Hand is {}".format(card, hand1.cards))
-            card = get_card_from_shoe(shoe)
-            hand2.add_card(card)
-            logging.debug("player splits AA: 2nd new card = {}. Hand is {}".format(card, hand2.cards))
-            if player_loses_all_bets:
-                logging.debug("player loses all bets AA")
-                return -2 + insurance_profit
-            dealer_value = play_dealer((dealer_up_card, dealer_down_card), shoe, dealer_stands_soft_17)
-            split_profit = 0
-            if hand1.value() > 21 or dealer_value > hand1.value():
-                logging.debug("player AA 1st hand busted or gets beat {} to {}".format(hand1.value(), dealer_value))
-                split_profit -= 1
-            elif hand1.value() > dealer_value:
-                logging.debug("player AA 1st hand wins {} to {}".format(hand1.value(), dealer_value))
-                split_profit += 1
-            if hand2.value() > 21 or dealer_value > hand2.value():
-                logging.debug("player AA 2nd hand busted or gets beat {} to {}".format(hand2.value(), dealer_value))
-                split_profit -= 1
-            elif hand2.value() > dealer_value:
-                logging.debug("player AA 2nd hand wins {} to {}".format(hand2.value(), dealer_value))
-                split_profit += 1
-            return split_profit + insurance_profit
-        logging.debug("current 10 cards of the shoe: {}".format(shoe[-10:]))
-        card1 = get_card_from_shoe(shoe)
-        hand1.add_card(card1)
-        logging.debug("1st card is popped. Card = {}. Hands = {}. remaining shoe = {}".format(card1, hand1.cards, shoe[-10:]))
-        logging.debug("player split non-AA, 1st hand gets {}".format(card1))
-        hand1_all = play_hand(action_class, [hand1.cards], dealer_up_card, dealer_down_card, shoe,
-                              splits_remaining - 1, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17)
-        card2 = get_card_from_shoe(shoe)
-        hand2.add_card(card2)
-        logging.debug("2nd card is popped. Card = {}. Hands = {}. remaining shoe = {}".format(card2, hand2.cards, shoe[-10:]))
-        logging.debug("player split non-AA, 2nd hand gets {}".format(card2))
-        hand2_all = play_hand(action_class, [hand2.cards], dealer_up_card, dealer_down_card, shoe,
-                              splits_remaining - 1, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17)
-        all_hands = hand1_all + hand2_all
-        if player_loses_all_bets:
-            logging.debug("player loses all bets")
-            return -len(all_hands) + insurance_profit
-
-        split_profit = 0
-        busted_counter = 0
-        for hand_cards in all_hands:
-            if hand.value() > 21:
-                logging.debug("player busted {} to {}".format(hand.value(), dealer_value))
-                split_profit -= 1
-                busted_counter += 1
-        if busted_counter == len(all_hands):
-            return split_profit + insurance_profit
-
-        logging.debug("player all hands are done. {} hands are: {}".format(len(all_hands), all_hands))
-        dealer_value = play_dealer((dealer_up_card, dealer_down_card), shoe, dealer_stands_soft_17)        
-        for hand_cards in all_hands:
-            hand = Hand(hand_cards)
-            if hand.value() > 21 or dealer_value > hand.value():
-                logging.debug("player busted or gets beaten {} to {}".format(hand.value(), dealer_value))
-                split_profit -= 1
-            elif hand.value() > dealer_value:
-                logging.debug("player wins {} to {}".format(hand.value(), dealer_value))
-                split_profit += 1
-            else:
-                logging.debug("push: {} to {}".format(hand.value(), dealer_value))
-                pass
-        return split_profit + insurance_profit
+    :param shoe_state: The state of the shoe, with the dealer's down card still hidden. Built from `shoe` if not given.
+    :param dealer_plays: Whether the dealer plays even when our hand doesn't need it, because other players still have
+        hands standing.
+    :return: The profit/loss from the hand.
+    """
+    return simulate_spots(action_class, [cards], dealer_up_card, dealer_down_card, shoe, splits_remaining,
+                          deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed,
+                          shoe_state, dealer_plays)[0]
+
+
+def burn_round(other_actions: list[int], shoe: MutableSequence[int], shoe_state: ShoeState, num_of_other_players: int,
+               dealer_peeks_for_blackjack: bool = True, das: bool = True, dealer_stands_soft_17: bool = True,
+               surrender_allowed: bool = False, phantom_seat: bool = False) -> None:
+    """
+    Deal a round we sit out, only to keep the count of the shoe current.
+
+    Our seat is left empty, like when back-counting: only the other players, who play with
+    `other_players.play_other_player`, and the dealer get cards. Without other players, only the dealer's two cards are
+    dealt. With `phantom_seat`, our seat is dealt and played like the seat of another player.
+
+    :param other_actions: The flat list of the action codes of the other players' strategy (see
+        `other_players.play_other_player`).
+    :param shoe: The shoe.
+    :param shoe_state: The state of the shoe, updated with every card dealt, including the dealer's down card.
+    :param num_of_other_players: The number of players in front of us.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether the players can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param phantom_seat: Whether our seat is dealt and played too.
+    """
+    seats = num_of_other_players + phantom_seat
+    first_cards = [get_card_from_shoe(shoe, shoe_state) for _ in range(seats)]
+    dealer_up_card = get_card_from_shoe(shoe, shoe_state)
+    second_cards = [get_card_from_shoe(shoe, shoe_state) for _ in range(seats)]
+    dealer_down_card = get_card_from_shoe(shoe, shoe_state, hidden=True)
+    dealer_plays = False
+    if not (dealer_peeks_for_blackjack and dealer_up_card + dealer_down_card == 21):
+        for first_card, second_card in zip(first_cards, second_cards):
+            dealer_plays |= play_other_player(other_actions, first_card, second_card, dealer_up_card, shoe,
+                                              shoe_state, das, surrender_allowed)
+    if dealer_plays:
+        play_dealer((dealer_up_card, dealer_down_card), shoe, dealer_stands_soft_17, shoe_state)
+    shoe_state.see(dealer_down_card)
+
+
+"""How many shoes `expected_value` plays between two progress reports."""
+PROGRESS_SHOES = 1_000
 
-    raise ValueError(f"invalid action: {action}.")
 
-# @profile
 def expected_value(action_class: action_strategies.BaseMover, betting_class: betting_strategies.BaseBetter,
                    simulations: int, deck_number: int = 6, shoe_penetration: float = .25,
                    dealer_peeks_for_blackjack: bool = True, das: bool = True,
                    dealer_stands_soft_17: bool = True, surrender_allowed: bool = True,
                    units: int = 200, hands_played: int = 1000,
-                   num_of_other_players: int = 0) -> tuple[float, float, float, float]:
+                   num_of_other_players: int = 0, accumulator: ResultAccumulator | None = None,
+                   progress: bool = True, tracer: Tracer | None = None, records: HandRecordWriter | None = None,
+                   other_players_strategy: CompiledStrategy | None = None, seed: int | None = None,
+                   kernel: bool | None = None, profile: PhaseProfile | None = None, phantom_seat: bool = False
+                   ) -> tuple[list[float], list[float], list[float]]:
     """
     Estimate the expected value of a strategy.
 
     :param action_class: The class that chooses the action.
-    :param betting_class: The class that chooses the bet.
+    :param betting_class: The class that chooses the bet and the number of spots.
     :param simulations: How many hands to play.
     :param deck_number: The number of decks in the initial shoe.
     :param shoe_penetration: When to reshuffle the shoe. Reshuffles when cards remaining < starting cards * deck penetration.
@@ -451,200 +608,733 @@ def expected_value(action_class: action_strategies.BaseMover, betting_class: bet
     :param surrender_allowed: Whether the game rules allow surrendering.
     :param units: The number of units in total.
     :param hands_played: How many hands to play before checking the risk of ruin.
-    :param num_of_other_players: number of players in front of us on the same table, ranging from 0 to 4.
-    
-
-    :return: The total return, the average return of a game, the average bet size, and the risk of ruin.
+    :param num_of_other_players: number of players in front of us on the same table, ranging from 0 to 6. They are dealt
+        and play before us, with the basic strategy of `other_players_strategy`, and their cards feed the count.
+    :param accumulator: If given, every hand is added to it instead of being recorded, and the lists returned are empty.
+    :param progress: Whether to print the progress of the run (see `telemetry.ProgressMonitor`).
+    :param tracer: If given, every round is recorded in it (see `tracing.Tracer`).
+    :param records: If given, a record of every hand is written to it (see `hand_records.HandRecordWriter`).
+    :param other_players_strategy: The strategy of the other players. Only its first bucket is used. Defaults to the
+        basic strategy of `other_players.basic_strategy`.
+    :param seed: The seed of the shoes (see `shoe_generators.ShuffledShoes`). If None, it is drawn from the `random`
+        module, so `random.seed` makes a run reproducible too.
+    :param kernel: Whether to play the shoes with `simulation_kernel.play_shoes`, which gives the same hands as the
+        `RoundEngine` in a loop compiled with Numba. If None, it is used when Numba is installed and the kernel
+        `supports` the mover and the better, without a tracer, records or a profile. Without Numba, the kernel is plain
+        Python.
+    :param profile: If given, the time of every phase of the simulation is counted in it (see
+        `profiling.PhaseProfile`). Profiling slows the simulation down, so the shares of the phases matter more than
+        their times.
+    :param phantom_seat: Whether our seat is still dealt in the rounds we sit out, and played with the strategy of the
+        other players, instead of being left empty. The shoe is then dealt in the same rounds as when we play every
+        round, like the evaluation of betters from hand records does (see `bet_ramps.evaluate_betters`).
+    :return: The bet, the profit/loss and the true count at the start of every hand. Every spot is a hand. The rounds
+        sat out (when the better bets `betting_strategies.SIT_OUT`) aren't hands: they are only dealt, with
+        `burn_round`, and counted in the accumulator.
     """
-    if num_of_other_players < 0 or num_of_other_players > 4:
-        raise NotImplementedError("num_of_other_players = {}".format(num_of_other_players))
+    check_other_players(num_of_other_players)
+    if other_players_strategy is None:
+        other_players_strategy = basic_strategy(dealer_stands_soft_17)
+    other_actions = other_players_strategy._actions
+    recording = tracer is not None or records is not None
+    if kernel is None:
+        kernel = NUMBA_AVAILABLE and not recording and profile is None and supports(action_class, betting_class)
+    elif kernel and (recording or profile is not None or not supports(action_class, betting_class)):
+        raise TypeError("The kernel only plays the movers and betters it supports, without a tracer, records or a "
+                        "profile.")
+    if profile is not None:
+        action_class = ProfilingMover(action_class, profile)
+    tracing_mover = TracingMover(action_class)
+    if recording:
+        action_class = tracing_mover
+    engine = RoundEngine(action_class, deck_number, dealer_peeks_for_blackjack, das, dealer_stands_soft_17,
+                         surrender_allowed, profile=profile)
+
+    rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+    shoes = ShuffledShoes(deck_number, rng, min(simulations, SHOES_PER_REFILL))
+    reshuffle_at = int(deck_number * 52 * shoe_penetration)
 
-    starting_shoe = DECK * deck_number
-    starting_number = len(starting_shoe)
-    reshuffle_at = int(starting_number * shoe_penetration)
-    shoe = starting_shoe.copy()
-    random.shuffle(shoe)
-    
     bets = []
     reward_record = [] # record reward at the end of every hand
     tc_record = [] # record tc at the beginning of every hand
-
+    monitor = ProgressMonitor(simulations) if progress else None
+
+    if kernel:
+        shoe_kernel = Kernel(action_class, betting_class, other_players_strategy, deck_number, shoe_penetration,
+                             dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed,
+                             num_of_other_players, phantom_seat)
+        played = 0
+        while played < simulations:
+            block_start = time.perf_counter()
+            shoe_block = shoes.next_shoes(simulations - played)
+            played += len(shoe_block)
+            block_bets, block_rewards, block_true_counts, sat_out = shoe_kernel.play(shoe_block)
+            if monitor is not None:
+                monitor.add(len(shoe_block), len(block_bets), time.perf_counter() - block_start)
+            if accumulator is not None:
+                accumulator.add_arrays(block_bets, block_rewards, block_true_counts)
+                accumulator.sit_out(sat_out)
+                continue
+            bets.extend(block_bets.tolist())
+            reward_record.extend(block_rewards.tolist())
+            tc_record.extend(block_true_counts.tolist())
+        if monitor is not None:
+            monitor.close()
+        return bets, reward_record, tc_record
+
+    reported_shoes = 0
+    reported_hands = 0
+    report_start = time.perf_counter()
     for i in range(simulations):
-        if i % 10_000 == 0:
-            print(f"Games played: {readable_number(i)}/{readable_number(simulations)}")
-        cards_seen = []
-        logging.debug("=" * 70)
-        logging.debug("new shoe starting...")
-        logging.debug("params:")
-        current_frame = inspect.currentframe()
-        args, _, _, values = inspect.getargvalues(current_frame)
-        for arg in args:
-            logging.debug("{}: {}".format(arg, values[arg]))
-        logging.debug("shoe: {}".format(shoe))
-        logging.debug("=" * 70)
+        if monitor is not None and i - reported_shoes == PROGRESS_SHOES:
+            hands = accumulator.hands if accumulator is not None else len(bets)
+            monitor.add(i - reported_shoes, hands - reported_hands, time.perf_counter() - report_start)
+            reported_shoes, reported_hands, report_start = i, hands, time.perf_counter()
+        if tracer is not None:
+            tracer.new_shoe()
+        if profile is not None:
+            profile.enter("shuffle")
+        shoe = shoes.next_shoe()
+        if profile is not None:
+            profile.exit()
+        shoe_state = ShoeState(deck_number) if profile is None else ProfilingShoeState(deck_number, profile)
         while len(shoe) >= reshuffle_at:
-            cards_seen = get_cards_seen(deck_number, shoe)
-            run_count = get_hilo_running_count(cards_seen)
-            true_count = run_count / (len(shoe) / 52.0)
-            logging.debug("current shoe: {}".format(shoe[-10:]))
-            logging.debug("running count: {}".format(run_count))
-            logging.debug("true count: {}".format(true_count))
-            tc_record.append(true_count)
-            initial_bet = betting_class.get_bet(cards_seen, deck_number)
-            logging.debug("initial bet: {}".format(initial_bet))
-            for op in range(num_of_other_players):
-                get_card_from_shoe(shoe)
-            player_card_1 = get_card_from_shoe(shoe)
-            dealer_up_card = get_card_from_shoe(shoe)
-            for op in range(num_of_other_players):
-                get_card_from_shoe(shoe)
-            player_card_2 = get_card_from_shoe(shoe)
-            dealer_down_card = get_card_from_shoe(shoe)
-            player_cards = [player_card_1, player_card_2]
-            cards_seen = get_cards_seen(deck_number, shoe)
-            cards_seen.remove(dealer_down_card)
-            # TODO: other players act based on basic strategy.
-            reward = simulate_hand(action_class, player_cards, dealer_up_card,
-                                   dealer_down_card, shoe, 3, deck_number,
-                                   dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed)
-            reward *= initial_bet
-            logging.debug("reward: {}".format(reward))
-            reward_record.append(reward)
-            bets.append(initial_bet)
-        
-        shoe = starting_shoe.copy()
-        random.shuffle(shoe)
-    
+            if recording:
+                tracing_mover.new_round()
+                cards_remaining = len(shoe)
+            run_count = shoe_state.running_count
+            true_count = shoe_state.true_count()
+            if profile is not None:
+                profile.enter("better")
+            initial_bet = betting_class.get_bet(shoe_state, deck_number)
+            if profile is not None:
+                profile.exit()
+            if initial_bet == SIT_OUT:
+                if profile is not None:
+                    profile.enter("deal")
+                burn_round(other_actions, shoe, shoe_state, num_of_other_players, dealer_peeks_for_blackjack, das,
+                           dealer_stands_soft_17, surrender_allowed, phantom_seat)
+                if profile is not None:
+                    profile.exit()
+                if accumulator is not None:
+                    accumulator.sit_out()
+                if tracer is not None:
+                    tracer.sit_out()
+                continue
+            if profile is not None:
+                profile.enter("better")
+            spots = betting_class.get_spots(shoe_state, deck_number)
+            if profile is not None:
+                profile.exit()
+                profile.enter("deal")
+            if num_of_other_players:
+                other_first_cards = [get_card_from_shoe(shoe, shoe_state) for _ in range(num_of_other_players)]
+            spot_cards = [[get_card_from_shoe(shoe, shoe_state)]]
+            for _ in range(1, spots):
+                spot_cards.append([get_card_from_shoe(shoe, shoe_state)])
+            dealer_up_card = get_card_from_shoe(shoe, shoe_state)
+            if num_of_other_players:
+                other_second_cards = [get_card_from_shoe(shoe, shoe_state) for _ in range(num_of_other_players)]
+            for player_cards in spot_cards:
+                player_cards.append(get_card_from_shoe(shoe, shoe_state))
+            dealer_down_card = get_card_from_shoe(shoe, shoe_state, hidden=True)
+            # The other players play first, unless the dealer peeks and has blackjack.
+            dealer_plays = False
+            if num_of_other_players and not (dealer_peeks_for_blackjack and dealer_up_card + dealer_down_card == 21):
+                for first_card, second_card in zip(other_first_cards, other_second_cards):
+                    dealer_plays |= play_other_player(other_actions, first_card, second_card, dealer_up_card, shoe,
+                                                      shoe_state, das, surrender_allowed)
+            if profile is not None:
+                profile.exit()
+            if tracer is not None:
+                tracer.start_round(shoe)
+            rewards = engine.simulate_spots(spot_cards, dealer_up_card, dealer_down_card, shoe, shoe_state,
+                                            dealer_plays)
+            shoe_state.see(dealer_down_card)  # The down card is turned over at the end of the round.
+            if records is not None:
+                for spot, (player_cards, reward) in enumerate(zip(spot_cards, rewards)):
+                    blackjack = player_cards[0] + player_cards[1] == 21
+                    played = not (blackjack or dealer_peeks_for_blackjack and dealer_up_card + dealer_down_card == 21)
+                    decisions, insured = tracing_mover.spot_decisions(spot)
+                    records.add(true_count, run_count, cards_remaining, initial_bet, reward,
+                                hand_flags(decisions, insured, played, blackjack))
+            if tracer is not None:
+                tracer.end_round(shoe, run_count, true_count, initial_bet, sum(rewards) * initial_bet, spot_cards[0],
+                                 dealer_up_card, dealer_down_card, tracing_mover, spots)
+            for reward in rewards:
+                reward *= initial_bet
+                if accumulator is not None:
+                    accumulator.add(initial_bet, reward, true_count)
+                    continue
+                tc_record.append(true_count)
+                reward_record.append(reward)
+                bets.append(initial_bet)
+
+    if monitor is not None:
+        hands = accumulator.hands if accumulator is not None else len(bets)
+        monitor.add(simulations - reported_shoes, hands - reported_hands, time.perf_counter() - report_start)
+        monitor.close()
     return bets, reward_record, tc_record
 
 
-def _ev_mt_wrapper(action_class: action_strategies.BaseMover = None, betting_class: betting_strategies.BaseBetter = None,
-          total_simulations: int = 100, deck_number: int = 6, shoe_penetration: float = .25,
-          dealer_peeks_for_blackjack: bool = True, das: bool = True,
-          dealer_stands_soft_17: bool = True, surrender_allowed: bool = True,
-          units: int = 200, hands_played: int = 1000, num_of_other_players: int = 0,
-          mt_idx=None, result_dict = None):
+_pool: multiprocessing.pool.Pool | None = None
+_pool_cores = 0
+
+
+def get_pool(cores: int) -> multiprocessing.pool.Pool:
+    """
+    Get the pool of worker processes. It is kept between calls, so that several runs don't start new processes.
+
+    :param cores: How many worker processes to use. If the pool has a different number of processes, a new pool is
+        started.
+    :return: The pool.
+    """
+    global _pool, _pool_cores
+    if _pool is None or _pool_cores != cores:
+        if _pool is None:
+            atexit.register(close_pool)
+        close_pool()
+        _pool = multiprocessing.Pool(cores)
+        _pool_cores = cores
+    return _pool
+
+
+def close_pool() -> None:
+    """Stop the worker processes of the pool, if it has been started."""
+    global _pool, _pool_cores
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+        _pool_cores = 0
+
+
+def _chunk_seed(entropy: int, index: int) -> int:
+    """
+    Get the seed of a chunk of shoes.
+
+    :param entropy: The entropy of the whole run.
+    :param index: The index of the chunk.
+    :return: The seed, which only depends on the entropy and the index of the chunk.
+    """
+    return int(np.random.SeedSequence(entropy, spawn_key=(index,)).generate_state(1)[0])
+
+
+"""A configuration to simulate: the mover, the better, and the rules passed to the simulator as keyword arguments."""
+Configuration = tuple[BaseMover, BaseBetter, dict[str, Any]]
+
+
+"""A chunk of shoes to play: whether to use the batch simulator, the configurations, the number of shoes, the seed of
+the chunk, what to write (the index of the chunk, the index of its first shoe, the trace directory and the hand
+records directory) or None, whether to profile it, and the edges of the true count bins of the results."""
+ChunkTask = tuple[bool, list[Configuration], int, int, tuple[int, int, str | None, str | None] | None, bool,
+                  tuple[float, ...]]
+
+"""The results of a chunk: the results of every configuration, the report of the worker about the chunk and the profile
+of the chunk if it is profiled."""
+ChunkResult = tuple[list[ResultAccumulator], ChunkReport, PhaseProfile | None]
+
+"""A file written by a chunk played on another machine: the directory to write it to, its name and its content."""
+ChunkFile = tuple[str, str, bytes]
+
+
+def _simulate_chunk(task: ChunkTask) -> ChunkResult:
+    """
+    Play a chunk of shoes with every configuration. Runs in the worker processes.
+
+    :param task: The chunk to play. Every configuration plays the shoes shuffled from the same seed. The traces and the
+        hand records of every configuration are written to `chunk-<chunk index>-<configuration index>.npy` in their
+        directory.
+    :return: The results of the chunk for every configuration, the report of the worker about the chunk (see
+        `telemetry.ChunkReport`), and the profile of the chunk for all the configurations if it is profiled.
+    """
+    start = time.perf_counter()
+    vectorized, configurations, shoes, seed, output, profiled, true_count_bins = task
+    profile = PhaseProfile() if profiled else None
+    results = []
+    for number, (action_class, betting_class, rules) in enumerate(configurations):
+        accumulator = ResultAccumulator(true_count_bins=true_count_bins, max_curve_points=1_000)
+        tracer = records = None
+        if output is not None:
+            index, first_shoe, trace_dir, records_dir = output
+            name = f"chunk-{index:06d}-{number:02d}.npy"
+            if trace_dir is not None:
+                tracer = Tracer(os.path.join(trace_dir, name), first_shoe)
+            if records_dir is not None:
+                records = HandRecordWriter(os.path.join(records_dir, name))
+        try:
+            if vectorized:
+                batch_expected_value(action_class, betting_class, shoes, seed=seed, accumulator=accumulator,
+                                     records=records, **rules)
+            else:
+                expected_value(action_class, betting_class, shoes, accumulator=accumulator, progress=False,
+                               tracer=tracer, records=records, seed=seed, profile=profile, **rules)
+        finally:
+            for writer in (tracer, records):
+                if writer is not None:
+                    writer.close()
+        results.append(accumulator)
+    if profile is not None:
+        profile.stop()
+    return (results, (shoes, sum(result.hands for result in results), time.perf_counter() - start, os.getpid()),
+            profile)
+
+
+def _simulate_remote_chunk(task: ChunkTask) -> tuple[ChunkResult, list[ChunkFile]]:
+    """
+    Play a chunk of shoes on a worker of another machine (see `distributed.Coordinator`).
+
+    :param task: The chunk to play. Its traces and hand records are written to a temporary directory of the worker
+        instead of the directories of the coordinator.
+    :return: The results of the chunk, and every file the chunk wrote (see `ChunkFile`).
+    """
+    if task[4] is None:
+        return _simulate_chunk(task), []
+    index, first_shoe, trace_dir, records_dir = task[4]
+    with tempfile.TemporaryDirectory() as directory:
+        local_dirs = [None if remote is None else os.path.join(directory, str(number))
+                      for number, remote in enumerate((trace_dir, records_dir))]
+        for local in local_dirs:
+            if local is not None:
+                os.makedirs(local)
+        result = _simulate_chunk(task[:4] + ((index, first_shoe, local_dirs[0], local_dirs[1]),) + task[5:])
+        files = []
+        for local, remote in zip(local_dirs, (trace_dir, records_dir)):
+            if local is not None and remote is not None:
+                for name in sorted(os.listdir(local)):
+                    with open(os.path.join(local, name), "rb") as file:
+                        files.append((remote, name, file.read()))
+    return result, files
+
+
+def _write_remote_chunks(results: Iterator[tuple[ChunkResult, list[ChunkFile]]]) -> Iterator[ChunkResult]:
+    """
+    Write the files of the chunks played on other machines.
+
+    :param results: The results of `_simulate_remote_chunk` for every chunk, in order.
+    :return: An iterator over the results of `_simulate_chunk` for every chunk.
+    """
+    for result, files in results:
+        for directory, name, content in files:
+            with open(os.path.join(directory, name), "wb") as file:
+                file.write(content)
+        yield result
+
+
+def default_chunk_size(total_simulations: int, vectorized: bool = False) -> int:
+    """
+    Get the default number of shoes in each chunk of a run.
+
+    :param total_simulations: How many shoes the run plays.
+    :param vectorized: Whether the chunks are played with the batch simulator.
+    :return: About 1/64 of the shoes, capped so that no chunk takes long. Chunks of the batch simulator are bigger,
+        because it is only fast with many shoes at once.
+    """
+    if vectorized:
+        return min(20_000, max(5_000, total_simulations // 64))
+    return max(1, min(1_000, total_simulations // 64))
+
 
-    b, r, c = expected_value(action_class, betting_class, total_simulations, deck_number, shoe_penetration,
-                  dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed,
-                  units, hands_played, num_of_other_players)
-    result_dict[mt_idx] = [b, r, c]
+"""How many shoes are in each chunk of a cached run, with the Python simulator and with the batch simulator. A cached run
+always plays these chunks, so that a run extended from the cache plays the same shoes as a run on an empty cache."""
+CACHE_CHUNK_SIZE = 100
+VECTORIZED_CACHE_CHUNK_SIZE = 5_000
+
+
+def play_chunks(cores: int, configurations: list[Configuration], total_simulations: int, chunk_size: int | None = None,
+                seed: int | None = None, vectorized: bool = False,
+                trace_dir: str | None = None, records_dir: str | None = None, progress: bool = True,
+                metrics_path: str | None = None, profile: PhaseProfile | None = None, first_chunk: int = 0,
+                first_shoe: int = 0, listen: str | None = None,
+                true_count_bins: Sequence[float] = TRUE_COUNT_BINS) -> Iterator[tuple[int, list[ResultAccumulator]]]:
+    """
+    Play the shoes in chunks, handed out to the worker processes one at a time as they become free.
+
+    Every chunk is shuffled from its own seed, so the results only depend on `seed` and `chunk_size`, not on the
+    number of cores or of machines.
+
+    :param cores: How many worker processes to use. With 1, the chunks are played in this process. Not used with
+        `listen`.
+    :param configurations: The movers, betters and rules to play every chunk with.
+    :param total_simulations: How many shoes to play.
+    :param chunk_size: How many shoes are in each chunk. Defaults to `default_chunk_size`.
+    :param seed: The seed of the run. If None, a random seed is used.
+    :param vectorized: Whether to play the chunks with the batch simulator.
+    :param trace_dir: If given, every round is traced to a file of this directory per chunk (see `tracing.Tracer`).
+        The batch simulator can't be traced.
+    :param records_dir: If given, a record of every hand is written to a file of this directory per chunk (see
+        `hand_records.HandRecordWriter`).
+    :param progress: Whether to print the progress of all the workers on one line (see `telemetry.ProgressMonitor`).
+    :param metrics_path: If given, snapshots of the progress and the throughput are appended to this file, as JSON
+        lines.
+    :param profile: If given, every chunk is profiled, and the profiles of the workers are merged into it (see
+        `profiling.PhaseProfile`). The batch simulator can't be profiled.
+    :param first_chunk: The index of the first chunk to play, to resume a run (see `checkpoints.Checkpoint`).
+    :param first_shoe: How many of the shoes have already been played, to resume a run.
+    :param listen: If given, the chunks are handed out to the workers that connect to this address (`HOST:PORT`,
+        see `distributed.Coordinator`) instead of the local worker processes. The traces and the hand records are
+        sent back by the workers and written here.
+    :param true_count_bins: The edges of the true count bins of the results (see `ResultAccumulator`).
+    :return: An iterator over the chunks, in order, with the number of shoes of the chunk and the results of every
+        configuration.
+    """
+    if trace_dir is not None and vectorized:
+        raise ValueError("The batch simulator can't be traced.")
+    if profile is not None and vectorized:
+        raise ValueError("The batch simulator can't be profiled.")
+    for directory in (trace_dir, records_dir):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+    writes = trace_dir is not None or records_dir is not None
+    if chunk_size is None:
+        chunk_size = default_chunk_size(total_simulations, vectorized)
+    entropy = cast(int, np.random.SeedSequence(seed).entropy)  # An int, as the seed is an int or None.
+    tasks = ((vectorized, configurations, min(chunk_size, total_simulations - start), _chunk_seed(entropy, index),
+              (index, start, trace_dir, records_dir) if writes else None, profile is not None, tuple(true_count_bins))
+             for index, start in enumerate(range(first_shoe, total_simulations, chunk_size), first_chunk))
+    results: Iterator[ChunkResult]
+    if listen is not None:
+        results = _write_remote_chunks(get_coordinator(listen).play(_simulate_remote_chunk, tasks))
+    elif cores > 1:
+        # Only a few chunks are queued at a time, so that nothing more is played once the caller stops iterating.
+        pool = get_pool(cores)
+        queued: collections.deque[multiprocessing.pool.AsyncResult[ChunkResult]] = collections.deque(
+            pool.apply_async(_simulate_chunk, (task,)) for task in itertools.islice(tasks, 2 * cores))
+        results = _in_order(pool, tasks, queued)
+    else:
+        results = (_simulate_chunk(task) for task in tasks)
+
+    monitor = ProgressMonitor(max(total_simulations - first_shoe, 0), metrics_path, progress)
+    try:
+        for result, report, chunk_profile in results:
+            monitor.add(*report)
+            if profile is not None and chunk_profile is not None:  # Every chunk is profiled when `profile` is given.
+                profile.merge(chunk_profile)
+            yield report[0], result
+    finally:
+        monitor.close()
+
+
+def _in_order(pool: multiprocessing.pool.Pool, tasks: Iterator[ChunkTask],
+              queued: collections.deque[multiprocessing.pool.AsyncResult[ChunkResult]]) -> Iterator[ChunkResult]:
+    """
+    Get the results of the queued chunks in order, queueing the next task every time a result is taken.
+
+    :param pool: The pool that plays the chunks.
+    :param tasks: The tasks that haven't been queued yet.
+    :param queued: The pending result of every queued chunk, in order.
+    :return: An iterator over the results, the report and the profile of every chunk.
+    """
+    while queued:
+        result = queued.popleft().get()
+        for task in itertools.islice(tasks, 1):
+            queued.append(pool.apply_async(_simulate_chunk, (task,)))
+        yield result
 
 
 def ev_mt(cores=2, action_class: action_strategies.BaseMover = None, betting_class: betting_strategies.BaseBetter = None,
           total_simulations: int = 100, deck_number: int = 6, shoe_penetration: float = .25,
           dealer_peeks_for_blackjack: bool = True, das: bool = True,
           dealer_stands_soft_17: bool = True, surrender_allowed: bool = True,
-          units: int = 200, hands_played: int = 1000, num_of_other_players: int = 0):
-    
-    processes = []
-    return_dict = multiprocessing.Manager().dict()
-    for i in range(cores):
-        p = multiprocessing.Process(
-            target=_ev_mt_wrapper, 
-            args=(action_class, betting_class, total_simulations//cores, deck_number, shoe_penetration,
-                  dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed,
-                  units, hands_played, num_of_other_players, i, return_dict,),
-            name="ev_mt_{}".format(i))
-        processes.append(p)
-        p.start()
-    for p in processes:
-        p.join()
-    
-    bets = []
-    rewards = []
-    tcs = []
-    for i in range(cores):
-        cres = return_dict.get(i)
-        bets += cres[0]
-        rewards += cres[1]
-        tcs += cres[2]
-    return bets, rewards, tcs
-        
-
-def calculate_sum_in_chunks(values, chunk_size=100):
-    # Split the list into chunks of size 'chunk_size'
-    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
-    res = []
-    for chunk in chunks:
-        # Convert to numpy array for calculation
-        np_chunk = np.array(chunk)
-        res.append(np.sum(np_chunk))
-    return res
+          units: int = 200, hands_played: int = 1000, num_of_other_players: int = 0,
+          chunk_size: int | None = None, seed: int | None = None, vectorized: bool = False) -> ResultAccumulator:
+    """
+    Play the shoes in chunks on a pool of worker processes (see `play_chunks`).
+
+    :param cores: How many worker processes to use. With 1, the chunks are played in this process.
+    :param action_class: The class that chooses the action.
+    :param betting_class: The class that chooses the bet.
+    :param total_simulations: How many shoes to play.
+    :param deck_number: The number of decks in the initial shoe.
+    :param shoe_penetration: When to reshuffle the shoe. Reshuffles when cards remaining < starting cards * deck penetration.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param units: The number of units in total.
+    :param hands_played: How many hands to play before checking the risk of ruin.
+    :param num_of_other_players: number of players in front of us on the same table, ranging from 0 to 6.
+    :param chunk_size: How many shoes are in each chunk.
+    :param seed: The seed of the run. If None, a random seed is used.
+    :param vectorized: Whether to play the chunks with the batch simulator.
+    :return: The merged results of all the chunks, in order.
+    """
+    rules = {"deck_number": deck_number, "shoe_penetration": shoe_penetration,
+             "dealer_peeks_for_blackjack": dealer_peeks_for_blackjack, "das": das,
+             "dealer_stands_soft_17": dealer_stands_soft_17, "surrender_allowed": surrender_allowed,
+             "num_of_other_players": num_of_other_players}
+    accumulator = ResultAccumulator()
+    for _, results in play_chunks(cores, [(action_class, betting_class, rules)], total_simulations, chunk_size, seed,
+                                  vectorized):
+        accumulator.merge(results[0])
+    return accumulator
+
+
+def compare(configurations: list[Configuration], total_simulations: int, cores: int = 2, seed: int | None = None,
+            chunk_size: int | None = None, vectorized: bool = False, listen: str | None = None
+            ) -> tuple[list[ResultAccumulator], list[tuple[float, float]]]:
+    """
+    Compare strategies or rules by playing every configuration on the same shoes (common random numbers).
+
+    The results of the configurations on the same shoes are strongly correlated, so the difference between two
+    configurations is known much more precisely than from independent runs. The differences are calculated per chunk
+    of shoes, and their standard errors with the batch means method.
+
+    :param configurations: The mover, the better and the rules of every configuration. The rules are keyword arguments
+        of `expected_value` (e.g. `{"dealer_stands_soft_17": False}`), and the missing ones use the defaults.
+    :param total_simulations: How many shoes to play.
+    :param cores: How many worker processes to use.
+    :param seed: The seed of the run. If None, a random seed is used.
+    :param chunk_size: How many shoes are in each chunk. There should be at least about 30 chunks for the standard
+        errors to be reliable. Defaults to `default_chunk_size`.
+    :param vectorized: Whether to play the chunks with the batch simulator.
+    :param listen: If given, the shoes are played by the workers of other machines that connect to this address
+        (`HOST:PORT`, see `distributed.Coordinator`).
+    :return: The results of every configuration, and the difference of the profit per shoe of every configuration
+        from the first one with its standard error.
+    """
+    if chunk_size is None:
+        chunk_size = default_chunk_size(total_simulations, vectorized)
+    accumulators = [ResultAccumulator() for _ in configurations]
+    chunk_shoes = []
+    chunk_profits: list[list[float]] = [[] for _ in configurations]
+    for shoes, results in play_chunks(cores, configurations, total_simulations, chunk_size, seed, vectorized,
+                                      listen=listen):
+        chunk_shoes.append(shoes)
+        for accumulator, profits, result in zip(accumulators, chunk_profits, results):
+            accumulator.merge(result)
+            profits.append(result.profit)
+
+    differences = [batch_means(np.subtract(profits, chunk_profits[0]).tolist(), chunk_shoes)
+                   for profits in chunk_profits]
+    summary: dict[str, list[float]] = {"configuration": [], "ev_per_shoe": [], "se_per_shoe": [], "diff_per_shoe": [],
+                                       "paired_se": [], "unpaired_se": []}
+    first_se = batch_means(chunk_profits[0], chunk_shoes)[1]
+    for index, (profits, (difference, paired_se)) in enumerate(zip(chunk_profits, differences)):
+        ev, se = batch_means(profits, chunk_shoes)
+        summary["configuration"].append(index)
+        summary["ev_per_shoe"].append(ev)
+        summary["se_per_shoe"].append(se)
+        summary["diff_per_shoe"].append(difference)
+        summary["paired_se"].append(paired_se)
+        summary["unpaired_se"].append(np.sqrt(se ** 2 + first_se ** 2) if index else 0.)
+
+    for index, (mover, better, rules) in enumerate(configurations):
+        print(f"{index}: {type(mover).__name__}, {type(better).__name__}, {rules}")
+    print_unit_size = 20
+    print('=' * ((print_unit_size + 1) * len(summary) + 1))
+    print("|" + "|".join([x.center(print_unit_size) for x in summary.keys()]) + "|")
+    print('-' * ((print_unit_size + 1) * len(summary) + 1))
+    for index in range(len(configurations)):
+        print("|" + "|".join([("{:.3f}".format(x[index])).center(print_unit_size) for x in summary.values()]) + "|")
+    print('=' * ((print_unit_size + 1) * len(summary) + 1))
+    logging.info("=" * 50)
+    logging.info("comparison:")
+    logging.info('\n' + ','.join(summary.keys()) + '\n' + '\n'.join(
+        ','.join(str(x[index]) for x in summary.values()) for index in range(len(configurations))))
+    logging.info("=" * 50)
+    return accumulators, differences
+
 
 def calc_ror(ev, sd, bankroll):
     if sd == 0 or (1 + ev/sd) == 0:
         return np.nan
     return ((1 - ev/sd) / (1 + ev/sd)) ** (bankroll / sd)
 
-def calculate_max_drawdown_and_duration(pnl_series):
-    # Convert PnL to cumulative returns
-    cumulative_returns = np.cumsum(pnl_series)
-    
-    # Calculate the running maximum
-    running_max = np.maximum.accumulate(cumulative_returns)
-    
-    # Drawdown is the difference between running max and current value
-    drawdowns = running_max - cumulative_returns
-    
-    # Maximum Drawdown
-    max_drawdown = np.max(drawdowns)
-    
-    # Find the index where max drawdown occurs
-    max_drawdown_index = np.argmax(drawdowns)
-    
-    # Find the index where the peak before max drawdown occurred
-    peak_index = np.argmax(cumulative_returns[:max_drawdown_index + 1])
-    
-    # Duration of max drawdown is from peak to trough
-    drawdown_duration = max_drawdown_index - peak_index + 1  # +1 for inclusive count
-    
-    return max_drawdown, drawdown_duration
+
+"""The minimum number of chunks before a run can stop at its target standard error."""
+MIN_BATCHES = 20
+
+
+def summarize(accumulator: ResultAccumulator, shoes: int, units: int) -> dict[str, float]:
+    """
+    Get the summary of the results of a run.
+
+    :param accumulator: The results of the run.
+    :param shoes: How many shoes were played.
+    :param units: The number of units in total, to calculate the risk of ruin.
+    :return: The summary. Everything but the shoes, the hands per shoe and the rounds sat out per shoe is NaN if no
+        hand was played. The hands and their statistics only include the rounds played.
+    """
+    hands = accumulator.hands
+    summary = {"shoes": shoes,
+               "hands_per_shoe": hands / shoes,
+               "sat_out_per_shoe": accumulator.rounds_sat_out / shoes,
+               "avg_bet": np.nan, "win_2_lose": np.nan,
+               "ev_per_shoe": np.nan, "ev_per_100": np.nan, "std_per_shoe": np.nan,
+               "std_per_100": np.nan, "max_dd": np.nan, "dd_duration_in_hands": np.nan,
+               "risk_of_ruin": np.nan}
+    if hands > 0:
+        summary['avg_bet'] = accumulator.total_bet / hands
+        summary['win_2_lose'] = accumulator.total_win / accumulator.total_loss
+        summary['ev_per_shoe'] = accumulator.profit / shoes
+        summary['std_per_shoe'] = accumulator.rewards.std() * np.sqrt(hands / shoes)
+        chunk_stats = accumulator.chunk_stats()
+        summary['ev_per_100'] = chunk_stats.mean
+        summary['std_per_100'] = chunk_stats.std()
+        summary['max_dd'] = accumulator.max_drawdown
+        summary['dd_duration_in_hands'] = accumulator.drawdown_duration()
+        summary['risk_of_ruin'] = calc_ror(accumulator.rewards.mean, accumulator.rewards.std(), units)
+    return summary
+
+
+def summarize_true_counts(accumulator: ResultAccumulator) -> pd.DataFrame:
+    """
+    Get the results of a run for every true count bin, e.g. to decide the bets of a ramp.
+
+    :param accumulator: The results of the run.
+    :return: A row for every bin, labelled by its true counts (e.g. "2" for 2 <= true count < 3, or "[-21, -1)"),
+        with the hands, the share of all the hands (`frequency`), the mean result of a hand (`ev_per_hand`), its
+        variance and standard error (`se`), and the result per unit bet (`ev_per_unit`). The statistics of an empty bin
+        are NaN.
+    """
+    edges = accumulator.true_count_bins
+    labels = [f"{low:g}" if high - low == 1 and float(low).is_integer() else f"[{low:g}, {high:g})"
+              for low, high in zip(edges, edges[1:])]
+    rows = []
+    for stats, bet in zip(accumulator.bins, accumulator.bin_bets):
+        variance = stats.m2 / stats.count if stats.count else np.nan
+        rows.append({"hands": stats.count,
+                     "frequency": stats.count / accumulator.hands if accumulator.hands else np.nan,
+                     "ev_per_hand": stats.mean if stats.count else np.nan,
+                     "variance": variance,
+                     "se": np.sqrt(variance / stats.count) if stats.count else np.nan,
+                     "ev_per_unit": stats.mean * stats.count / bet if bet else np.nan})
+    return pd.DataFrame(rows, index=pd.Index(labels, name="true_count"))
+
 
 def run(mover: action_strategies.BaseMover, better: betting_strategies.BaseBetter,
         total_simulations: int, cores: int = 2, deck_number: int = 6, shoe_penetration: float = .25,
         dealer_peeks_for_blackjack: bool = True, das: bool = True,
         dealer_stands_soft_17: bool = True, surrender_allowed: bool = True,
         units: int = 200, hands_played: int = 1000, num_of_other_players: int = 0,
-        plot=True):
+        plot=True, vectorized: bool = False, seed: int | None = None, target_se: float | None = None,
+        time_budget: float | None = None, trace_dir: str | None = None,
+        records: str | None = None, metrics: str | None = None, profile: bool = False,
+        checkpoint: str | None = None, listen: str | None = None, cache: str | None = None,
+        true_count_bins: Sequence[float] = TRUE_COUNT_BINS, bankroll_paths: int = 0) -> dict[str, float]:
+    """
+    Estimate the expected value of a strategy, print a summary of the results and plot the profit.
+
+    :param mover: The class that chooses the action.
+    :param better: The class that chooses the bet.
+    :param total_simulations: How many shoes to play. With `target_se` or `time_budget`, the most shoes to play.
+    :param cores: How many worker processes to use.
+    :param deck_number: The number of decks in the initial shoe.
+    :param shoe_penetration: When to reshuffle the shoe. Reshuffles when cards remaining < starting cards * deck penetration.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param units: The number of units in total.
+    :param hands_played: How many hands a trip of the bankroll simulation plays (see `bankroll_paths`).
+    :param num_of_other_players: number of players in front of us on the same table, ranging from 0 to 6.
+    :param plot: Whether to plot the profit.
+    :param vectorized: Whether to use the batch simulator.
+    :param seed: The seed of the run. If None, a random seed is used.
+    :param target_se: Stop once the standard error of the EV per 100 hands is at most this (after at least
+        `MIN_BATCHES` chunks).
+    :param time_budget: Stop after this many seconds.
+    :param trace_dir: If given, every round is traced to this directory, to be read with `tracing.read_trace`.
+    :param records: If given, a record of every hand is written to this `.npy` file, to be read with
+        `hand_records.read_hand_records`.
+    :param metrics: If given, snapshots of the progress and the throughput of the run are appended to this file (see
+        `telemetry.ProgressMonitor`).
+    :param profile: Whether to measure the time of every phase of the simulation in all the workers, and print it
+        (see `profiling.PhaseProfile`).
+    :param checkpoint: If given, the results are saved to this directory as the chunks are played (see
+        `checkpoints.Checkpoint`). Running again with the same directory and configuration resumes the run, or extends
+        it if `total_simulations` is higher, without playing the shoes already played again. The seed is the one of
+        the checkpoint, and the next shoes are played in chunks of the size of this run. Can't be used with `records`.
+    :param listen: If given, the shoes are played by the workers of other machines that connect to this address
+        (`HOST:PORT`) instead of the local cores (see `distributed.Coordinator`).
+    :param cache: If given, the results are kept in this directory, under the hash of the configuration (see
+        `checkpoints.cache_directory`). A run with the same strategies, rules, simulator and seed reuses them, and only
+        plays the shoes it asks for beyond those cached. The shoes are played in chunks of `CACHE_CHUNK_SIZE` (or
+        `VECTORIZED_CACHE_CHUNK_SIZE`), so the results are the same as those of a run on an empty cache, whatever the
+        cache holds. Only whole chunks are cached, and if fewer shoes are asked for than cached, they are played again.
+        A run without a seed isn't cached. Can't be used with `checkpoint` or `records`.
+    :param true_count_bins: The edges of the true count bins of the results per true count, which are printed after
+        the summary (see `summarize_true_counts`).
+    :param bankroll_paths: If not 0, this many bankroll paths of `units` over `hands_played` hands are simulated, and
+        their risk of ruin, trip results and hands to double the bankroll are printed after the summary (see
+        `bankroll.simulate_bankroll_by_true_count`). The results of the hands are drawn from a normal distribution per
+        true count bin, so the tails are approximate: simulate from hand records for exact ones (see `bankroll`).
+    :return: The summary of the results.
+    """
     logging.info("expected_value.run() is called with the following configurations:")
     logging.info(get_args_info())
-    if cores > 1:
-        bets, rewards, tcs = ev_mt(
-            cores, mover, better, total_simulations, deck_number, shoe_penetration,
-            dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed, units, hands_played, num_of_other_players
-            )
+    rules = {"deck_number": deck_number, "shoe_penetration": shoe_penetration,
+             "dealer_peeks_for_blackjack": dealer_peeks_for_blackjack, "das": das,
+             "dealer_stands_soft_17": dealer_stands_soft_17, "surrender_allowed": surrender_allowed,
+             "num_of_other_players": num_of_other_players}
+    # With a target standard error or a time budget, total_simulations is the most shoes to play. The standard error of
+    # ev_per_100 comes from the batch means of the chunks, which are independent unlike consecutive hands.
+    chunk_size = default_chunk_size(total_simulations, vectorized)
+    if target_se is not None or time_budget is not None:
+        # Small chunks, so that the run stops close to the target or the deadline.
+        chunk_size = max(1, min(5_000 if vectorized else 100, total_simulations // 64))
+    if cache is not None and seed is not None:
+        if checkpoint is not None:
+            raise ValueError("A cached run is already checkpointed to the cache.")
+        chunk_size = VECTORIZED_CACHE_CHUNK_SIZE if vectorized else CACHE_CHUNK_SIZE
+        checkpoint = cache_directory(cache, seed, chunk_size, [(mover, better, rules)], vectorized,
+                                     tuple(true_count_bins))
+    elif cache is not None:
+        # A run without a seed is for a new random estimate, which the cache would replace with the one of another run.
+        logging.info("the results aren't cached, because the run has no seed.")
+    if checkpoint is None:
+        entropy = cast(int, np.random.SeedSequence(seed).entropy)  # An int, as the seed is an int or None.
+        state = Checkpoint("", entropy, chunk_size, true_count_bins=true_count_bins)
+    elif records is not None:
+        raise ValueError("A run with hand records can't be checkpointed or cached.")
     else:
-        bets, rewards, tcs = expected_value(
-            mover, better, simulations=total_simulations, deck_number=deck_number, shoe_penetration=shoe_penetration,
-            dealer_peeks_for_blackjack=dealer_peeks_for_blackjack, das=das, dealer_stands_soft_17=dealer_stands_soft_17, 
-            surrender_allowed=surrender_allowed, units=units, hands_played=hands_played, num_of_other_players=num_of_other_players
-            )
-
-    summary = {"shoes": total_simulations,
-               "hands_per_shoe": len(bets) / total_simulations,
-               "avg_bet": np.nan, "win_2_lose": np.nan,
-               "ev_per_shoe": np.nan, "ev_per_100": np.nan, "std_per_shoe": np.nan,
-               "std_per_100": np.nan, "max_dd": np.nan, "dd_duration_in_hands": np.nan,
-               "risk_of_ruin": np.nan}
-    if len(bets) > 0:
-        summary['avg_bet'] = sum(bets) / len(bets)
-        total_win = sum([x for x in rewards if x > 0])
-        total_loss = sum([-x for x in rewards if x < 0])
-        summary['win_2_lose'] =  total_win / total_loss
-        summary['ev_per_shoe'] = sum(rewards) / total_simulations
-        summary['std_per_shoe'] = np.std(rewards) * np.sqrt(len(bets) / total_simulations)
-        sum_per_100 = calculate_sum_in_chunks(rewards, 100)
-        summary['ev_per_100'] = np.mean(sum_per_100)
-        summary['std_per_100'] = np.std(sum_per_100)
-        num_of_win = sum([1 for x in rewards if x > 0])
-        num_of_loss = sum([1 for x in rewards if x < 0])
-        win_prob = num_of_win / len(bets)
-        loss_prob = num_of_loss / len(bets)
-        dd, ddd = calculate_max_drawdown_and_duration(rewards)
-        summary['max_dd'] = dd
-        summary['dd_duration_in_hands'] = ddd
-        summary['risk_of_ruin'] = calc_ror(np.mean(rewards), np.std(rewards), units)
+        fingerprint = config_fingerprint([(mover, better, rules)], vectorized, tuple(true_count_bins))
+        state = Checkpoint.open(checkpoint, fingerprint, seed, chunk_size, true_count_bins)
+        if cache is not None and state.shoes > total_simulations:
+            # The cache only keeps the results of all its chunks together, so the first chunks are played again.
+            logging.info(f"the cache in {checkpoint} has more shoes than asked for: the run isn't cached.")
+            state = Checkpoint("", state.entropy, chunk_size, true_count_bins=true_count_bins)
+        elif state.shoes >= total_simulations:
+            logging.info(f"reusing the results of {state.shoes} shoes in {checkpoint}.")
+        elif state.shoes:
+            logging.info(f"resuming from {state.shoes} shoes in {checkpoint}.")
+    # The chunks write their hand records to their own files, which are joined in order at the end.
+    records_dir = None if records is None else records + ".chunks"
+    start_time = time.monotonic()
+    phase_profile = PhaseProfile() if profile else None
+    accumulator = state.accumulator
+    chunk_profits = state.chunk_profits
+    chunk_hands = state.chunk_hands
+    try:
+        # The batch simulator is only for table-driven movers (see `batch_expected_value`).
+        for chunk_shoes, results in play_chunks(cores, [(mover, better, rules)], total_simulations, state.chunk_size,
+                                                state.entropy, vectorized, trace_dir, records_dir,
+                                                metrics_path=metrics, profile=phase_profile,
+                                                first_chunk=state.chunks, first_shoe=state.shoes,
+                                                listen=listen, true_count_bins=true_count_bins):
+            if cache is not None and chunk_shoes < state.chunk_size:
+                # The last chunk is only part of a chunk of the cache, so it isn't cached.
+                state.save()
+                state.directory = None
+            state.add(chunk_shoes, results[0])
+            state.save(force=False)
+            if time_budget is not None and time.monotonic() - start_time >= time_budget:
+                logging.info(f"stopping after {state.shoes} shoes: the time budget is used.")
+                break
+            if (target_se is not None and len(chunk_profits) >= MIN_BATCHES
+                    and 100 * batch_means(chunk_profits, chunk_hands)[1] <= target_se):
+                logging.info(f"stopping after {state.shoes} shoes: the target standard error is reached.")
+                break
+    finally:  # Also when the run is interrupted, so that it can be resumed.
+        state.save()
+    total_simulations = state.shoes
+    if records is not None and records_dir is not None:
+        concatenate_records([os.path.join(records_dir, f"chunk-{index:06d}-00.npy")
+                             for index in range(len(chunk_profits))], records)
+        shutil.rmtree(records_dir, ignore_errors=True)
+
+    summary = summarize(accumulator, total_simulations, units)
 
     print_unit_size = 20
     print_1st = "|".join([x.center(print_unit_size) for x in summary.keys()])
@@ -656,33 +1346,110 @@ def run(mover: action_strategies.BaseMover, better: betting_strategies.BaseBette
     print('-' * ((print_unit_size + 1) * len(summary) + 1))
     print(print_2nd)
     print('=' * ((print_unit_size + 1) * len(summary) + 1))
+    if sum(chunk_hands) > 0:
+        ev_per_100, se_per_100 = (100 * x for x in batch_means(chunk_profits, chunk_hands))
+        confidence_interval = (f"ev_per_100: {ev_per_100:.3f} +- {se_per_100:.3f} "
+                               f"(95% CI: {ev_per_100 - 1.96 * se_per_100:.3f} to {ev_per_100 + 1.96 * se_per_100:.3f}, "
+                               f"batch means of {len(chunk_hands)} chunks)")
+        print(confidence_interval)
     logging.info("=" * 50)
     logging.info("results:")
     logging.info('\n' + ','.join(summary.keys()) + '\n' + ','.join(str(x) for x in summary.values()))
+    if sum(chunk_hands) > 0:
+        logging.info(confidence_interval)
     logging.info("=" * 50)
-
-    # # stats for reward-true count:
-    # df = pd.DataFrame({
-    #     'true_count': tcs,
-    #     'rewards': rewards
-    #     })
-    # bins = [-21, -1, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 21]
-    # labels = ['-20 to -1', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11 to 20']
-    # df['tc'] = pd.cut(df['true_count'], bins=bins, labels=labels, right=False)
-    # pivot_table = df.pivot_table(values='rewards', index='tc', aggfunc={'rewards': ['mean', 'std']}, observed=False)
-    # print("----------- ev per tc --------------")
-    # print(pivot_table)
-    # logging.info(pivot_table)
-    # logging.info("=" * 50)
+    if accumulator.hands > 0:
+        true_counts = summarize_true_counts(accumulator).to_string(float_format="{:.4f}".format)
+        print("----------- ev per tc --------------")
+        print(true_counts)
+        logging.info("ev per tc:\n" + true_counts)
+        logging.info("=" * 50)
+    if bankroll_paths and any(stats.count for stats in accumulator.bins):
+        bankroll = format_bankroll(simulate_bankroll_by_true_count(accumulator.bins, units, hands_played,
+                                                                   bankroll_paths, seed=seed))
+        header = f"bankroll of {units} units over {hands_played} hands (normal approximation per tc)"
+        print(f"----------- {header} --------------")
+        print(bankroll)
+        logging.info(f"{header}:\n" + bankroll)
+        logging.info("=" * 50)
+    if phase_profile is not None:
+        print(phase_profile.table())
+        logging.info("time by phase, in all the workers:\n" + phase_profile.table())
 
     if plot:
-        pnl = np.cumsum(rewards)
-        plt.plot(pnl, label="Accumulated Profit")
+        plt.plot(accumulator.curve_hands, accumulator.curve_profits, label="Accumulated Profit")
         plt.xlabel("Hands played")
         plt.ylabel("Total profit")
         plt.title("PnL Curve")
         plt.legend()
         plt.show()    
+    return summary
+
+
+def run_bet_ramps(mover: action_strategies.BaseMover, betters: list[betting_strategies.BaseBetter],
+                  total_simulations: int, cores: int = 2, deck_number: int = 6, shoe_penetration: float = .25,
+                  dealer_peeks_for_blackjack: bool = True, das: bool = True,
+                  dealer_stands_soft_17: bool = True, surrender_allowed: bool = True,
+                  units: int = 200, hands_played: int = 1000, num_of_other_players: int = 0,
+                  vectorized: bool = False, seed: int | None = None,
+                  records: str | None = None, metrics: str | None = None,
+                  listen: str | None = None) -> dict[str, dict[str, float]]:
+    """
+    Simulate once with unit bets, then evaluate every better on the recorded hands and print a summary of each.
+
+    The play of a hand doesn't depend on the bet, so this gives the same results as running every better, at the cost
+    of a single simulation.
+
+    :param mover: The class that chooses the action.
+    :param betters: The betters to evaluate. Their bet must only depend on the running count and the number of cards
+        seen, like all the betters in `betting_strategies`.
+    :param total_simulations: How many shoes to play.
+    :param cores: How many worker processes to use.
+    :param deck_number: The number of decks in the initial shoe.
+    :param shoe_penetration: When to reshuffle the shoe. Reshuffles when cards remaining < starting cards * deck penetration.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param units: The number of units in total.
+    :param hands_played: How many hands to play before checking the risk of ruin.
+    :param num_of_other_players: number of players in front of us on the same table, ranging from 0 to 6.
+    :param vectorized: Whether to use the batch simulator.
+    :param seed: The seed of the run. If None, a random seed is used.
+    :param records: Where to keep the hand records of the simulation, to evaluate more betters later with
+        `bet_ramps.evaluate_betters`. If None, they are written to a temporary file.
+    :param metrics: If given, snapshots of the progress and the throughput of the simulation are appended to this file.
+    :param listen: If given, the shoes are played by the workers of other machines that connect to this address
+        (`HOST:PORT`, see `distributed.Coordinator`).
+    :return: The summary of every better, by the name of its class.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = records if records is not None else os.path.join(directory, "records.npy")
+        shoes = int(run(mover, betting_strategies.SimpleBetter(), total_simulations, cores, deck_number,
+                        shoe_penetration, dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed,
+                        units, hands_played, num_of_other_players, plot=False, vectorized=vectorized, seed=seed,
+                        records=path, metrics=metrics, listen=listen)["shoes"])
+        accumulators = evaluate_betters(read_hand_records(path), betters, deck_number)
+    summaries = {type(better).__name__: summarize(accumulator, shoes, units)
+                 for better, accumulator in zip(betters, accumulators)}
+
+    for index, name in enumerate(summaries):
+        print(f"{index}: {name}")
+    columns = ["better"] + list(next(iter(summaries.values())))
+    print_unit_size = 20
+    print('=' * ((print_unit_size + 1) * len(columns) + 1))
+    print("|" + "|".join([x.center(print_unit_size) for x in columns]) + "|")
+    print('-' * ((print_unit_size + 1) * len(columns) + 1))
+    for index, summary in enumerate(summaries.values()):
+        print("|" + "|".join([("{:.3f}".format(x)).center(print_unit_size)
+                              for x in [index] + list(summary.values())]) + "|")
+    print('=' * ((print_unit_size + 1) * len(columns) + 1))
+    logging.info("=" * 50)
+    logging.info("bet ramps:")
+    logging.info('\n' + ','.join(columns) + '\n' + '\n'.join(
+        ','.join([name] + [str(x) for x in summary.values()]) for name, summary in summaries.items()))
+    logging.info("=" * 50)
+    return summaries
 
 if __name__ == "__main__":
     logging.basicConfig(filename='expected_value.log', level=logging.INFO, 
@@ -700,7 +1467,9 @@ if __name__ == "__main__":
                              'default: card-count)')
     parser.add_argument("-b", "--better", default="card-count",
                         help='Use a predefined better. Can also be the name of the class of a user-defined better. '
-                             '(possible values: card-count, simple; default: card-count)')
+                             '(possible values: card-count, simple; default: card-count). Several betters separated '
+                             'by commas (e.g. Wong6,Wong20,Linear2D) are all evaluated from one simulation with unit '
+                             'bets.')
     parser.add_argument("-s", "--simulations", default=100_000, type=int,
                         help='How many simulations to run. Running more simulations gives more accurate '
                              'results but they are slower to calculate. (default: 100,000)')
@@ -718,7 +1487,53 @@ if __name__ == "__main__":
     parser.add_argument("--no-surrender", action='store_true', help='Don\'t allow surrendering. (default: false)')
     parser.add_argument("--units", default=200, type=int, help='The number of units in total. (default: 200)')
     parser.add_argument("--hands-played", default=1000, type=int,
-                        help='How many hands to play before checking the risk of ruin. (default: 1000)')
+                        help='How many hands a trip of the bankroll simulation plays (see --bankroll-paths). '
+                             '(default: 1000)')
+    parser.add_argument("--bankroll-paths", default=0, type=int,
+                        help='Simulate this many bankroll paths of --units over --hands-played hands, and print their '
+                             'risk of ruin, trip results and hands to double the bankroll. The results of the hands '
+                             'are drawn from a normal distribution per true count. (default: 0, none)')
+    parser.add_argument("--other-players", default=0, type=int,
+                        help='The number of players in front of us, from 0 to 6. They play basic strategy. (default: 0)')
+    parser.add_argument("--target-se", default=None, type=float,
+                        help='Stop once the standard error of the EV per 100 hands is at most this. --simulations is '
+                             'then the most shoes to play. (default: none)')
+    parser.add_argument("--time-budget", default=None, type=float,
+                        help='Stop after this many seconds. --simulations is then the most shoes to play. '
+                             '(default: none)')
+    parser.add_argument("--seed", default=None, type=int,
+                        help='The seed of the random shoes, to reproduce a run. (default: random)')
+    parser.add_argument("--vectorized", action='store_true',
+                        help='Play all the shoes at once with NumPy. Only for the basic-strategy and card-count movers. '
+                             '(default: false)')
+    parser.add_argument("--trace", default=None,
+                        help='Record every round (cards, decisions, counts, bet and result) in binary files in this '
+                             'directory. Print them with `python tracing.py DIRECTORY`. (default: no tracing)')
+    parser.add_argument("--records", default=None,
+                        help='Write a record of every hand (counts, bet, result and what was done) to this .npy file, '
+                             'to analyse it afterwards without running the simulation again. (default: none)')
+    parser.add_argument("--profile", action='store_true',
+                        help='Measure the time of every phase of the simulation (shuffle, deal, count, better, mover, '
+                             'player, dealer and bookkeeping) in all the workers and print it. (default: false)')
+    parser.add_argument("--true-count-bins", default=None,
+                        help='The edges of the true count bins of the EV per true count, separated by commas, e.g. '
+                             '--true-count-bins=-21,-1,0,1,2,3,4,5,21. (default: -21,-1,0,1,...,10,21)')
+    parser.add_argument("--checkpoint", default=None,
+                        help='Save the results to this directory as the simulation goes. Running again with the same '
+                             'directory and options resumes the simulation, or extends it with a higher '
+                             '--simulations. (default: none)')
+    parser.add_argument("--cache", default=None,
+                        help='Keep the results in this directory, under the hash of the options, strategies and '
+                             'seed. Running again with the same options reuses them, and only plays the shoes beyond '
+                             'those cached. Only runs with a --seed are cached. (default: none)')
+    parser.add_argument("--listen", default=None,
+                        help='Hand out the shoes to the workers of other machines that connect to this address '
+                             '(HOST:PORT, e.g. 0.0.0.0:5870) instead of playing them on the local cores. Start the '
+                             'workers with `python distributed.py HOST:PORT --cores N`. Other machines need the same '
+                             'secret key in the BLACKJACK_AUTHKEY environment variable. (default: none)')
+    parser.add_argument("--metrics", default=None,
+                        help='Append snapshots of the progress and the throughput (shoes, hands, hands per second, '
+                             'ETA, per worker) to this file, one JSON object per line. (default: none)')
     args = parser.parse_args()
 
     decks_number = args.decks
@@ -729,6 +1544,8 @@ if __name__ == "__main__":
 
     cores_used = args.cores if args.cores != -1 else multiprocessing.cpu_count()
 
+    mover: BaseMover
+    better: BaseBetter | list[BaseBetter]  # Several betters are evaluated from the hand records of one run.
     if args.custom:
         # ADD CUSTOM CODE HERE IF YOU HAVE BUILT YOUR OWN MOVER OR BETTER.
         mover = action_strategies.CardCountMover({(-1000, -1): os.path.join(os.path.dirname(__file__), 'data', 's17', '6deck_s17_das_peek_tc_minus_1.csv'),
@@ -743,7 +1560,21 @@ if __name__ == "__main__":
                                              })
         # mover = action_strategies.BasicStrategyDeviationsMover(os.path.join(os.path.dirname(__file__), 'data', 's17', '6deck_s17_das_peek_basic_strategy.csv'))
         better = betting_strategies.LinearBetterWongIn()
+    elif "," in args.better:
+        mover = get_mover_and_better(args.mover, "simple")[0]
+        better = [get_mover_and_better(args.mover, name)[1] for name in args.better.split(",")]
     else:
         mover, better = get_mover_and_better(args.mover, args.better)
-    run(mover, better, args.simulations, cores_used, args.decks, args.deck_penetration,
-        peek_for_bj, das_allowed, stand_soft_17, can_surrender, args.units, args.hands_played)
+    if isinstance(better, list):
+        run_bet_ramps(mover, better, args.simulations, cores_used, args.decks, args.deck_penetration,
+                      peek_for_bj, das_allowed, stand_soft_17, can_surrender, args.units, args.hands_played,
+                      num_of_other_players=args.other_players, vectorized=args.vectorized, seed=args.seed,
+                      records=args.records, metrics=args.metrics, listen=args.listen)
+    else:
+        run(mover, better, args.simulations, cores_used, args.decks, args.deck_penetration,
+            peek_for_bj, das_allowed, stand_soft_17, can_surrender, args.units, args.hands_played,
+            num_of_other_players=args.other_players, vectorized=args.vectorized, seed=args.seed, target_se=args.target_se,
+            time_budget=args.time_budget, trace_dir=args.trace, records=args.records, metrics=args.metrics,
+            profile=args.profile, checkpoint=args.checkpoint, listen=args.listen, cache=args.cache,
+            true_count_bins=TRUE_COUNT_BINS if args.true_count_bins is None
+            else [float(edge) for edge in args.true_count_bins.split(",")], bankroll_paths=args.bankroll_paths)
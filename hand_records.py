@@ -0,0 +1,248 @@
+"""Write one fixed-width record per hand to a NumPy file in chunks, and read it back memory-mapped."""
+from __future__ import annotations
+
+from typing import Iterable, Sequence, TypeVar
+import shutil
+import struct
+
+import numpy as np
+
+from accumulators import RunningStats, TRUE_COUNT_BINS
+
+"""The flags of a hand record."""
+SPLIT, DOUBLE, SURRENDER, INSURANCE, BLACKJACK = 1, 2, 4, 8, 16
+
+"""One record per hand. The counts are taken at the start of the hand, before the bet."""
+HAND_RECORD_DTYPE = np.dtype([
+    ("true_count", "<f4"),
+    ("running_count", "<i2"),
+    ("cards_remaining", "<u2"),
+    ("bet", "<f4"),
+    ("result", "<f4"),  # The profit/loss of the hand for a bet of 1.
+    ("flags", "u1"),  # `SPLIT`, `DOUBLE`, `SURRENDER`, `INSURANCE` and `BLACKJACK`, or-ed together.
+])
+
+"""A `RecordWriter` or one of its subclasses, as returned by `RecordWriter.__enter__`."""
+Writer = TypeVar("Writer", bound="RecordWriter")
+
+
+def _npy_header(dtype: np.dtype, length: int) -> bytes:
+    """
+    Get the header of an `.npy` file of a 1-D array.
+
+    The header always has the same size for the same dtype, so it can be rewritten with the final length once all the
+    records have been written.
+
+    :param dtype: The dtype of the array.
+    :param length: The number of records.
+    :return: The header.
+    """
+    def header_dict(shape_length: int) -> str:
+        return repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (shape_length,)})
+
+    prefix = np.lib.format.magic(1, 0)
+    # Leave room for the longest length, and align the data to 64 bytes like NumPy.
+    size = -(-(len(prefix) + 2 + len(header_dict(2 ** 64 - 1)) + 1) // 64) * 64
+    header_length = size - len(prefix) - 2
+    return prefix + struct.pack("<H", header_length) + header_dict(length).ljust(header_length - 1).encode() + b"\n"
+
+
+class RecordWriter:
+    """
+    Write records to an `.npy` file, buffering them and writing them in chunks.
+
+    The file can be opened with `np.load(path, mmap_mode="r")` once the writer is closed.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype, buffer_size: int = 65_536) -> None:
+        """
+        Create the file.
+
+        :param path: The path of the file.
+        :param dtype: The dtype of the records.
+        :param buffer_size: How many records are kept in memory before they are written.
+        """
+        self.path = path
+        self.dtype = dtype
+        self.length = 0
+        self.buffer = np.zeros(buffer_size, dtype=dtype)
+        self.buffered = 0
+        self.file = open(path, "wb")
+        self.file.write(_npy_header(dtype, 0))
+
+    def record(self) -> np.void:
+        """
+        Get the next record, to be filled in place.
+
+        :return: The record.
+        """
+        if self.buffered == len(self.buffer):
+            self.flush()
+        self.buffered += 1
+        record: np.void = self.buffer[self.buffered - 1]
+        return record
+
+    def append(self, records: np.ndarray) -> None:
+        """
+        Add many records at once.
+
+        :param records: The records.
+        """
+        if self.buffered + len(records) > len(self.buffer):
+            self.flush()
+        if len(records) > len(self.buffer):
+            np.asarray(records, dtype=self.dtype).tofile(self.file)
+            self.length += len(records)
+            return
+        self.buffer[self.buffered:self.buffered + len(records)] = records
+        self.buffered += len(records)
+
+    def flush(self) -> None:
+        """Write the buffered records."""
+        self.buffer[:self.buffered].tofile(self.file)
+        self.length += self.buffered
+        self.buffered = 0
+
+    def close(self) -> None:
+        """Write the buffered records and the final length, and close the file."""
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.seek(0)
+        self.file.write(_npy_header(self.dtype, self.length))
+        self.file.close()
+
+    def __enter__(self: Writer) -> Writer:
+        """
+        Use the writer in a `with` block, which closes it at the end.
+
+        :return: The writer.
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """
+        Close the writer.
+
+        :param exc_info: The exception raised in the `with` block, if any.
+        """
+        self.close()
+
+
+class HandRecordWriter(RecordWriter):
+    """Write a `HAND_RECORD_DTYPE` record for every hand. Pass it to the simulators as `records`."""
+
+    def __init__(self, path: str, buffer_size: int = 65_536) -> None:
+        """
+        Create the file.
+
+        :param path: The path of the file.
+        :param buffer_size: How many records are kept in memory before they are written.
+        """
+        super().__init__(path, HAND_RECORD_DTYPE, buffer_size)
+
+    def add(self, true_count: float, running_count: int, cards_remaining: int, bet: float, result: float,
+            flags: int) -> None:
+        """
+        Add a hand.
+
+        :param true_count: The true count at the start of the hand.
+        :param running_count: The running count at the start of the hand.
+        :param cards_remaining: The number of cards left in the shoe at the start of the hand.
+        :param bet: The initial bet.
+        :param result: The profit/loss of the hand for a bet of 1.
+        :param flags: The flags of the hand.
+        """
+        if self.buffered == len(self.buffer):
+            self.flush()
+        self.buffer[self.buffered] = (true_count, running_count, cards_remaining, bet, result, flags)
+        self.buffered += 1
+
+    def add_arrays(self, true_counts: np.ndarray, running_counts: np.ndarray, cards_remaining: np.ndarray,
+                   bets: np.ndarray, results: np.ndarray, flags: np.ndarray) -> None:
+        """
+        Add many hands at once.
+
+        :param true_counts: The true counts at the start of the hands.
+        :param running_counts: The running counts at the start of the hands.
+        :param cards_remaining: The number of cards left in the shoe at the start of the hands.
+        :param bets: The initial bets.
+        :param results: The profit/loss of the hands for a bet of 1.
+        :param flags: The flags of the hands.
+        """
+        records = np.empty(len(results), dtype=HAND_RECORD_DTYPE)
+        records["true_count"] = true_counts
+        records["running_count"] = running_counts
+        records["cards_remaining"] = cards_remaining
+        records["bet"] = bets
+        records["result"] = results
+        records["flags"] = flags
+        self.append(records)
+
+
+def hand_flags(decisions: Iterable[str], insured: bool, played: bool, blackjack: bool) -> int:
+    """
+    Get the flags of a hand from the decisions of the mover.
+
+    :param decisions: The actions the mover chose during the hand.
+    :param insured: Whether insurance was taken.
+    :param played: Whether the hand was played (it isn't after a blackjack of the player, or of the dealer when the
+        dealer peeks).
+    :param blackjack: Whether the player has a blackjack.
+    :return: The flags.
+    """
+    flags = BLACKJACK * blackjack + INSURANCE * insured
+    if played:
+        decisions = set(decisions)
+        flags |= SPLIT * ("p" in decisions) | DOUBLE * ("d" in decisions) | SURRENDER * ("u" in decisions)
+    return flags
+
+
+def concatenate_records(paths: Sequence[str], path: str, dtype: np.dtype = HAND_RECORD_DTYPE) -> None:
+    """
+    Join record files into one, without loading them in memory.
+
+    :param paths: The files to join, in order.
+    :param path: The joined file.
+    :param dtype: The dtype of the records.
+    """
+    arrays = [np.load(part, mmap_mode="r") for part in paths]
+    with open(path, "wb") as file:
+        file.write(_npy_header(dtype, sum(len(array) for array in arrays)))
+        for part, array in zip(paths, arrays):
+            with open(part, "rb") as part_file:
+                part_file.seek(array.offset)
+                shutil.copyfileobj(part_file, file)
+
+
+def read_hand_records(path: str) -> np.memmap:
+    """
+    Open a file of hand records without loading it in memory.
+
+    :param path: The path of the file.
+    :return: The records, memory-mapped.
+    """
+    records: np.memmap = np.load(path, mmap_mode="r")
+    if records.dtype != HAND_RECORD_DTYPE:
+        raise ValueError(f"{path} doesn't contain hand records.")
+    return records
+
+
+def ev_by_true_count(records: np.ndarray, true_count_bins: Sequence[float] = TRUE_COUNT_BINS,
+                     chunk_size: int = 10_000_000) -> list[RunningStats]:
+    """
+    Get the statistics of the results grouped by the true count, reading the records a chunk at a time.
+
+    :param records: The hand records, e.g. from `read_hand_records`.
+    :param true_count_bins: The edges of the bins. A true count is in bin `i` if `edges[i] <= true_count < edges[i + 1]`.
+    :param chunk_size: How many records are read at a time.
+    :return: The statistics of the results for a bet of 1 of every bin.
+    """
+    bins = [RunningStats() for _ in range(len(true_count_bins) - 1)]
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        indices = np.searchsorted(true_count_bins, chunk["true_count"], side="right") - 1
+        results = chunk["result"].astype(float)
+        for index, stats in enumerate(bins):
+            stats.merge(RunningStats.from_array(results[indices == index]))
+    return bins
@@ -0,0 +1,132 @@
+"""Pack a hand in one small int and add cards to it with a precomputed table, instead of rescanning its cards."""
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+
+"""
+The fields of a hand state, from the lowest bits: the value of the hand (5 bits, capped at `MAX_VALUE`), whether it has
+an ace counted as 11 (1 bit), the number of cards (4 bits, capped at `MAX_CARDS`) and the rank of its cards while they
+are all the same (4 bits: the first card of a hand of one card, the rank of a pair, 0 otherwise).
+"""
+VALUE_MASK = 0b11111
+SOFT = 1 << 5
+CARDS_SHIFT = 6
+RANK_SHIFT = 10
+
+"""The highest value kept. Adding cards to a busted hand keeps it busted, at this value at most."""
+MAX_VALUE = 31
+
+"""The highest number of cards kept. Hands with more cards count as this many."""
+MAX_CARDS = 15
+
+"""The state of a hand without cards."""
+EMPTY = 0
+
+"""The number of possible states. Every state is below it."""
+STATES = 1 << 14
+
+
+def _transition_table() -> list[int]:
+    """
+    Calculate the state after every card for every possible state.
+
+    :return: A flat list where `table[state << 4 | card]` is the state after adding `card` (2 to 11) to `state`.
+    """
+    states = np.arange(STATES)
+    values = states & VALUE_MASK
+    soft = (states & SOFT) >> 5
+    cards = (states >> CARDS_SHIFT) & MAX_CARDS
+    ranks = states >> RANK_SHIFT
+    table = np.zeros((STATES, 16), dtype=np.int64)
+    for card in range(2, 12):
+        new_values = values + card
+        new_aces = soft + (card == 11)
+        for _ in range(2):  # At most two aces are counted as 11 before one of them is counted as 1.
+            busted = (new_values > 21) & (new_aces > 0)
+            new_values -= 10 * busted
+            new_aces -= busted
+        new_ranks = np.where((cards == 0) | (cards == 1) & (ranks == card), card, 0)
+        table[:, card] = (np.minimum(new_values, MAX_VALUE) | (new_aces > 0) * SOFT
+                          | np.minimum(cards + 1, MAX_CARDS) << CARDS_SHIFT | new_ranks << RANK_SHIFT)
+    return table.ravel().tolist()
+
+
+"""The state after a card, for every state and card: `TRANSITIONS[state << 4 | card]` (see `add_card`)."""
+TRANSITIONS = _transition_table()
+
+
+def add_card(state: int, card: int) -> int:
+    """
+    Add a card to a hand.
+
+    :param state: The state of the hand.
+    :param card: The card (an ace is symbolised as 11).
+    :return: The state of the hand with the card.
+    """
+    return TRANSITIONS[state << 4 | card]
+
+
+def from_cards(cards: Iterable[int]) -> int:
+    """
+    Get the state of a hand.
+
+    :param cards: The cards of the hand.
+    :return: The state.
+    """
+    state = EMPTY
+    for card in cards:
+        state = TRANSITIONS[state << 4 | card]
+    return state
+
+
+def from_value(value: int, soft: bool) -> int:
+    """
+    Get the state of a hand of several cards from its value, when its cards don't matter (e.g. the dealer's hand).
+
+    :param value: The value of the hand.
+    :param soft: Whether the hand has an ace counted as 11.
+    :return: The state of a hand of 2 different cards with this value.
+    """
+    return min(value, MAX_VALUE) | soft * SOFT | 2 << CARDS_SHIFT
+
+
+def hand_value(state: int) -> int:
+    """
+    Get the value of a hand.
+
+    :param state: The state of the hand.
+    :return: The value (e.g. 18), over 21 if the hand is busted.
+    """
+    return state & VALUE_MASK
+
+
+def is_soft(state: int) -> bool:
+    """
+    Get whether a hand has an ace counted as 11.
+
+    :param state: The state of the hand.
+    :return: Whether the hand is soft.
+    """
+    return bool(state & SOFT)
+
+
+def card_number(state: int) -> int:
+    """
+    Get the number of cards of a hand.
+
+    :param state: The state of the hand.
+    :return: The number of cards, at most `MAX_CARDS`.
+    """
+    return (state >> CARDS_SHIFT) & MAX_CARDS
+
+
+def pair_rank(state: int) -> int:
+    """
+    Get the rank of a pair.
+
+    :param state: The state of the hand.
+    :return: The rank of the cards if the hand is two cards of the same rank, otherwise 0.
+    """
+    return state >> RANK_SHIFT if (state >> CARDS_SHIFT) & MAX_CARDS == 2 else 0
@@ -0,0 +1,107 @@
+"""Play the other players at the table with basic strategy, so that their cards feed the count like at a real table."""
+from __future__ import annotations
+
+from typing import MutableSequence
+import functools
+import os
+
+from action_strategies import ACTIONS, CompiledStrategy, HARD, PAIR, SOFT, read_strategy_file
+from utils import ShoeState
+
+"""The most players that can sit at the table with us."""
+MAX_OTHER_PLAYERS = 6
+
+"""The basic strategy the other players follow, by whether the dealer stands on soft 17."""
+STRATEGY_FILES = {True: os.path.join(os.path.dirname(__file__), "data", "s17", "6deck_s17_das_peek_basic.csv"),
+                  False: os.path.join(os.path.dirname(__file__), "data", "h17", "6deck_h17_das_peek_basic.csv")}
+
+HIT, DOUBLE, SPLIT, SURRENDER = (ACTIONS.index(action) for action in "hdpu")
+
+
+@functools.lru_cache(maxsize=None)
+def basic_strategy(dealer_stands_soft_17: bool) -> CompiledStrategy:
+    """
+    Get the compiled basic strategy of the other players.
+
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :return: The compiled strategy, read once per process.
+    """
+    return CompiledStrategy([read_strategy_file(STRATEGY_FILES[dealer_stands_soft_17])])
+
+
+def check_other_players(num_of_other_players: int) -> None:
+    """
+    Check the number of other players at the table.
+
+    :param num_of_other_players: The number of players in front of us.
+    """
+    if num_of_other_players < 0 or num_of_other_players > MAX_OTHER_PLAYERS:
+        raise NotImplementedError("num_of_other_players = {}".format(num_of_other_players))
+
+
+def play_other_player(actions: list[int], first_card: int, second_card: int, dealer_up_card: int,
+                      shoe: MutableSequence[int], shoe_state: ShoeState, das: bool, surrender_allowed: bool) -> bool:
+    """
+    Play the hand of another player, only to draw the cards they would draw.
+
+    Every decision reads the flat action list of the first bucket of a `CompiledStrategy` directly, without calling a
+    mover or building `Hand` objects, so the other players cost little next to our own hand. Splits follow the same
+    rules as our hand in `batch_expected_value`: every hand can be split again up to three times, and split aces get
+    one card each.
+
+    :param actions: The flat list of the action codes of a compiled strategy (`CompiledStrategy._actions`).
+    :param first_card: The player's first card.
+    :param second_card: The player's second card.
+    :param dealer_up_card: The dealer's up card.
+    :param shoe: The shoe. Cards are drawn from its end.
+    :param shoe_state: The state of the shoe, updated with the cards drawn.
+    :param das: Whether the player can double after splitting.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :return: Whether any of the player's hands is still standing, so the dealer has to play.
+    """
+    if first_card + second_card == 21:  # Blackjack is paid right away.
+        return False
+    standing = False
+    splits_remaining = 3
+    pending: list[int] = []  # The splits remaining of the hands waiting for their second card.
+    can_surrender = surrender_allowed
+    card = second_card
+    while True:
+        total = first_card + card
+        aces = (first_card == 11) + (card == 11)
+        if total > 21:
+            total -= 10
+            aces -= 1
+        permissions = (das or splits_remaining == 3) + 2 * can_surrender
+        can_surrender = False
+        if first_card == card and splits_remaining and (card != 11 or splits_remaining == 3):
+            action = actions[((PAIR * 22 + card) * 12 + dealer_up_card) * 4 + permissions]
+        else:
+            action = actions[(((SOFT if aces else HARD) * 22 + total) * 12 + dealer_up_card) * 4 + permissions]
+        if action == SPLIT:
+            if card == 11:  # Split aces get one card each, and can't bust.
+                shoe_state.deal(shoe.pop())
+                shoe_state.deal(shoe.pop())
+                return True
+            splits_remaining -= 1
+            pending.append(splits_remaining)
+            card = shoe.pop()
+            shoe_state.deal(card)
+            continue
+        while action == HIT or action == DOUBLE:
+            new_card = shoe.pop()
+            shoe_state.deal(new_card)
+            total += new_card
+            aces += new_card == 11
+            while total > 21 and aces:
+                total -= 10
+                aces -= 1
+            if total > 21 or action == DOUBLE:
+                break
+            action = actions[(((SOFT if aces else HARD) * 22 + total) * 12 + dealer_up_card) * 4]
+        standing |= total <= 21 and action != SURRENDER
+        if not pending:
+            return standing
+        splits_remaining = pending.pop()
+        card = shoe.pop()
+        shoe_state.deal(card)
@@ -0,0 +1,174 @@
+"""Measure where the time of a simulation goes, phase by phase. Costs nothing when profiling is off."""
+from __future__ import annotations
+
+from typing import Collection
+import time
+
+from action_strategies import BaseMover
+from utils import ShoeState
+
+"""The phases of a simulation, in the order of a round. The time spent outside the other phases is bookkeeping."""
+PHASES = ("shuffle", "deal", "count", "better", "mover", "player", "dealer", "bookkeeping")
+
+
+class PhaseProfile:
+    """
+    The time spent in every phase of a simulation and how many times each phase was entered.
+
+    The phases nest (e.g. the mover is asked during the player's play-out), and the time of a phase only counts while
+    no phase nested in it runs, so the times add up to the time profiled.
+    """
+
+    def __init__(self) -> None:
+        """Start with no time in any phase, in the bookkeeping phase."""
+        self.seconds = dict.fromkeys(PHASES, 0.)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self._stack = ["bookkeeping"]
+        self._since = time.perf_counter()
+
+    def enter(self, phase: str) -> None:
+        """
+        Start a phase, pausing the phase that runs.
+
+        :param phase: One of `PHASES`.
+        """
+        now = time.perf_counter()
+        self.seconds[self._stack[-1]] += now - self._since
+        self._stack.append(phase)
+        self.calls[phase] += 1
+        self._since = now
+
+    def exit(self) -> None:
+        """End the last phase started, and resume the one it paused."""
+        now = time.perf_counter()
+        self.seconds[self._stack.pop()] += now - self._since
+        self._since = now
+
+    def stop(self) -> None:
+        """Count the time of the running phase until now, so that the profile can be sent or printed."""
+        self.seconds[self._stack[-1]] += time.perf_counter() - self._since
+        self._since = time.perf_counter()
+
+    def merge(self, other: PhaseProfile) -> None:
+        """
+        Add the times and the calls of another profile, e.g. of another worker process.
+
+        :param other: The other profile.
+        """
+        for phase in PHASES:
+            self.seconds[phase] += other.seconds[phase]
+            self.calls[phase] += other.calls[phase]
+
+    def table(self) -> str:
+        """
+        Get the breakdown of the time by phase.
+
+        :return: A table with the calls, the seconds, the share of the time and the microseconds per call of every
+            phase. The calls of the bookkeeping phase aren't counted.
+        """
+        total = sum(self.seconds.values())
+        lines = [f"{'phase':<12}|{'calls':>14}|{'seconds':>10}|{'share':>8}|{'us/call':>9}",
+                 "-" * 57]
+        for phase in PHASES:
+            seconds = self.seconds[phase]
+            calls = self.calls[phase]
+            share = 100 * seconds / total if total > 0 else 0.
+            per_call = f"{1e6 * seconds / calls:9.3f}" if calls else f"{'-':>9}"
+            lines.append(f"{phase:<12}|{calls:>14,}|{seconds:>10.3f}|{share:>7.1f}%|{per_call}")
+        lines.append("-" * 57)
+        lines.append(f"{'total':<12}|{'':>14}|{total:>10.3f}|{100.:>7.1f}%|{'':>9}")
+        return "\n".join(lines)
+
+
+class ProfilingMover(BaseMover):
+    """Wrap a mover and count the time of its decisions in the mover phase."""
+
+    def __init__(self, mover: BaseMover, profile: PhaseProfile) -> None:
+        """
+        Wrap a mover.
+
+        :param mover: The mover that chooses the actions.
+        :param profile: The profile to count the time in.
+        """
+        self.mover = mover
+        self.profile = profile
+
+    # Unlike the static `BaseMover.get_move`, it reads the mover it wraps and the profile.
+    def get_move(self, hand_value: int, hand_has_ace: bool, dealer_up_card: int,  # type: ignore[override]
+                 can_double: bool, can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int],
+                 cards_seen: Collection[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
+                 dealer_stands_soft_17: bool) -> tuple[str, bool]:
+        """
+        Get the move of the wrapped mover and time it.
+
+        :param hand_value: The value of the hand (e.g. 18).
+        :param hand_has_ace: Whether the hand has an ace that is counted as 11.
+        :param dealer_up_card: The dealer's up card.
+        :param can_double: Whether we can double.
+        :param can_split: Whether we can split.
+        :param can_surrender: Whether we can surrender.
+        :param can_insure: Whether we can take insurance.
+        :param hand_cards: The cards in our hand (e.g. 8, 7, 3).
+        :param cards_seen: The cards we have already seen from the shoe.
+        :param deck_number: The number of decks in the starting shoe.
+        :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+        :param das: Whether we can double after splitting.
+        :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+        :return: The action to do, and whether to take insurance.
+        """
+        self.profile.enter("mover")
+        try:
+            return self.mover.get_move(hand_value, hand_has_ace, dealer_up_card, can_double, can_split,
+                                       can_surrender, can_insure, hand_cards, cards_seen, deck_number,
+                                       dealer_peeks_for_blackjack, das, dealer_stands_soft_17)
+        finally:
+            self.profile.exit()
+
+
+class ProfilingShoeState(ShoeState):
+    """A `ShoeState` that counts the time of updating the count and of the true count in the count phase."""
+
+    def __init__(self, deck_number: int, profile: PhaseProfile) -> None:
+        """
+        Start tracking a full shoe.
+
+        :param deck_number: How many decks the shoe started with.
+        :param profile: The profile to count the time in.
+        """
+        super().__init__(deck_number)
+        self.profile = profile
+
+    def deal(self, card: int, hidden: bool = False) -> None:
+        """
+        Remove a card from the shoe, and time it.
+
+        :param card: The card dealt.
+        :param hidden: Whether the card was dealt face down.
+        """
+        self.profile.enter("count")
+        self.cards_remaining -= 1
+        if not hidden:
+            ShoeState.see(self, card)  # Not `self.see`, which would count the call twice.
+        self.profile.exit()
+
+    def see(self, card: int) -> None:
+        """
+        Add a card to the cards we have seen, and time it.
+
+        :param card: The card we saw.
+        """
+        self.profile.enter("count")
+        super().see(card)
+        self.profile.exit()
+
+    def true_count(self) -> float:
+        """
+        Get the Hi-Lo true count of the cards remaining in the shoe, and time it.
+
+        :return: The true count.
+        """
+        self.profile.enter("count")
+        try:
+            return super().true_count()
+        finally:
+            self.profile.exit()
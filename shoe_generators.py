@@ -1,7 +1,70 @@
 """Shoe generators."""
-from utils import get_hilo_true_count, DECK
+from __future__ import annotations
+
 import random
 
+import numpy as np
+
+from utils import get_hilo_true_count, DECK
+
+"""How many shoes are shuffled at once by `ShuffledShoes` by default."""
+SHOES_PER_REFILL = 1024
+
+
+class ShuffledShoes:
+    """
+    Hand out shuffled shoes as a `bytearray`, shuffling many of them at once with NumPy.
+
+    The shoes are shuffled in bulk into a preallocated int8 buffer, one shoe per row, with `Generator.permuted`. Every
+    shoe handed out is copied into the same `bytearray`, which the simulator deals from the end with `pop`: dealing a
+    card only moves the end of the buffer, and `len` is the number of cards left, like `ShoeState.cards_remaining`.
+    """
+
+    def __init__(self, deck_number: int, rng: np.random.Generator, shoes_per_refill: int = SHOES_PER_REFILL) -> None:
+        """
+        Allocate the buffers. The first shoes are shuffled when the first shoe is asked for.
+
+        :param deck_number: The number of decks in the shoe.
+        :param rng: The random number generator used to shuffle the shoes.
+        :param shoes_per_refill: How many shoes are shuffled at once.
+        """
+        self.rng = rng
+        self.starting_shoe = np.array(DECK * deck_number, dtype=np.int8)
+        self.buffer = np.empty((max(shoes_per_refill, 1), len(self.starting_shoe)), dtype=np.int8)
+        self.next_row = len(self.buffer)  # The row of the next shoe handed out.
+        self.shoe = bytearray(len(self.starting_shoe))
+
+    def next_shoe(self) -> bytearray:
+        """
+        Get a new shuffled shoe.
+
+        :return: The shoe. The same `bytearray` is refilled by every call, so the previous shoe is gone.
+        """
+        if self.next_row == len(self.buffer):
+            self._refill()
+        self.shoe[:] = self.buffer[self.next_row].data
+        self.next_row += 1
+        return self.shoe
+
+    def next_shoes(self, number: int) -> np.ndarray:
+        """
+        Get several new shuffled shoes at once, without copying them.
+
+        :param number: The most shoes to get.
+        :return: The shoes, one per row, in the order `next_shoe` would hand them out. There are fewer than `number`
+            when the buffer runs out. They are overwritten when the buffer is refilled.
+        """
+        if self.next_row == len(self.buffer):
+            self._refill()
+        shoes = self.buffer[self.next_row:self.next_row + number]
+        self.next_row += len(shoes)
+        return shoes
+
+    def _refill(self) -> None:
+        """Shuffle the next shoes into the buffer."""
+        self.rng.permuted(np.broadcast_to(self.starting_shoe, self.buffer.shape), axis=1, out=self.buffer)
+        self.next_row = 0
+
 
 def hilo_generator(true_count: int, decks: int, deck_penetration: float, cards_present: list[int]) -> list[int]:
     """
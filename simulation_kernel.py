@@ -0,0 +1,480 @@
+"""Play whole shoes in one compiled loop with Numba, for the movers whose strategy is compiled into arrays."""
+from __future__ import annotations
+
+from typing import Any, Callable, TypeVar
+
+import numpy as np
+
+from action_strategies import (BaseMover, BasicStrategyDeviationsMover, BasicStrategyMover, CardCountMover,
+                               CompiledStrategy, HARD, PAIR, SOFT)
+from betting_strategies import BaseBetter, MAX_SPOTS, SIT_OUT
+from hand_state import CARDS_SHIFT, MAX_CARDS, RANK_SHIFT, SOFT as SOFT_ACE, TRANSITIONS, VALUE_MASK
+from other_players import DOUBLE, HIT, MAX_OTHER_PLAYERS, SPLIT, SURRENDER
+from utils import HILO_VALUES
+import betting_strategies
+
+try:
+    import numba  # type: ignore[import-not-found]
+except ImportError:  # Numba is optional. Without it, `expected_value` plays the hands with its `RoundEngine`.
+    numba = None
+
+"""Whether Numba is installed. Without it, the functions of this module are plain (and slow) Python."""
+NUMBA_AVAILABLE = numba is not None
+
+"""The movers the kernel can play, by their `get_move`. They only read their `CompiledStrategy` and the true count."""
+SUPPORTED_MOVES = (BasicStrategyMover.get_move, BasicStrategyDeviationsMover.get_move, CardCountMover.get_move)
+
+"""The most hands a spot can have, with 3 splits."""
+MAX_HANDS = 8
+
+"""The counters of the shoe being played: the cards left in it, the Hi-Lo running count and the cards seen."""
+POSITION, RUNNING_COUNT, CARDS_SEEN = range(3)
+
+"""A function, which `_compile` returns compiled with the same signature."""
+Function = TypeVar("Function", bound=Callable[..., Any])
+
+
+def _compile(function: Function) -> Function:
+    """
+    Compile a function with Numba, if it is installed.
+
+    :param function: The function.
+    :return: The compiled function, or the function itself without Numba.
+    """
+    return numba.njit(cache=True)(function) if NUMBA_AVAILABLE else function
+
+
+def supports(action_class: BaseMover, betting_class: BaseBetter) -> bool:
+    """
+    Check whether the kernel plays the same hands as `expected_value.RoundEngine` for a mover and a better.
+
+    :param action_class: The mover.
+    :param betting_class: The better.
+    :return: Whether the mover is one of `SUPPORTED_MOVES` with a compiled strategy, and the better is one of
+        `betting_strategies`, whose bet and spots only depend on the running count and the number of cards seen.
+    """
+    return (getattr(type(action_class), "get_move", None) in SUPPORTED_MOVES
+            and isinstance(getattr(action_class, "compiled", None), CompiledStrategy)
+            and _counts_only(betting_class))
+
+
+def _counts_only(betting_class: BaseBetter) -> bool:
+    """
+    Check whether a better and the betters it wraps are all betters of `betting_strategies`.
+
+    A wrapper like `betting_strategies.MultiSpotBetter` is only supported if the better it wraps is.
+
+    :param betting_class: The better.
+    :return: Whether the bets and the spots only depend on the running count and the number of cards seen.
+    """
+    return (type(betting_class).get_bet.__module__ == betting_strategies.__name__
+            and type(betting_class).get_spots.__module__ == betting_strategies.__name__
+            and all(_counts_only(value) for value in getattr(betting_class, "__dict__", {}).values()
+                    if isinstance(value, BaseBetter)))
+
+
+@_compile
+def _draw(shoe: np.ndarray, counters: np.ndarray, hilo: np.ndarray, hidden: bool = False) -> int:
+    """
+    Deal the next card of a shoe, from its end like `list.pop`.
+
+    :param shoe: The shoe.
+    :param counters: The counters of the shoe (`POSITION`, `RUNNING_COUNT` and `CARDS_SEEN`), updated.
+    :param hilo: The Hi-Lo value of every card.
+    :param hidden: Whether the card is dealt face down, and not counted until it is seen with `_see`.
+    :return: The card.
+    """
+    counters[POSITION] -= 1
+    card = int(shoe[counters[POSITION]])
+    if not hidden:
+        counters[RUNNING_COUNT] += hilo[card]
+        counters[CARDS_SEEN] += 1
+    return card
+
+
+@_compile
+def _see(card: int, counters: np.ndarray, hilo: np.ndarray) -> None:
+    """
+    Count a card dealt face down.
+
+    :param card: The card.
+    :param counters: The counters of the shoe, updated.
+    :param hilo: The Hi-Lo value of every card.
+    """
+    counters[RUNNING_COUNT] += hilo[card]
+    counters[CARDS_SEEN] += 1
+
+
+@_compile
+def _bucket(boundaries: np.ndarray, available: np.ndarray, deck_number: int, counters: np.ndarray) -> int:
+    """
+    Get the strategy bucket of the next decision, like the `get_move` of the supported movers.
+
+    :param boundaries: The boundaries of the buckets (`CompiledStrategy.boundaries`).
+    :param available: Whether every bucket has a strategy.
+    :param deck_number: The number of decks in the starting shoe.
+    :param counters: The counters of the shoe.
+    :return: The bucket.
+    """
+    if len(boundaries) == 0:  # Basic strategy, which doesn't need the true count.
+        return 0
+    true_count = counters[RUNNING_COUNT] / (deck_number - (counters[CARDS_SEEN] + 1) / 52)
+    bucket = 0
+    while bucket < len(boundaries) and boundaries[bucket] <= true_count:
+        bucket += 1
+    if not available[bucket]:
+        raise IndexError("There is no file provided for a true count.")
+    return bucket
+
+
+@_compile
+def _play_dealer(shoe: np.ndarray, counters: np.ndarray, hilo: np.ndarray, transitions: np.ndarray, dealer_up_card: int,
+                 dealer_down_card: int, dealer_stands_soft_17: bool) -> int:
+    """
+    Play the dealer's hand, like `expected_value.play_dealer`.
+
+    :return: The final value of the dealer's hand, 0 if the dealer busted.
+    """
+    state = transitions[transitions[dealer_up_card] << 4 | dealer_down_card]
+    while state & VALUE_MASK < 17 or not dealer_stands_soft_17 and state & (VALUE_MASK | SOFT_ACE) == 17 | SOFT_ACE:
+        state = transitions[state << 4 | _draw(shoe, counters, hilo)]
+    dealer_value = state & VALUE_MASK
+    return dealer_value if dealer_value <= 21 else 0
+
+
+@_compile
+def _play_other_player(actions: np.ndarray, first_card: int, second_card: int, dealer_up_card: int, shoe: np.ndarray,
+                       counters: np.ndarray, hilo: np.ndarray, das: bool, surrender_allowed: bool) -> bool:
+    """
+    Play the hand of another player, like `other_players.play_other_player`.
+
+    :param actions: The actions of the first bucket of the other players' strategy (`CompiledStrategy.actions[0]`).
+    :return: Whether any of the player's hands is still standing, so the dealer has to play.
+    """
+    if first_card + second_card == 21:
+        return False
+    pending = np.zeros(3, np.int64)
+    pending_number = 0
+    standing = False
+    splits_remaining = 3
+    can_surrender = surrender_allowed
+    card = second_card
+    while True:
+        total = first_card + card
+        aces = int(first_card == 11) + int(card == 11)
+        if total > 21:
+            total -= 10
+            aces -= 1
+        permissions = (das or splits_remaining == 3) + 2 * can_surrender
+        can_surrender = False
+        if first_card == card and splits_remaining and (card != 11 or splits_remaining == 3):
+            action = actions[PAIR, card, dealer_up_card, permissions]
+        else:
+            action = actions[SOFT if aces else HARD, total, dealer_up_card, permissions]
+        if action == SPLIT:
+            if card == 11:
+                _draw(shoe, counters, hilo)
+                _draw(shoe, counters, hilo)
+                return True
+            splits_remaining -= 1
+            pending[pending_number] = splits_remaining
+            pending_number += 1
+            card = _draw(shoe, counters, hilo)
+            continue
+        while action == HIT or action == DOUBLE:
+            new_card = _draw(shoe, counters, hilo)
+            total += new_card
+            aces += int(new_card == 11)
+            while total > 21 and aces:
+                total -= 10
+                aces -= 1
+            if total > 21 or action == DOUBLE:
+                break
+            action = actions[SOFT if aces else HARD, total, dealer_up_card, 0]
+        standing |= total <= 21 and action != SURRENDER
+        if not pending_number:
+            return standing
+        pending_number -= 1
+        splits_remaining = pending[pending_number]
+        card = _draw(shoe, counters, hilo)
+
+
+@_compile
+def _burn_round(other_actions: np.ndarray, shoe: np.ndarray, counters: np.ndarray, hilo: np.ndarray,
+                transitions: np.ndarray, num_of_other_players: int, dealer_peeks_for_blackjack: bool, das: bool,
+                dealer_stands_soft_17: bool, surrender_allowed: bool, phantom_seat: bool) -> None:
+    """Deal a round we sit out, like `expected_value.burn_round`."""
+    seats = num_of_other_players + int(phantom_seat)
+    first_cards = np.zeros(MAX_OTHER_PLAYERS + 1, np.int64)
+    second_cards = np.zeros(MAX_OTHER_PLAYERS + 1, np.int64)
+    for seat in range(seats):
+        first_cards[seat] = _draw(shoe, counters, hilo)
+    dealer_up_card = _draw(shoe, counters, hilo)
+    for seat in range(seats):
+        second_cards[seat] = _draw(shoe, counters, hilo)
+    dealer_down_card = _draw(shoe, counters, hilo, True)
+    dealer_plays = False
+    if not (dealer_peeks_for_blackjack and dealer_up_card + dealer_down_card == 21):
+        for seat in range(seats):
+            dealer_plays |= _play_other_player(other_actions, first_cards[seat], second_cards[seat], dealer_up_card,
+                                               shoe, counters, hilo, das, surrender_allowed)
+    if dealer_plays:
+        _play_dealer(shoe, counters, hilo, transitions, dealer_up_card, dealer_down_card, dealer_stands_soft_17)
+    _see(dealer_down_card, counters, hilo)
+
+
+@_compile
+def _play_spot(first_card: int, second_card: int, dealer_up_card: int, dealer_down_card: int, shoe: np.ndarray,
+               counters: np.ndarray, hilo: np.ndarray, transitions: np.ndarray, actions: np.ndarray,
+               insurance: np.ndarray, boundaries: np.ndarray, available: np.ndarray, deck_number: int,
+               dealer_peeks_for_blackjack: bool, das: bool, surrender_allowed: bool, values: np.ndarray,
+               bets: np.ndarray) -> tuple[float, int]:
+    """
+    Play the hands of one spot, like `expected_value.RoundEngine.play_spot`.
+
+    :param values: Filled with the value of every hand to compare with the dealer's.
+    :param bets: Filled with the number of bets of these hands.
+    :return: The profit/loss that doesn't depend on the dealer's hand, and the number of hands to compare with the
+        dealer's.
+    """
+    state = transitions[transitions[first_card] << 4 | second_card]
+    pair = first_card if first_card == second_card else 0
+    table = PAIR if pair else SOFT if state & SOFT_ACE else HARD
+    bucket = _bucket(boundaries, available, deck_number, counters)
+    action = actions[bucket, table, pair if pair else state & VALUE_MASK, dealer_up_card, 1 + 2 * surrender_allowed]
+    profit = 0.
+    if dealer_up_card == 11 and insurance[bucket, table, pair if pair else state & VALUE_MASK, dealer_up_card]:
+        profit = 1. if dealer_down_card == 10 else -.5
+
+    dealer_has_blackjack = dealer_up_card + dealer_down_card == 21
+    if first_card + second_card == 21:
+        return profit + (0. if dealer_has_blackjack else 1.5), 0
+    if dealer_has_blackjack and dealer_peeks_for_blackjack:
+        return profit - 1, 0
+    if action == SURRENDER and surrender_allowed:
+        return profit - .5, 0
+
+    # `RoundEngine.play_hands`, with the hands waiting for their second card on a stack.
+    pending = np.zeros(3, np.int64)
+    pending_number = 0
+    splits_remaining = 3
+    split_rank = 0
+    hand = 0
+    open_number = 0
+    hand_bets = 1
+    while True:
+        if state & VALUE_MASK <= 21:
+            two_cards = (state >> CARDS_SHIFT) & MAX_CARDS == 2
+            pair = state >> RANK_SHIFT if two_cards else 0
+            can_split = splits_remaining > 0 and pair != 0 and (pair != 11 or not split_rank)
+            can_double = int(two_cards and (das or not split_rank))
+            if action < 0:
+                bucket = _bucket(boundaries, available, deck_number, counters)
+                if can_split:
+                    action = actions[bucket, PAIR, pair, dealer_up_card, can_double]
+                else:
+                    action = actions[bucket, SOFT if state & SOFT_ACE else HARD, state & VALUE_MASK, dealer_up_card,
+                                     can_double]
+            if action == HIT or action == DOUBLE and can_double:
+                state = transitions[state << 4 | _draw(shoe, counters, hilo)]
+                if action == HIT:
+                    action = -1
+                    continue
+                hand_bets = 2
+            elif action == SPLIT and can_split:
+                split_rank = pair
+                splits_remaining -= 1
+                state = transitions[transitions[pair] << 4 | _draw(shoe, counters, hilo)]
+                if pair == 11:  # Split aces get one card each.
+                    second_state = transitions[transitions[pair] << 4 | _draw(shoe, counters, hilo)]
+                    for split_state in (state, second_state):
+                        if split_state & VALUE_MASK > 21 or dealer_has_blackjack:
+                            profit -= 1
+                        else:
+                            values[open_number] = split_state & VALUE_MASK
+                            bets[open_number] = 1
+                            open_number += 1
+                    return profit, open_number
+                pending[pending_number] = splits_remaining
+                pending_number += 1
+                action = -1
+                continue
+            elif action != 0:
+                raise ValueError("invalid action.")
+        # The hand is over: without the peek, all the bets are lost to a dealer blackjack.
+        if state & VALUE_MASK > 21 or dealer_has_blackjack:
+            profit -= hand_bets
+        else:
+            values[open_number] = state & VALUE_MASK
+            bets[open_number] = hand_bets
+            open_number += 1
+        hand += 1
+        if not pending_number:
+            return profit, open_number
+        pending_number -= 1
+        splits_remaining = pending[pending_number]
+        state = transitions[transitions[split_rank] << 4 | _draw(shoe, counters, hilo)]
+        hand_bets = 1
+        action = -1
+
+
+@_compile
+def play_shoes(shoes: np.ndarray, reshuffle_at: int, deck_number: int, actions: np.ndarray, insurance: np.ndarray,
+               boundaries: np.ndarray, available: np.ndarray, other_actions: np.ndarray, bet_table: np.ndarray,
+               spots_table: np.ndarray, num_of_other_players: int, dealer_peeks_for_blackjack: bool, das: bool,
+               dealer_stands_soft_17: bool, surrender_allowed: bool, phantom_seat: bool, transitions: np.ndarray,
+               hilo: np.ndarray, bets: np.ndarray, rewards: np.ndarray, true_counts: np.ndarray) -> tuple[int, int]:
+    """
+    Play shoes from start to reshuffle, with the same cards, decisions and results as `expected_value.expected_value`.
+
+    :param shoes: The shuffled shoes, one per row (see `shoe_generators.ShuffledShoes.next_shoes`). Cards are dealt from
+        the end of every row.
+    :param reshuffle_at: The number of cards left in the shoe under which it is reshuffled.
+    :param deck_number: The number of decks in the starting shoe.
+    :param actions: The actions of our strategy (`CompiledStrategy.actions`).
+    :param insurance: Whether to take insurance (`CompiledStrategy.insurance`).
+    :param boundaries: The boundaries of the true count buckets of our strategy.
+    :param available: Whether every bucket of our strategy is available.
+    :param other_actions: The actions of the first bucket of the other players' strategy.
+    :param bet_table: The bet table of the better (see `betting_strategies.BaseBetter.get_bet_table`).
+    :param spots_table: The spots table of the better (see `betting_strategies.BaseBetter.get_spots_table`).
+    :param num_of_other_players: The number of players in front of us.
+    :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+    :param das: Whether we can double after splitting.
+    :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+    :param surrender_allowed: Whether the game rules allow surrendering.
+    :param phantom_seat: Whether our seat is dealt and played in the rounds we sit out (see
+        `expected_value.burn_round`).
+    :param transitions: The hand state transitions (`hand_state.TRANSITIONS`, as an array).
+    :param hilo: The Hi-Lo value of every card.
+    :param bets: Filled with the bet of every hand. It must have room for `max_hands(...)` hands.
+    :param rewards: Filled with the profit/loss of every hand, in money.
+    :param true_counts: Filled with the true count at the start of every hand.
+    :return: The number of hands played and the number of rounds sat out.
+    """
+    counters = np.zeros(3, np.int64)
+    other_first_cards = np.zeros(MAX_OTHER_PLAYERS, np.int64)
+    other_second_cards = np.zeros(MAX_OTHER_PLAYERS, np.int64)
+    spot_first_cards = np.zeros(MAX_SPOTS, np.int64)
+    spot_second_cards = np.zeros(MAX_SPOTS, np.int64)
+    profits = np.zeros(MAX_SPOTS)
+    open_numbers = np.zeros(MAX_SPOTS, np.int64)
+    values = np.zeros((MAX_SPOTS, MAX_HANDS), np.int64)
+    hand_bets = np.zeros((MAX_SPOTS, MAX_HANDS), np.int64)
+    max_running_count = 20 * deck_number
+    cards = 52 * deck_number
+    hands = 0
+    sat_out = 0
+    for row in range(shoes.shape[0]):
+        shoe = shoes[row]
+        counters[POSITION] = shoes.shape[1]
+        counters[RUNNING_COUNT] = 0
+        counters[CARDS_SEEN] = 0
+        while counters[POSITION] >= reshuffle_at:
+            running_count = counters[RUNNING_COUNT]
+            true_count = running_count / (counters[POSITION] / 52)
+            cards_seen = cards - counters[POSITION]
+            initial_bet = bet_table[running_count + max_running_count, cards_seen]
+            if initial_bet == SIT_OUT:
+                _burn_round(other_actions, shoe, counters, hilo, transitions, num_of_other_players,
+                            dealer_peeks_for_blackjack, das, dealer_stands_soft_17, surrender_allowed, phantom_seat)
+                sat_out += 1
+                continue
+            spots = spots_table[running_count + max_running_count, cards_seen]
+            for seat in range(num_of_other_players):
+                other_first_cards[seat] = _draw(shoe, counters, hilo)
+            for spot in range(spots):
+                spot_first_cards[spot] = _draw(shoe, counters, hilo)
+            dealer_up_card = _draw(shoe, counters, hilo)
+            for seat in range(num_of_other_players):
+                other_second_cards[seat] = _draw(shoe, counters, hilo)
+            for spot in range(spots):
+                spot_second_cards[spot] = _draw(shoe, counters, hilo)
+            dealer_down_card = _draw(shoe, counters, hilo, True)
+            dealer_plays = False
+            if num_of_other_players and not (dealer_peeks_for_blackjack and dealer_up_card + dealer_down_card == 21):
+                for seat in range(num_of_other_players):
+                    dealer_plays |= _play_other_player(other_actions, other_first_cards[seat],
+                                                       other_second_cards[seat], dealer_up_card, shoe, counters, hilo,
+                                                       das, surrender_allowed)
+            for spot in range(spots):
+                profits[spot], open_numbers[spot] = _play_spot(
+                    spot_first_cards[spot], spot_second_cards[spot], dealer_up_card, dealer_down_card, shoe, counters,
+                    hilo, transitions, actions, insurance, boundaries, available, deck_number,
+                    dealer_peeks_for_blackjack, das, surrender_allowed, values[spot], hand_bets[spot])
+                dealer_plays |= open_numbers[spot] > 0
+            if dealer_plays:
+                dealer_value = _play_dealer(shoe, counters, hilo, transitions, dealer_up_card, dealer_down_card,
+                                            dealer_stands_soft_17)
+                for spot in range(spots):  # `expected_value.settle_spot`.
+                    for hand in range(open_numbers[spot]):
+                        if dealer_value > values[spot, hand]:
+                            profits[spot] -= hand_bets[spot, hand]
+                        elif values[spot, hand] > dealer_value:
+                            profits[spot] += hand_bets[spot, hand]
+            _see(dealer_down_card, counters, hilo)
+            for spot in range(spots):
+                bets[hands] = initial_bet
+                rewards[hands] = profits[spot] * initial_bet
+                true_counts[hands] = true_count
+                hands += 1
+    return hands, sat_out
+
+
+def max_hands(shoes: int, deck_number: int) -> int:
+    """
+    Get the most hands `play_shoes` can play, to allocate its results.
+
+    :param shoes: The number of shoes.
+    :param deck_number: The number of decks in the starting shoe.
+    :return: The most hands: every round deals at least 4 cards and has at most `betting_strategies.MAX_SPOTS` spots.
+    """
+    return shoes * (deck_number * 52 // 4 + 1) * MAX_SPOTS
+
+
+class Kernel:
+    """The arrays of a mover, a better and the rules that `play_shoes` takes, built once per simulation."""
+
+    def __init__(self, action_class: BaseMover, betting_class: BaseBetter, other_players_strategy: CompiledStrategy,
+                 deck_number: int, shoe_penetration: float, dealer_peeks_for_blackjack: bool, das: bool,
+                 dealer_stands_soft_17: bool, surrender_allowed: bool, num_of_other_players: int,
+                 phantom_seat: bool = False) -> None:
+        """
+        Build the arrays.
+
+        :param action_class: The mover, which `supports` the kernel.
+        :param betting_class: The better, which `supports` the kernel.
+        :param other_players_strategy: The strategy of the other players. Only its first bucket is used.
+        :param deck_number: The number of decks in the starting shoe.
+        :param shoe_penetration: When to reshuffle the shoe (see `expected_value.expected_value`).
+        :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+        :param das: Whether we can double after splitting.
+        :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+        :param surrender_allowed: Whether the game rules allow surrendering.
+        :param num_of_other_players: The number of players in front of us.
+        :param phantom_seat: Whether our seat is dealt and played in the rounds we sit out.
+        """
+        compiled: CompiledStrategy = getattr(action_class, "compiled")  # Checked by `supports`.
+        self.deck_number = deck_number
+        self.arguments = (int(deck_number * 52 * shoe_penetration), deck_number, compiled.actions.astype(np.int64),
+                          compiled.insurance, np.array(compiled.boundaries, dtype=float),
+                          np.array(compiled.available), other_players_strategy.actions[0].astype(np.int64),
+                          betting_class.get_bet_table(deck_number), betting_class.get_spots_table(deck_number),
+                          num_of_other_players, dealer_peeks_for_blackjack, das, dealer_stands_soft_17,
+                          surrender_allowed, phantom_seat, np.array(TRANSITIONS, dtype=np.int64),
+                          np.array(HILO_VALUES, dtype=np.int64))
+
+    def play(self, shoes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """
+        Play shoes with `play_shoes`.
+
+        :param shoes: The shuffled shoes, one per row.
+        :return: The bet, the profit/loss and the true count at the start of every hand, and the number of rounds sat
+            out.
+        """
+        size = max_hands(len(shoes), self.deck_number)
+        bets = np.empty(size)
+        rewards = np.empty(size)
+        true_counts = np.empty(size)
+        hands, sat_out = play_shoes(shoes, *self.arguments, bets, rewards, true_counts)
+        return bets[:hands], rewards[:hands], true_counts[:hands], sat_out
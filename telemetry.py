@@ -0,0 +1,180 @@
+"""Report the progress and the throughput of a run on one line for all the workers, and in a metrics file."""
+from __future__ import annotations
+
+from typing import Any, Callable, TextIO
+import json
+import logging
+import sys
+import time
+
+from utils import readable_number
+
+"""How often the progress line is printed, in seconds."""
+PRINT_INTERVAL = 1.
+
+"""How often a snapshot is written to the metrics file, in seconds."""
+SNAPSHOT_INTERVAL = 10.
+
+"""What a worker reports about a chunk of shoes: the shoes, the hands played (for all the configurations), the seconds
+it took and the id of the worker process."""
+ChunkReport = tuple[int, int, float, int]
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Write a duration in a short human-readable form.
+
+    :param seconds: The duration.
+    :return: The duration, e.g. "1h 02m 03s", or "?" if it isn't known.
+    """
+    if seconds != seconds or seconds == float("inf"):
+        return "?"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressMonitor:
+    """
+    Collect the progress reports of the workers of a run.
+
+    It prints one progress line for all of them with an ETA, and writes snapshots of the throughput to a metrics file.
+    The metrics file has one JSON object per line (see `snapshot`), written every `snapshot_interval` seconds and when
+    the run ends.
+    """
+
+    def __init__(self, total_shoes: int, metrics_path: str | None = None, print_progress: bool = True,
+                 snapshot_interval: float = SNAPSHOT_INTERVAL, output: TextIO | None = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Start monitoring a run.
+
+        :param total_shoes: How many shoes the run plays at most.
+        :param metrics_path: If given, the snapshots are appended to this file.
+        :param print_progress: Whether to print the progress line.
+        :param snapshot_interval: How often a snapshot is written, in seconds.
+        :param output: Where the progress line is printed. Defaults to `sys.stdout`. On a terminal, the line is
+            rewritten in place.
+        :param clock: The clock, in seconds.
+        """
+        self.total_shoes = total_shoes
+        self.print_progress = print_progress
+        self.snapshot_interval = snapshot_interval
+        self.output = output
+        self.clock = clock
+        self.start = clock()
+        self.shoes = 0
+        self.hands = 0
+        self.busy_seconds = 0.  # The time the workers spent playing, summed over the workers.
+        self.workers: dict[int, list[float]] = {}  # The shoes, hands and busy seconds of every worker.
+        self._metrics = open(metrics_path, "a") if metrics_path is not None else None
+        self._last_print = -PRINT_INTERVAL
+        self._last_snapshot = 0.
+        self._printed = False
+
+    def add(self, shoes: int, hands: int, seconds: float, worker: int = 0) -> None:
+        """
+        Add the report of a worker about the shoes it has played since its last report.
+
+        :param shoes: The shoes played.
+        :param hands: The hands played.
+        :param seconds: The time it took the worker to play them.
+        :param worker: The id of the worker.
+        """
+        self.shoes += shoes
+        self.hands += hands
+        self.busy_seconds += seconds
+        totals = self.workers.setdefault(worker, [0, 0, 0.])
+        totals[0] += shoes
+        totals[1] += hands
+        totals[2] += seconds
+        now = self.clock() - self.start
+        if self.print_progress and now - self._last_print >= PRINT_INTERVAL:
+            self._print_line()
+            self._last_print = now
+        if self._metrics is not None and now - self._last_snapshot >= self.snapshot_interval:
+            self._write_snapshot(self._metrics)
+            self._last_snapshot = now
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Get the progress and the throughput of the run so far.
+
+        :return: The seconds elapsed, the shoes and hands played, the total shoes, the hands per second of the whole run
+            (`hands_per_second`) and of one worker while it plays (`hands_per_worker_second`), the shoes per second,
+            the estimated seconds left (`eta_seconds`, None when unknown), and the shoes, hands and hands per second of
+            every worker (by its id).
+        """
+        elapsed = self.clock() - self.start
+        shoes_per_second = self.shoes / elapsed if elapsed > 0 else 0.
+        return {"elapsed_seconds": elapsed,
+                "shoes": self.shoes,
+                "total_shoes": self.total_shoes,
+                "hands": self.hands,
+                "shoes_per_second": shoes_per_second,
+                "hands_per_second": self.hands / elapsed if elapsed > 0 else 0.,
+                "hands_per_worker_second": self.hands / self.busy_seconds if self.busy_seconds > 0 else 0.,
+                "eta_seconds": (self.total_shoes - self.shoes) / shoes_per_second if shoes_per_second > 0 else None,
+                "workers": {str(worker): {"shoes": shoes, "hands": hands,
+                                          "hands_per_second": hands / seconds if seconds > 0 else 0.}
+                            for worker, (shoes, hands, seconds) in self.workers.items()}}
+
+    def line(self) -> str:
+        """
+        Describe the progress of the run on one line.
+
+        :return: The shoes played, the hands played, the throughput, the time elapsed and the ETA.
+        """
+        snapshot = self.snapshot()
+        eta = snapshot["eta_seconds"]
+        return (f"Shoes: {readable_number(self.shoes)}/{readable_number(self.total_shoes)} "
+                f"({100 * self.shoes / max(self.total_shoes, 1):.1f}%) | "
+                f"hands: {readable_number(self.hands)} | "
+                f"{readable_number(round(snapshot['hands_per_second']))} hands/s "
+                f"({readable_number(round(snapshot['hands_per_worker_second']))}/s on {len(self.workers)} "
+                f"worker{'s' if len(self.workers) != 1 else ''}) | "
+                f"elapsed: {format_duration(snapshot['elapsed_seconds'])} | "
+                f"ETA: {format_duration(eta if eta is not None else float('nan'))}")
+
+    def close(self) -> None:
+        """End the run: print the last progress line, write the last snapshot and log the throughput."""
+        if self.print_progress:
+            self._print_line()
+            if self._printed and self._on_terminal():
+                print(file=self.output or sys.stdout)
+        if self._metrics is not None:
+            self._write_snapshot(self._metrics)
+            self._metrics.close()
+            self._metrics = None
+        logging.info(self.line())
+
+    def _print_line(self) -> None:
+        """Print the progress line, in place on a terminal."""
+        output = self.output or sys.stdout
+        if self._on_terminal():
+            print("\r" + self.line(), end="", file=output, flush=True)
+        else:
+            print(self.line(), file=output, flush=True)
+        self._printed = True
+
+    def _on_terminal(self) -> bool:
+        """
+        Check whether the progress line is printed to a terminal.
+
+        :return: Whether the output is a terminal.
+        """
+        output = self.output or sys.stdout
+        return hasattr(output, "isatty") and output.isatty()
+
+    def _write_snapshot(self, metrics: TextIO) -> None:
+        """
+        Append a snapshot to the metrics file.
+
+        :param metrics: The metrics file.
+        """
+        metrics.write(json.dumps(self.snapshot()) + "\n")
+        metrics.flush()
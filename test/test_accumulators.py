@@ -0,0 +1,104 @@
+"""Test the result accumulators."""
+import random
+
+import numpy as np
+import pytest
+
+from accumulators import ResultAccumulator, RunningStats, batch_means
+
+
+def get_hands(number: int, seed: int) -> tuple[list[float], list[float], list[float]]:
+    """Get random bets, rewards and true counts."""
+    rng = random.Random(seed)
+    bets: list[float] = [rng.choice([1, 2, 4]) for _ in range(number)]
+    rewards = [bet * rng.choice([-2, -1, -1, -.5, 0, 1, 1, 1.5, 2]) for bet in bets]
+    true_counts = [rng.uniform(-25, 25) for _ in range(number)]
+    return bets, rewards, true_counts
+
+
+def check_drawdown(accumulator: ResultAccumulator, rewards: list[float]) -> None:
+    """Check the maximum drawdown and its duration against the whole profit curve."""
+    profits = np.cumsum(rewards)
+    drawdowns = np.maximum.accumulate(profits) - profits
+    bottom = np.argmax(drawdowns)
+    assert accumulator.max_drawdown == pytest.approx(np.max(drawdowns))
+    assert accumulator.drawdown_duration() == bottom - np.argmax(profits[:bottom + 1]) + 1
+
+
+def test_running_stats() -> None:
+    """Test that the mean and standard deviation match NumPy, whether the numbers are added or merged."""
+    values = np.array(get_hands(1000, 1)[1])
+    stats = RunningStats()
+    for value in values[:300]:
+        stats.add(value)
+    stats.merge(RunningStats.from_array(values[300:]))
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(np.mean(values))
+    assert stats.std() == pytest.approx(np.std(values))
+    assert np.isnan(RunningStats().std())
+
+
+def test_result_accumulator() -> None:
+    """Test the statistics of one accumulator against the whole lists."""
+    bets, rewards, true_counts = get_hands(2550, 2)
+    accumulator = ResultAccumulator()
+    for bet, reward, true_count in zip(bets, rewards, true_counts):
+        accumulator.add(bet, reward, true_count)
+    assert accumulator.hands == 2550
+    assert accumulator.total_bet == sum(bets)
+    assert accumulator.profit == pytest.approx(sum(rewards))
+    assert accumulator.total_win == pytest.approx(sum(x for x in rewards if x > 0))
+    assert accumulator.total_loss == pytest.approx(sum(-x for x in rewards if x < 0))
+    chunk_sums = [sum(rewards[i:i + 100]) for i in range(0, len(rewards), 100)]
+    assert accumulator.chunk_stats().mean == pytest.approx(np.mean(chunk_sums))
+    assert accumulator.chunk_stats().std() == pytest.approx(np.std(chunk_sums))
+    check_drawdown(accumulator, rewards)
+    in_bin = [reward for reward, true_count in zip(rewards, true_counts) if 2 <= true_count < 3]
+    assert accumulator.bins[4].count == len(in_bin)
+    assert accumulator.bins[4].mean == pytest.approx(np.mean(in_bin))
+    assert accumulator.bin_bets[4] == sum(bet for bet, true_count in zip(bets, true_counts) if 2 <= true_count < 3)
+    assert accumulator.curve_hands[-1] == 2550
+    assert accumulator.curve_profits[-1] == pytest.approx(sum(rewards))
+
+
+def test_add_arrays_and_merge() -> None:
+    """Test that adding arrays and merging accumulators give the same results as adding every hand."""
+    bets, rewards, true_counts = get_hands(5000, 3)
+    expected = ResultAccumulator(max_curve_points=100)
+    for bet, reward, true_count in zip(bets, rewards, true_counts):
+        expected.add(bet, reward, true_count)
+
+    arrays = ResultAccumulator(max_curve_points=100)
+    merged = ResultAccumulator(max_curve_points=100)
+    for start, end in [(0, 37), (37, 1200), (1200, 1300), (1300, 4001), (4001, 5000)]:
+        arrays.add_arrays(np.array(bets[start:end]), np.array(rewards[start:end]), np.array(true_counts[start:end]))
+        part = ResultAccumulator(max_curve_points=100)
+        for bet, reward, true_count in zip(bets[start:end], rewards[start:end], true_counts[start:end]):
+            part.add(bet, reward, true_count)
+        merged.merge(part)
+
+    for accumulator in (arrays, merged):
+        assert accumulator.hands == expected.hands
+        assert accumulator.rewards.mean == pytest.approx(expected.rewards.mean)
+        assert accumulator.rewards.std() == pytest.approx(expected.rewards.std())
+        assert accumulator.total_win == pytest.approx(expected.total_win)
+        assert accumulator.wins == expected.wins
+        check_drawdown(accumulator, rewards)
+        for stats, expected_stats in zip(accumulator.bins, expected.bins):
+            assert stats.count == expected_stats.count
+            assert stats.mean == pytest.approx(expected_stats.mean)
+        assert accumulator.bin_bets == pytest.approx(expected.bin_bets)
+        assert len(accumulator.curve_hands) <= 100
+    # Adding arrays keeps the chunks whole. Merging counts the last chunk of every part as a chunk of its own.
+    assert arrays.chunk_stats().std() == pytest.approx(expected.chunk_stats().std())
+    assert merged.chunk_stats().count == expected.chunk_stats().count + 2
+
+
+def test_batch_means() -> None:
+    """Test the mean and standard error from batches of the same and of different sizes."""
+    totals = [10., 12., 8., 14.]
+    mean, standard_error = batch_means(totals, [5] * 4)
+    assert mean == pytest.approx(2.2)
+    assert standard_error == pytest.approx(np.std(np.array(totals) / 5, ddof=1) / 2)
+    assert batch_means([10., 2.], [10, 2]) == (1., 0.)
+    assert np.isnan(batch_means([3.], [2])[1])
@@ -0,0 +1,71 @@
+"""Test the movers."""
+import os
+
+import pytest
+
+from action_strategies import BaseMover, BasicStrategyMover, BasicStrategyDeviationsMover, CardCountMover, CompiledStrategy
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17')
+
+
+def get_move(mover: BaseMover, hand_value: int, hand_has_ace: bool, dealer_up_card: int, can_double: bool,
+             can_split: bool, can_surrender: bool, hand_cards: list[int], true_count: float = 0) -> tuple[str, bool]:
+    """Get the move of a mover with the cards seen chosen so that the true count is `true_count` (for 6 decks)."""
+    # With 51 cards seen and the down card, 5 decks are left.
+    running_count = int(true_count * 5)
+    cards_seen = [2] * max(running_count, 0) + [10] * max(-running_count, 0)
+    cards_seen += [8] * (51 - len(cards_seen))
+    return mover.get_move(hand_value, hand_has_ace, dealer_up_card, can_double, can_split, can_surrender, False,
+                          hand_cards, cards_seen, 6, True, True, False)
+
+
+def test_basic_strategy_mover() -> None:
+    """Test that the fallback actions are resolved when compiling the basic strategy."""
+    mover = BasicStrategyMover(os.path.join(DATA, '6deck_h17_das_peek_basic.csv'))
+    assert get_move(mover, 16, False, 10, True, False, True, [10, 6]) == ("u", False)
+    assert get_move(mover, 16, False, 10, True, False, False, [10, 6]) == ("h", False)
+    assert get_move(mover, 11, False, 6, True, False, False, [5, 6]) == ("d", False)
+    assert get_move(mover, 11, False, 6, False, False, False, [5, 6, 0]) == ("h", False)
+    assert get_move(mover, 16, False, 10, True, True, False, [8, 8]) == ("p", False)
+    assert get_move(mover, 12, True, 6, False, True, False, [11, 11]) == ("p", False)
+    assert mover.compiled.actions.shape == (1, 3, 22, 12, 4)
+
+
+def test_deviations_mover() -> None:
+    """Test that the deviations are played from the right true count."""
+    mover = BasicStrategyDeviationsMover(os.path.join(DATA, '6deck_h17_das_peek_basic.csv'))
+    assert get_move(mover, 12, False, 3, False, False, False, [10, 2], 1) == ("h", False)
+    assert get_move(mover, 12, False, 3, False, False, False, [10, 2], 2) == ("s", False)
+    assert get_move(mover, 12, False, 4, False, False, False, [10, 2], -1) == ("h", False)
+    assert get_move(mover, 12, False, 4, False, False, False, [10, 2], 0) == ("s", False)
+    assert get_move(mover, 20, False, 6, True, True, False, [10, 10], 3) == ("s", False)
+    assert get_move(mover, 20, False, 6, True, True, False, [10, 10], 4) == ("p", False)
+    assert get_move(mover, 20, False, 6, True, False, False, [10, 10], 4) == ("s", False)
+
+
+def test_card_count_mover() -> None:
+    """Test that the strategy of the right true count range is used."""
+    mover = CardCountMover({(-1000, 1): os.path.join(DATA, '6deck_h17_das_peek_tc_minus_0.csv'),
+                            (2, 1000): os.path.join(DATA, '6deck_h17_das_peek_tc_plus_6.csv')})
+    assert mover.compiled.boundaries == [-1000, 1, 2, 1000]
+    assert mover.compiled.available == [False, True, False, True, False]
+    assert get_move(mover, 16, False, 8, False, False, True, [10, 6], 0) == ("h", False)
+    assert get_move(mover, 16, False, 8, False, False, True, [10, 6], 2) == ("u", False)
+    with pytest.raises(IndexError):
+        get_move(mover, 16, False, 8, False, False, True, [10, 6], 1)
+
+
+def test_compiled_strategy() -> None:
+    """Test the buckets of a compiled strategy."""
+    strategy = ({total: {card: "s" for card in range(2, 12)} for total in range(22)},
+                {total: {card: "ids" for card in range(2, 12)} for total in range(22)},
+                {card: {card: "uh" for card in range(2, 12)} for card in range(12)})
+    compiled = CompiledStrategy([None, strategy], [0])
+    with pytest.raises(IndexError):
+        compiled.bucket(-.5)
+    assert compiled.bucket(0) == compiled.bucket(20) == 1
+    assert compiled.get_move(1, 18, True, 6, True, False, False, True, [11, 7]) == ("d", True)
+    assert compiled.get_move(1, 18, True, 6, False, False, False, False, [11, 7]) == ("s", False)
+    assert compiled.get_move(1, 16, False, 6, False, True, True, False, [8, 8]) == ("u", False)
+    with pytest.raises(ValueError):
+        CompiledStrategy([strategy], [0])
@@ -0,0 +1,84 @@
+"""Test the simulation of bankroll paths."""
+import os
+from typing import Any
+
+import numpy as np
+import pytest
+
+from accumulators import RunningStats
+from action_strategies import BasicStrategyMover
+from bankroll import (END, RUIN, STOP_LOSS, WIN_GOAL, format_bankroll, outcomes_from_records, play_paths,
+                      simulate_bankroll, simulate_bankroll_by_true_count)
+from betting_strategies import SimpleBetter
+from expected_value import run
+from hand_records import HAND_RECORD_DTYPE
+
+H17_BASIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "h17", "6deck_h17_das_peek_basic.csv")
+
+
+def play_path(increments: list[float], units: float, stop_loss: float | None,
+              win_goal: float | None) -> tuple[float, int, int, int]:
+    """Follow one bankroll path hand by hand, in a loop."""
+    bankroll = units
+    doubled = -1
+    for hand, increment in enumerate(increments, 1):
+        bankroll += increment
+        if doubled == -1 and bankroll >= 2 * units:
+            doubled = hand
+        if bankroll <= 0:
+            return bankroll - units, hand, RUIN, doubled
+        if stop_loss is not None and bankroll <= units - stop_loss:
+            return bankroll - units, hand, STOP_LOSS, doubled
+        if win_goal is not None and bankroll >= units + win_goal:
+            return bankroll - units, hand, WIN_GOAL, doubled
+    return bankroll - units, len(increments), END, doubled
+
+
+def test_play_paths() -> None:
+    """Test that the paths played at once end like the paths played one at a time."""
+    rng = np.random.default_rng(1)
+    increments = rng.choice([-2., -1., 1., 1.5, 2.], (300, 200))
+    for stop_loss, win_goal in [(None, None), (8, 12), (9.5, 12), (30, None), (None, 10)]:
+        results, played, endings, hands_to_double = play_paths(increments, 10, stop_loss, win_goal)
+        for path, row in enumerate(increments):
+            expected = play_path(row.tolist(), 10, stop_loss, win_goal)
+            assert (results[path], played[path], endings[path], hands_to_double[path]) == pytest.approx(expected)
+    assert {RUIN, STOP_LOSS, WIN_GOAL} <= set(play_paths(increments, 10, 9.5, 12)[2].tolist())
+
+
+def test_simulate_bankroll() -> None:
+    """Test the rates and the quantiles of the trips, from recorded hands and from true count bins."""
+    records = np.zeros(4, dtype=HAND_RECORD_DTYPE)
+    records["bet"] = [1, 2, 1, 2]
+    records["result"] = [1, 1, -1, 1.5]
+    outcomes = outcomes_from_records(records, chunk_size=3)
+    assert outcomes.tolist() == [1, 2, -1, 3]
+    assert outcomes_from_records(records, np.ones(4)).tolist() == [1, 1, -1, 1.5]
+    # Blocks of the 4 hands in order, from the first hand only.
+    summary = simulate_bankroll(outcomes, 10, 8, paths=50, block_size=4, seed=1)
+    assert summary["risk_of_ruin"] == 0
+    assert summary["result_quantiles"][.5] == 10
+    assert summary["double_rate"] == 1
+    assert summary["hands_to_double_quantiles"][.5] == 8
+    summary = simulate_bankroll(np.array([-1.]), 10, 20, paths=5, seed=1)
+    assert summary["risk_of_ruin"] == 1
+    assert summary["mean_hands"] == 10
+    assert np.isnan(summary["hands_to_double_quantiles"][.5])
+
+    stats = [RunningStats.from_array(np.array([-1., 1.])), RunningStats(), RunningStats.from_array(np.array([2., 2.]))]
+    summary = simulate_bankroll_by_true_count(stats, 20, 100, paths=3_000, stop_loss=10, win_goal=10, seed=2)
+    assert summary["paths"] == 3_000
+    assert summary["stop_loss_rate"] + summary["win_goal_rate"] + summary["risk_of_ruin"] == pytest.approx(1, abs=.01)
+    assert summary["win_goal_rate"] > .9  # The hands win half a unit on average.
+    assert summary["mean_result"] == pytest.approx(10, abs=2)
+    assert "risk of ruin" in format_bankroll(summary)
+
+
+def test_run_bankroll_paths(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that a run only simulates bankroll paths when asked to."""
+    mover = BasicStrategyMover(H17_BASIC)
+    rules: dict[str, Any] = {"cores": 1, "plot": False, "seed": 3, "dealer_stands_soft_17": False, "hands_played": 100}
+    run(mover, SimpleBetter(), 20, **rules)
+    assert "bankroll of" not in capsys.readouterr().out
+    run(mover, SimpleBetter(), 20, bankroll_paths=50, **rules)
+    assert "bankroll of 200 units over 100 hands (normal approximation per tc)" in capsys.readouterr().out
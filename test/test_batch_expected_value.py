@@ -0,0 +1,140 @@
+"""Test the NumPy batch simulator."""
+import os
+import random
+
+import numpy as np
+import pytest
+
+import batch_expected_value
+from action_strategies import BasicStrategyMover
+from accumulators import ResultAccumulator
+from betting_strategies import MultiSpotBetter, RampBetter, SIT_OUT, SimpleBetter, Wong6
+from expected_value import expected_value, simulate_hand, simulate_spots
+
+STRATEGY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17', '6deck_h17_das_peek_basic.csv')
+
+
+def test_rounds_match_simulate_hand() -> None:
+    """Test that a round played in the batch gives the same result as `simulate_hand` with the same cards."""
+    mover = BasicStrategyMover(STRATEGY)
+    # (player cards, dealer up card, dealer down card, cards drawn afterward in order)
+    scenarios = [([10, 4], 4, 10, [2, 3, 4]), ([10, 11], 4, 10, [2]), ([2, 9], 4, 10, [10, 5]),
+                 ([11, 2], 5, 6, [10, 3, 9]), ([2, 2], 7, 10, [2, 2, 8, 10, 8, 10, 8, 10, 8, 10]),
+                 ([8, 8], 10, 7, [10, 3, 9, 9, 11, 11, 6, 11, 10, 10]), ([11, 11], 6, 10, [10, 9, 5]),
+                 ([10, 6], 10, 2, [5, 10]), ([10, 7], 11, 10, [3]), ([10, 6], 11, 2, [5, 10, 9]),
+                 ([9, 3], 2, 9, [10, 10, 4]), ([5, 5], 9, 7, [11, 2, 10])]
+    for surrender_allowed in (False, True):
+        batch = batch_expected_value._Batch(len(scenarios), 6, np.random.default_rng(0))
+        for row, (cards, dealer_up_card, dealer_down_card, drawn) in enumerate(scenarios):
+            dealt = [cards[0], dealer_up_card, cards[1], dealer_down_card] + drawn
+            batch.shoes[row] = dealt + [10] * (len(batch.starting_shoe) - len(dealt))
+        rewards = batch_expected_value._play_round(batch, np.arange(len(scenarios)), mover.compiled, 6, True, True,
+                                                   False, surrender_allowed, 0)
+        for reward, (cards, dealer_up_card, dealer_down_card, drawn) in zip(rewards, scenarios):
+            shoe = [10] * 20 + drawn[::-1]
+            assert reward == simulate_hand(mover, cards, dealer_up_card, dealer_down_card, shoe, 3, 6, True, True,
+                                           False, surrender_allowed)
+
+
+def test_batch_expected_value() -> None:
+    """Test that a seeded run is reproducible and plays every shoe."""
+    mover = BasicStrategyMover(STRATEGY)
+    bets, rewards, true_counts = batch_expected_value.batch_expected_value(
+        mover, SimpleBetter(), 50, deck_number=6, shoe_penetration=.25, dealer_stands_soft_17=False,
+        batch_size=16, seed=3)
+    assert len(bets) == len(rewards) == len(true_counts)
+    assert 40 * 50 < len(bets) < 50 * 50
+    assert (bets == 1).all()
+    assert true_counts[0] == 0
+    again = batch_expected_value.batch_expected_value(
+        mover, SimpleBetter(), 50, deck_number=6, shoe_penetration=.25, dealer_stands_soft_17=False,
+        batch_size=16, seed=3)[1]
+    assert (rewards == again).all()
+
+
+def test_spots_match_simulate_spots() -> None:
+    """Test that several spots played in the batch give the same results as `simulate_spots` with the same cards."""
+    mover = BasicStrategyMover(STRATEGY)
+    # (cards of every spot, dealer up card, dealer down card, cards drawn afterward in order)
+    scenarios = [([[10, 4], [10, 6]], 4, 10, [2, 3, 4]), ([[10, 11], [9, 9], [2, 9]], 6, 10, [10, 7, 5, 8]),
+                 ([[8, 8], [10, 9]], 10, 11, [3]), ([[10, 6], [11, 2], [10, 10]], 10, 6, [10, 9, 4, 9]),
+                 ([[5, 6]], 9, 7, [2, 10]), ([[10, 10], [10, 7]], 7, 10, [])]
+    batch = batch_expected_value._Batch(len(scenarios), 6, np.random.default_rng(0))
+    for row, (spots, dealer_up_card, dealer_down_card, drawn) in enumerate(scenarios):
+        dealt = [cards[0] for cards in spots] + [dealer_up_card] + [cards[1] for cards in spots] + [dealer_down_card]
+        batch.shoes[row] = dealt + drawn + [10] * (len(batch.starting_shoe) - len(dealt) - len(drawn))
+    spot_numbers = np.array([len(spots) for spots, _, _, _ in scenarios])
+    rewards = batch_expected_value._play_round(batch, np.arange(len(scenarios)), mover.compiled, 6, True, True, False,
+                                               False, 0, spots=spot_numbers)
+    for row, (spots, dealer_up_card, dealer_down_card, drawn) in enumerate(scenarios):
+        shoe = [10] * 20 + drawn[::-1]
+        expected = simulate_spots(mover, spots, dealer_up_card, dealer_down_card, shoe, 3, 6, True, True, False)
+        assert rewards[row, :len(spots)].tolist() == expected
+        assert not rewards[row, len(spots):].any()
+        assert batch.positions[row] == 2 * len(spots) + 2 + len(drawn) + 20 - len(shoe)
+
+
+def test_multi_spot_better() -> None:
+    """Test that every spot is a hand of its own, and that the spots are played from the same rounds."""
+    mover = BasicStrategyMover(STRATEGY)
+    better = MultiSpotBetter(SimpleBetter(), (-100, -100))
+    random.seed(6)
+    one_spot = expected_value(mover, SimpleBetter(), 40, dealer_stands_soft_17=False, progress=False)[0]
+    random.seed(6)
+    three_spots = expected_value(mover, better, 40, dealer_stands_soft_17=False, progress=False)[2]
+    assert len(three_spots) % 3 == 0
+    assert three_spots[::3] == three_spots[1::3] == three_spots[2::3]
+    # Three spots use the cards of a shoe in fewer rounds, but play more hands.
+    assert len(one_spot) < len(three_spots) < 3 * len(one_spot)
+    batch_one_spot = batch_expected_value.batch_expected_value(mover, SimpleBetter(), 40, dealer_stands_soft_17=False,
+                                                               seed=6)[0]
+    batch_three_spots = batch_expected_value.batch_expected_value(mover, better, 40, dealer_stands_soft_17=False,
+                                                                  seed=6)[2]
+    assert (batch_three_spots[::3] == batch_three_spots[2::3]).all()
+    assert len(batch_three_spots) / len(batch_one_spot) == pytest.approx(len(three_spots) / len(one_spot), rel=.1)
+
+
+def test_sit_out() -> None:
+    """Test that the rounds sat out are dealt without our seat, or like the rounds played with a phantom seat."""
+    mover = BasicStrategyMover(STRATEGY)
+    never = RampBetter((-100, 100), (SIT_OUT,))
+    # With a phantom seat, our seat is played with the same basic strategy, so the shoes are dealt in the same rounds.
+    played = batch_expected_value.batch_expected_value(mover, SimpleBetter(), 40, dealer_stands_soft_17=False,
+                                                       seed=9)[0]
+    accumulator = ResultAccumulator()
+    batch_expected_value.batch_expected_value(mover, never, 40, dealer_stands_soft_17=False, seed=9,
+                                              accumulator=accumulator, phantom_seat=True)
+    assert accumulator.hands == 0
+    assert accumulator.rounds_sat_out == len(played)
+    # Without other players, an empty seat only leaves the dealer's two cards to deal: many more rounds per shoe.
+    for vectorized in (False, True):
+        accumulator = ResultAccumulator()
+        if vectorized:
+            batch_expected_value.batch_expected_value(mover, never, 40, dealer_stands_soft_17=False, seed=9,
+                                                      accumulator=accumulator)
+        else:
+            expected_value(mover, never, 40, dealer_stands_soft_17=False, progress=False, seed=9,
+                           accumulator=accumulator)
+        assert accumulator.hands == 0
+        assert accumulator.rounds_sat_out == 40 * (int(6 * 52 * .75) // 2 + 1)
+
+    better = MultiSpotBetter(Wong6(), (2,))
+    for vectorized in (False, True):
+        accumulator = ResultAccumulator()
+        if vectorized:
+            batch_expected_value.batch_expected_value(mover, better, 40, dealer_stands_soft_17=False, seed=9,
+                                                      accumulator=accumulator)
+        else:
+            expected_value(mover, better, 40, dealer_stands_soft_17=False, progress=False, accumulator=accumulator)
+        # Most rounds are sat out with Wong6, and the hands played all have a bet.
+        assert accumulator.rounds_sat_out > accumulator.hands / 2 > 0
+        assert accumulator.total_bet >= accumulator.hands
+
+
+def test_cached_tables() -> None:
+    """Test that the tables of a better are only built once per process, also for copies of the better."""
+    table = Wong6().get_bet_table(6)
+    assert Wong6().get_bet_table(6) is table
+    assert not table.flags.writeable
+    assert RampBetter([-21, 1, 21], [1, 4]).get_bet_table(6) is not RampBetter([-21, 1, 21], [1, 8]).get_bet_table(6)
+    assert MultiSpotBetter(Wong6(), (2, 4)).get_spots_table(6).dtype == np.int64
@@ -0,0 +1,75 @@
+"""Test the evaluation of betters from hand records."""
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from action_strategies import BasicStrategyMover
+from accumulators import RunningStats
+from bet_ramps import WONG_OUT_BET, count_table, evaluate_betters, optimize_ramp, ramp_metrics
+from batch_expected_value import batch_expected_value
+from betting_strategies import Linear2D, RampBetter, SimpleBetter, Wong6
+from hand_records import HandRecordWriter, ev_by_true_count, read_hand_records
+
+STRATEGY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17', '6deck_h17_das_peek_basic.csv')
+
+
+def test_evaluate_betters(tmp_path: Path) -> None:
+    """Test that the betters evaluated from a unit-bet simulation get the results of simulating them directly."""
+    mover = BasicStrategyMover(STRATEGY)
+    path = str(tmp_path / "records.npy")
+    with HandRecordWriter(path) as writer:
+        batch_expected_value(mover, SimpleBetter(), 100, dealer_stands_soft_17=False, seed=7, records=writer)
+    betters = [Wong6(), Linear2D(), SimpleBetter()]
+    accumulators = evaluate_betters(read_hand_records(path), betters, 6, chunk_size=1000)
+    for better, accumulator in zip(betters, accumulators):
+        bets, rewards, _ = batch_expected_value(mover, better, 100, dealer_stands_soft_17=False, seed=7,
+                                                phantom_seat=True)
+        assert accumulator.hands == len(rewards)
+        assert accumulator.total_bet == pytest.approx(bets.sum())
+        assert accumulator.profit == pytest.approx(rewards.sum())
+        assert accumulator.rewards.std() == pytest.approx(rewards.std())
+
+
+def test_ramp_metrics() -> None:
+    """Test that the metrics of a ramp from the count table match the results of the hands."""
+    rng = np.random.default_rng(0)
+    bins = rng.integers(0, 3, 10_000)
+    results = rng.choice([-1., 1., 1.5, -2.], 10_000) + .1 * bins
+    stats = [RunningStats.from_array(results[bins == index]) for index in range(3)]
+    bets = np.array([1., 2., 4.])
+    metrics = ramp_metrics(bets, *count_table(stats))
+    assert metrics["ev_per_hand"] == pytest.approx(np.mean(results * bets[bins]))
+    assert metrics["std_per_hand"] == pytest.approx(np.std(results * bets[bins]))
+    assert metrics["score"] == pytest.approx(1e6 * np.mean(results * bets[bins]) ** 2 / np.var(results * bets[bins]))
+
+
+def test_optimize_ramp(tmp_path: Path) -> None:
+    """Test that the optimized ramp respects the constraints and beats a flat bet."""
+    path = str(tmp_path / "records.npy")
+    with HandRecordWriter(path) as writer:
+        batch_expected_value(BasicStrategyMover(STRATEGY), SimpleBetter(), 3000, dealer_stands_soft_17=False, seed=8,
+                             records=writer)
+    stats = ev_by_true_count(read_hand_records(path))
+    better = optimize_ramp(stats, min_bet=2, max_spread=6, wong_out=(None, 0, 1), bet_step=1)
+    playing = [bet for bet in better.bets if bet != WONG_OUT_BET]
+    assert min(playing) >= 2 and max(playing) <= 12
+    assert all(float(bet).is_integer() for bet in playing)
+    assert list(better.bets) == sorted(better.bets)
+    scores = ramp_metrics(np.array([better.bets, [2.] * len(better.bets)]), *count_table(stats))["score"]
+    assert scores[0] > scores[1]
+    safest = optimize_ramp(stats, objective="ror", units=100)
+    linear = np.clip(np.arange(len(safest.bets)) - 2., 1, 8)
+    risks = ramp_metrics(np.array([safest.bets, linear]), *count_table(stats), units=100)["risk_of_ruin"]
+    assert risks[0] <= risks[1] < 1
+
+
+def test_ramp_better() -> None:
+    """Test that the ramp better bets the amount of the range of the true count."""
+    better = RampBetter((-21, 0, 2, 21), (WONG_OUT_BET, 1, 4))
+    assert better.get_bet([2, 3, 4, 5] * 13, 2) == 4  # A true count of 52 is out of the edges.
+    assert better.get_bet([10] * 26, 2) == WONG_OUT_BET
+    assert better.get_bet([2] * 26, 2) == 4
+    assert better.get_bet([2] * 2 + [10] * 24, 2) == WONG_OUT_BET
+    assert better.get_bet([2], 1) == 1
@@ -0,0 +1,79 @@
+"""Test the checkpoints of a run."""
+import os
+from pathlib import Path
+import pickle
+import shutil
+from typing import Any
+
+import pytest
+
+from action_strategies import BasicStrategyMover
+from betting_strategies import SimpleBetter, Wong6
+from checkpoints import CHECKPOINT_FILE, Checkpoint, config_fingerprint
+import expected_value
+from expected_value import run
+
+H17_BASIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "h17", "6deck_h17_das_peek_basic.csv")
+
+
+def test_resume_and_extend(tmp_path: Path) -> None:
+    """Test that a stopped run resumes where it stopped, and that a finished run can be extended."""
+    mover = BasicStrategyMover(H17_BASIC)
+    rules: dict[str, Any] = {"cores": 1, "plot": False, "seed": 3, "dealer_stands_soft_17": False}
+    fresh = run(mover, SimpleBetter(), 640, **rules)
+    directory = str(tmp_path / "run")
+    # Chunks of 640 // 64 = 10 shoes. The time budget stops the run after the first chunk.
+    assert run(mover, SimpleBetter(), 640, checkpoint=directory, time_budget=0, **rules)["shoes"] == 10
+    assert run(mover, SimpleBetter(), 640, checkpoint=directory, **rules) == fresh
+    # A fresh run of 700 shoes has chunks of 10 shoes too, so extending the finished run plays the same chunks.
+    assert run(mover, SimpleBetter(), 700, checkpoint=directory, **rules) == run(mover, SimpleBetter(), 700, **rules)
+    # Extended to 1,280 shoes, the shoes beyond the first 700 are played in chunks of 1,280 // 64 = 20 shoes.
+    with open(os.path.join(directory, CHECKPOINT_FILE), "rb") as file:
+        assert pickle.load(file).chunks == 70
+    run(mover, SimpleBetter(), 1_280, checkpoint=directory, **rules)
+    with open(os.path.join(directory, CHECKPOINT_FILE), "rb") as file:
+        assert pickle.load(file).chunks == 70 + 29
+
+
+def test_checkpoint_mismatch(tmp_path: Path) -> None:
+    """Test that a checkpoint is only resumed by a run with the same configuration and seed."""
+    directory = str(tmp_path)
+    fingerprint = config_fingerprint("configuration")
+    Checkpoint.open(directory, fingerprint, 5, 10).save()
+    checkpoint = Checkpoint.open(directory, fingerprint, None, 20)
+    assert checkpoint.chunk_size == 20  # The next chunks are played with the chunk size of the resumed run.
+    assert checkpoint.chunks == 0
+    with pytest.raises(ValueError):
+        Checkpoint.open(directory, config_fingerprint("another configuration"), 5, 10)
+    with pytest.raises(ValueError):
+        Checkpoint.open(directory, fingerprint, 6, 10)
+    mover = BasicStrategyMover(H17_BASIC)
+    with pytest.raises(ValueError):
+        run(mover, Wong6(), 10, cores=1, plot=False, checkpoint=directory)
+
+
+def test_result_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a cached run is reused by the runs with the same configuration, which only play the missing shoes."""
+    mover = BasicStrategyMover(H17_BASIC)
+    rules: dict[str, Any] = {"cores": 1, "plot": False, "dealer_stands_soft_17": False, "cache": str(tmp_path / "cache")}
+    # Chunks of 100 shoes: 6 are cached, and the last 40 shoes are played again by the next runs.
+    small = run(mover, SimpleBetter(), 640, seed=3, **rules)
+    extended = run(mover, SimpleBetter(), 1_280, seed=3, **rules)
+    cold = run(mover, SimpleBetter(), 1_280, seed=3, **dict(rules, cache=str(tmp_path / "cold")))
+    assert extended == cold
+    assert run(mover, SimpleBetter(), 640, seed=3, **rules) == small  # Fewer shoes than cached are played again.
+    run(mover, SimpleBetter(), 640, **rules)
+    assert len(os.listdir(tmp_path / "cache")) == 1  # A run without a seed isn't cached.
+    cached = run(mover, SimpleBetter(), 1_200, seed=3, **rules)
+
+    def no_simulation(task: Any) -> None:
+        """Fail if a chunk is played."""
+        raise AssertionError("A cached chunk is played again.")
+
+    monkeypatch.setattr(expected_value, "_simulate_chunk", no_simulation)
+    # The same strategy read from another path finds the same results.
+    copy = str(tmp_path / "basic.csv")
+    shutil.copy(H17_BASIC, copy)
+    assert run(BasicStrategyMover(copy), SimpleBetter(), 1_200, seed=3, **rules) == cached
+    with pytest.raises(AssertionError):
+        run(mover, SimpleBetter(), 1_200, seed=3, deck_number=8, **rules)
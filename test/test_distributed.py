@@ -0,0 +1,79 @@
+"""Test playing the chunks of a run on workers connected over TCP."""
+from multiprocessing.connection import Client
+import os
+from pathlib import Path
+import threading
+
+import numpy as np
+import pytest
+
+from action_strategies import BasicStrategyMover
+from betting_strategies import Wong6
+from distributed import Coordinator, close_coordinator, get_authkey, get_coordinator, start_workers
+from expected_value import Configuration, play_chunks
+from hand_records import read_hand_records
+
+H17_BASIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "h17", "6deck_h17_das_peek_basic.csv")
+
+
+def square(number: int) -> int:
+    """Square a number, on a worker."""
+    return number * number
+
+
+def fail(number: int) -> int:
+    """Fail on a worker."""
+    raise ValueError(number)
+
+
+def test_distributed_chunks(tmp_path: Path) -> None:
+    """Test that the chunks played by workers on localhost give the same results and records as local chunks."""
+    coordinator = get_coordinator("127.0.0.1:0")
+    workers = start_workers(coordinator.address, 2)
+    configurations: list[Configuration] = [(BasicStrategyMover(H17_BASIC), Wong6(), {"dealer_stands_soft_17": False})]
+    try:
+        remote = list(play_chunks(1, configurations, 7, 3, seed=11, records_dir=str(tmp_path / "remote"),
+                                  progress=False, listen="127.0.0.1:0"))
+    finally:
+        close_coordinator()
+    for worker in workers:
+        worker.join(30)
+        assert not worker.is_alive()
+    local = list(play_chunks(1, configurations, 7, 3, seed=11, records_dir=str(tmp_path / "local"), progress=False))
+    assert [shoes for shoes, _ in remote] == [3, 3, 1]
+    for (remote_shoes, remote_results), (local_shoes, local_results) in zip(remote, local):
+        assert remote_results[0].hands == local_results[0].hands
+        assert remote_results[0].profit == local_results[0].profit
+    assert sorted(os.listdir(tmp_path / "remote")) == sorted(os.listdir(tmp_path / "local"))
+    for name in os.listdir(tmp_path / "local"):
+        assert np.array_equal(read_hand_records(str(tmp_path / "remote" / name)),
+                              read_hand_records(str(tmp_path / "local" / name)))
+
+
+def test_lost_worker() -> None:
+    """Test that the task of a lost worker is handed out again, and that the errors of the workers are raised."""
+    coordinator = Coordinator(("127.0.0.1", 0))
+    lost = Client(coordinator.address, authkey=get_authkey())
+    results: list[int] = []
+    player = threading.Thread(target=lambda: results.extend(coordinator.play(square, range(5))))
+    player.start()
+    assert lost.recv()[1] == 0
+    lost.close()
+    workers = start_workers(coordinator.address, 1)
+    player.join(30)
+    assert results == [0, 1, 4, 9, 16]
+    with pytest.raises(RuntimeError, match="ValueError"):
+        list(coordinator.play(fail, [1]))
+    coordinator.close()
+    workers[0].join(30)
+    assert not workers[0].is_alive()
+
+
+def test_authkey(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the default key is only used on the loopback interface."""
+    monkeypatch.delenv("BLACKJACK_AUTHKEY", raising=False)
+    assert get_authkey("localhost") == get_authkey("127.0.0.1")
+    with pytest.raises(ValueError, match="BLACKJACK_AUTHKEY"):
+        Coordinator(("0.0.0.0", 0))
+    monkeypatch.setenv("BLACKJACK_AUTHKEY", "secret")
+    assert get_authkey("0.0.0.0") == b"secret"
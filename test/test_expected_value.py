@@ -6,7 +6,9 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 import unittest
 
-from expected_value import run, play_hand, simulate_hand
+from expected_value import (run, play_hand, simulate_hand, ev_mt, close_pool, compare, RoundEngine, play_chunks,
+                            summarize_true_counts, Configuration)
+from utils import ShoeState
 import action_strategies, betting_strategies
 from action_strategies import SimpleMover, PerfectMover, BaseMover, BasicStrategyMover
 from betting_strategies import SimpleBetter, BaseBetter
@@ -422,6 +424,42 @@ class TestSimulateHand(unittest.TestCase):
         res = simulate_hand(action_class, cards=[8,8], dealer_up_card=10, dealer_down_card=7, shoe=[10,10,11,6,11,11,9,9,3,10], splits_remaining=4, deck_number=6)
         self.assertEqual(res, 3)
 
+
+class TestRoundEngine(unittest.TestCase):
+    """Test the hands played by `RoundEngine`."""
+
+    def setUp(self) -> None:
+        """Read the basic strategy."""
+        cfile = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 's17', '6deck_s17_das_peek_basic.csv')
+        self.action_class = BasicStrategyMover(cfile)
+
+    def test_resplits(self) -> None:
+        """Test that the second hand of a split waits until the first one and all the hands split from it are over."""
+        res = play_hand(self.action_class, hand_cards=[[8, 8]], dealer_up_card=6, dealer_down_card=10,
+                        shoe=[10, 10, 3, 10, 8], splits_remaining=3, deck_number=6)
+        self.assertEqual(res, [[8, 10], [8, 3, 10], [8, 3, 10], [8, 10]])
+        engine = RoundEngine(self.action_class, 6)
+        shoe = [10, 10, 3, 10, 8]
+        self.assertEqual(engine.play_hands([8, 8], 6, shoe, ShoeState.from_shoe(6, shoe, hidden=[10])), 3)
+        self.assertEqual(engine.bets[:3], [1, 2, 1])
+
+    def test_split_hands_busted(self) -> None:
+        """Test that the dealer doesn't draw when all the hands are busted."""
+        shoe = [2, 10, 5, 10, 6]
+        res = simulate_hand(self.action_class, cards=[8, 8], dealer_up_card=10, dealer_down_card=6, shoe=shoe,
+                            splits_remaining=3, deck_number=6)
+        self.assertEqual(res, -2)
+        self.assertEqual(shoe, [2])
+
+    def test_no_peek(self) -> None:
+        """Test that without the peek, the hand is played out and its bets are lost to the dealer's blackjack."""
+        shoe = [9, 2, 3]
+        res = simulate_hand(self.action_class, cards=[10, 2], dealer_up_card=11, dealer_down_card=10, shoe=shoe,
+                            splits_remaining=3, deck_number=6, dealer_peeks_for_blackjack=False)
+        self.assertEqual(res, -1)
+        self.assertEqual(shoe, [9])
+
+
 class TestDeviations(unittest.TestCase):
     def test_s17(self):
         # 1+
@@ -497,6 +535,87 @@ class TestDeviations(unittest.TestCase):
                         splits_remaining=3, deck_number=6)
         self.assertEqual(res, [[7,7,2,3]])
 
+
+class TestStoppingRules(unittest.TestCase):
+    """Test the rules that stop a run before all its shoes are played."""
+
+    def test_target_se_and_time_budget(self) -> None:
+        """Test that a run stops at the target standard error, or once the time budget is used."""
+        mover = BasicStrategyMover(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17',
+                                                '6deck_h17_das_peek_basic.csv'))
+        # Chunks of 640 // 64 = 10 shoes. Any standard error is reached after the minimum number of chunks.
+        summary = run(mover, SimpleBetter(), 640, cores=1, plot=False, seed=1, target_se=1000)
+        self.assertEqual(summary["shoes"], 20 * 10)
+        summary = run(mover, SimpleBetter(), 640, cores=1, plot=False, seed=1, time_budget=0)
+        self.assertEqual(summary["shoes"], 10)
+
+
+class TestEvMt(unittest.TestCase):
+    """Test the runs played in chunks by `ev_mt`."""
+
+    def test_chunks(self) -> None:
+        """Test that the results of a seeded run only depend on its chunks, not on the cores that play them."""
+        mover = BasicStrategyMover(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17',
+                                                '6deck_h17_das_peek_basic.csv'))
+        better = betting_strategies.Wong6()
+        # 7 shoes in chunks of 3: the last chunk has the remaining shoe.
+        single = ev_mt(1, mover, better, 7, chunk_size=3, seed=11)
+        self.assertGreater(single.hands, ev_mt(1, mover, better, 6, chunk_size=3, seed=11).hands)
+        # The pool is reused by the second call, and the results don't depend on the number of cores.
+        for _ in range(2):
+            pooled = ev_mt(2, mover, better, 7, chunk_size=3, seed=11)
+            self.assertEqual(pooled.hands, single.hands)
+            self.assertEqual(pooled.profit, single.profit)
+            self.assertEqual(pooled.max_drawdown, single.max_drawdown)
+        close_pool()
+        self.assertNotEqual(ev_mt(1, mover, better, 7, chunk_size=3, seed=12).profit, single.profit)
+
+
+class TestTrueCounts(unittest.TestCase):
+    """Test the results per true count."""
+
+    def test_true_count_bins(self) -> None:
+        """Test that the hands are counted in the bins of a run, and that the table of the bins adds up to the run."""
+        mover = BasicStrategyMover(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17',
+                                                '6deck_h17_das_peek_basic.csv'))
+        configurations: list[Configuration] = [(mover, betting_strategies.Wong6(), {"dealer_stands_soft_17": False})]
+        bins = [-30, 0, 1, 2.5, 30]
+        results = [results[0] for _, results in play_chunks(1, configurations, 20, 5, seed=3, progress=False,
+                                                            true_count_bins=bins)]
+        accumulator = results[0]
+        for result in results[1:]:
+            accumulator.merge(result)
+        table = summarize_true_counts(accumulator)
+        self.assertEqual(list(table.index), ["[-30, 0)", "0", "[1, 2.5)", "[2.5, 30)"])
+        self.assertEqual(table["hands"].sum(), accumulator.hands)
+        self.assertAlmostEqual(table["frequency"].sum(), 1)
+        self.assertAlmostEqual((table["ev_per_hand"].fillna(0) * table["hands"]).sum(), accumulator.profit)
+        # Wong6 only plays from a true count of 1, with bets of more than 1 unit from 2.
+        self.assertEqual(table["hands"].iloc[0], 0)
+        self.assertLess(abs(table["ev_per_unit"].iloc[3]), abs(table["ev_per_hand"].iloc[3]))
+        summary = run(mover, betting_strategies.Wong6(), 20, cores=1, plot=False, seed=3, dealer_stands_soft_17=False,
+                      true_count_bins=bins)
+        self.assertEqual(summary["shoes"], 20)
+
+
+class TestCompare(unittest.TestCase):
+    """Test the comparison of configurations on the same shoes."""
+
+    def test_common_random_numbers(self) -> None:
+        """Test that the configurations play the same shoes, and that their differences are paired."""
+        mover = BasicStrategyMover(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17',
+                                                '6deck_h17_das_peek_basic.csv'))
+        accumulators, differences = compare([(mover, betting_strategies.Wong6(), {}),
+                                             (mover, betting_strategies.Wong6(), {}),
+                                             (mover, SimpleBetter(), {"dealer_stands_soft_17": False})],
+                                            12, cores=1, seed=5, chunk_size=3)
+        # The same configuration on the same shoes gives exactly the same results.
+        self.assertEqual(accumulators[0].profit, accumulators[1].profit)
+        self.assertEqual(differences[1], (0, 0))
+        self.assertAlmostEqual(differences[2][0], (accumulators[2].profit - accumulators[0].profit) / 12)
+        self.assertGreater(differences[2][1], 0)
+
+
 class TestBettingStrategies(unittest.TestCase):
     def test_linear4(self):
         better = betting_strategies.Linear4()
@@ -0,0 +1,74 @@
+"""Test the hand records."""
+import os
+from pathlib import Path
+import random
+
+import numpy as np
+import pytest
+
+from action_strategies import BasicStrategyMover
+from batch_expected_value import batch_expected_value
+from betting_strategies import Linear2D, Wong6
+from expected_value import expected_value
+import hand_records
+from hand_records import HAND_RECORD_DTYPE, HandRecordWriter, concatenate_records, ev_by_true_count, read_hand_records
+
+STRATEGY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17', '6deck_h17_das_peek_basic.csv')
+
+
+def test_writer_and_concatenate(tmp_path: Path) -> None:
+    """Test that records written one at a time and in arrays of any size are read back in order."""
+    first, second, joined = (str(tmp_path / name) for name in ("first.npy", "second.npy", "joined.npy"))
+    with HandRecordWriter(first, buffer_size=8) as writer:
+        for hand in range(20):
+            writer.add(hand / 10, hand, 300 - hand, 1, -1, hand_records.DOUBLE)
+    with HandRecordWriter(second, buffer_size=8) as writer:
+        for size in (3, 30, 5):
+            values = np.arange(size)
+            writer.add_arrays(values / 10, values, 300 - values, np.ones(size), np.full(size, 1.5),
+                              np.full(size, hand_records.BLACKJACK))
+    concatenate_records([first, second], joined)
+
+    records = read_hand_records(joined)
+    assert isinstance(records, np.memmap)
+    assert records.dtype == HAND_RECORD_DTYPE
+    assert len(records) == 58
+    assert list(records["running_count"][:23]) == list(range(20)) + [0, 1, 2]
+    assert (records["flags"][:20] == hand_records.DOUBLE).all()
+    assert (records["result"][20:] == 1.5).all()
+    assert ev_by_true_count(records, (0, 1, 10), chunk_size=7)[0].count == 10 + 3 + 10 + 5
+
+
+def test_expected_value_records(tmp_path: Path) -> None:
+    """Test that the records of a simulation match its results and flags."""
+    mover = BasicStrategyMover(STRATEGY)
+    random.seed(6)
+    bets, rewards, true_counts = expected_value(mover, Linear2D(), 30, dealer_stands_soft_17=False, progress=False)
+    random.seed(6)
+    path = str(tmp_path / "records.npy")
+    with HandRecordWriter(path, buffer_size=100) as writer:
+        expected_value(mover, Linear2D(), 30, dealer_stands_soft_17=False, progress=False, records=writer)
+    records = read_hand_records(path)
+    assert len(records) == len(rewards)
+    assert records["bet"] == pytest.approx(bets)
+    assert records["result"] * records["bet"] == pytest.approx(rewards, abs=1e-6)
+    assert records["true_count"] == pytest.approx(true_counts, abs=1e-5)
+    assert records["cards_remaining"][0] == 6 * 52
+    flags = records["flags"]
+    assert (records["result"][(flags & hand_records.BLACKJACK) > 0] >= 0).all()
+    assert (records["result"][flags == hand_records.SURRENDER] == -.5).all()
+    assert ((flags & hand_records.SPLIT) > 0).any() and ((flags & hand_records.DOUBLE) > 0).any()
+
+
+def test_batch_records(tmp_path: Path) -> None:
+    """Test that the batch simulator writes the same kind of records."""
+    path = str(tmp_path / "records.npy")
+    with HandRecordWriter(path) as writer:
+        bets, rewards, _ = batch_expected_value(BasicStrategyMover(STRATEGY), Wong6(), 200,
+                                                dealer_stands_soft_17=False, seed=2, records=writer)
+    records = read_hand_records(path)
+    assert len(records) == len(rewards)
+    assert records["result"] * records["bet"] == pytest.approx(rewards, abs=1e-6)
+    assert (records["result"][records["flags"] == hand_records.SURRENDER] == -.5).all()
+    doubled = records["result"][records["flags"] == hand_records.DOUBLE]
+    assert len(doubled) and set(np.abs(doubled)) <= {0, 2}
@@ -0,0 +1,31 @@
+"""Test the integer hand states."""
+import itertools
+
+from hand_state import EMPTY, MAX_VALUE, add_card, card_number, from_cards, from_value, hand_value, is_soft, pair_rank
+
+
+def test_hand_states() -> None:
+    """Test the states of all the hands of up to 5 cards against the value calculated from their cards."""
+    for number in range(6):
+        for cards in itertools.product(range(2, 12), repeat=number):
+            value = sum(cards)
+            aces = cards.count(11)
+            while value > 21 and aces:
+                value -= 10
+                aces -= 1
+            state = from_cards(cards)
+            assert hand_value(state) == min(value, MAX_VALUE)
+            assert is_soft(state) == (aces > 0)
+            assert card_number(state) == number
+            assert pair_rank(state) == (cards[0] if number == 2 and cards[0] == cards[1] else 0)
+    assert from_cards([]) == EMPTY
+
+
+def test_from_value() -> None:
+    """Test that a hand built from its value draws like the same hand built from its cards."""
+    for cards in [(10, 6), (11, 5), (11, 11), (11,), (7, 4), (2, 3, 11)]:
+        state = from_cards(cards)
+        for card in range(2, 12):
+            expected = add_card(state, card)
+            actual = add_card(from_value(hand_value(state), is_soft(state)), card)
+            assert (hand_value(actual), is_soft(actual)) == (hand_value(expected), is_soft(expected))
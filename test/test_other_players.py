@@ -0,0 +1,57 @@
+"""Test the other players at the table."""
+import random
+
+import numpy as np
+import pytest
+
+import batch_expected_value
+from action_strategies import BasicStrategyMover
+from betting_strategies import SimpleBetter
+from expected_value import expected_value
+from other_players import STRATEGY_FILES, basic_strategy, play_other_player
+from utils import DECK, ShoeState
+
+
+def test_other_player_matches_batch() -> None:
+    """Test that another player draws the same cards as the same hand played by the batch simulator."""
+    strategy = basic_strategy(False)
+    rng = random.Random(1)
+    hands = [[rng.choice(DECK), rng.choice(DECK), rng.choice(DECK)] for _ in range(3000)]
+    hands += [[card, card, up] for card in range(2, 12) for up in range(2, 12)]
+    for das, surrender_allowed in ((True, True), (False, False)):
+        shoes = [[rng.choice(DECK) for _ in range(40)] for _ in hands]
+        batch = batch_expected_value._Batch(len(hands), 6, np.random.default_rng(0))
+        for row, shoe in enumerate(shoes):
+            batch.shoes[row, :len(shoe)] = shoe
+        first_cards, second_cards, up_cards = (np.array(cards) for cards in zip(*hands))
+        finished = first_cards + second_cards == 21
+        totals, _, hand_numbers, _, surrenders = batch_expected_value._play_hands(
+            batch, np.arange(len(hands)), strategy, 6, first_cards, second_cards, up_cards, finished, das,
+            surrender_allowed)
+        slots = np.arange(batch_expected_value.MAX_HANDS) < hand_numbers[:, None]
+        standing = ~finished & ~surrenders & (slots & (totals <= 21)).any(axis=1)
+        for row, ((first_card, second_card, up_card), shoe) in enumerate(zip(hands, shoes)):
+            reversed_shoe = shoe[::-1]
+            shoe_state = ShoeState(6)
+            assert play_other_player(strategy._actions, first_card, second_card, up_card, reversed_shoe, shoe_state,
+                                     das, surrender_allowed) == standing[row]
+            assert len(shoe) - len(reversed_shoe) == batch.positions[row] == len(shoe_state)
+
+
+def test_full_table() -> None:
+    """Test that other players use up the shoe faster in both simulators, and that their cards feed the count."""
+    mover = BasicStrategyMover(STRATEGY_FILES[False])
+    random.seed(2)
+    alone = expected_value(mover, SimpleBetter(), 100, dealer_stands_soft_17=False, progress=False)
+    random.seed(2)
+    full = expected_value(mover, SimpleBetter(), 100, dealer_stands_soft_17=False, num_of_other_players=6,
+                          progress=False)
+    assert len(full[0]) < len(alone[0]) / 3
+    assert len({round(true_count, 6) for true_count in full[2]}) > 100
+    batch_alone = batch_expected_value.batch_expected_value(mover, SimpleBetter(), 100, dealer_stands_soft_17=False,
+                                                            seed=2)[0]
+    batch_full = batch_expected_value.batch_expected_value(mover, SimpleBetter(), 100, dealer_stands_soft_17=False,
+                                                           num_of_other_players=6, seed=2)[0]
+    assert len(batch_full) / len(batch_alone) == pytest.approx(len(full[0]) / len(alone[0]), rel=.15)
+    with pytest.raises(NotImplementedError):
+        expected_value(mover, SimpleBetter(), 1, num_of_other_players=7, progress=False)
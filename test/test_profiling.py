@@ -0,0 +1,33 @@
+"""Test the profiling of the phases of a simulation."""
+import os
+import time
+from typing import Any
+
+from action_strategies import BasicStrategyDeviationsMover
+from betting_strategies import Wong6
+from expected_value import expected_value
+from profiling import PHASES, PhaseProfile
+
+H17_BASIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "h17", "6deck_h17_das_peek_basic.csv")
+
+
+def test_profile_simulation() -> None:
+    """Test that every phase is timed, and that profiling doesn't change the results."""
+    mover = BasicStrategyDeviationsMover(H17_BASIC)
+    rules: dict[str, Any] = {"dealer_stands_soft_17": False, "num_of_other_players": 2, "progress": False,
+                             "seed": 2, "kernel": False}
+    profile = PhaseProfile()
+    start = time.perf_counter()
+    profiled = expected_value(mover, Wong6(), 20, profile=profile, **rules)
+    elapsed = time.perf_counter() - start
+    profile.stop()
+    assert profiled == expected_value(mover, Wong6(), 20, **rules)
+    assert profile.calls["shuffle"] == 20
+    assert all(profile.calls[phase] > 0 for phase in PHASES if phase != "bookkeeping")
+    assert sum(profile.seconds.values()) >= elapsed  # The phases cover all the time.
+
+    merged = PhaseProfile()
+    merged.merge(profile)
+    merged.merge(profile)
+    assert merged.calls["mover"] == 2 * profile.calls["mover"]
+    assert "mover" in merged.table()
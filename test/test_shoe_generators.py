@@ -1,8 +1,24 @@
 """Test the shoe generators."""
-from shoe_generators import hilo_generator
-from utils import get_hilo_true_count
+import numpy as np
+
+from shoe_generators import ShuffledShoes, hilo_generator
+from utils import DECK, get_hilo_true_count
 
 
 def test_hilo_true_count() -> None:
     """Test the Hi-Lo true count generator."""
     assert 3 <= get_hilo_true_count(hilo_generator(3, 6, .25, [2, 5, 7])) <= 3.3
+
+
+def test_shuffled_shoes() -> None:
+    """Test that every shoe is a full shuffled shoe, and that the shoes only depend on the seed."""
+    shoes = ShuffledShoes(2, np.random.default_rng(4), shoes_per_refill=3)
+    dealt = []
+    for _ in range(7):  # Refills the buffer twice.
+        shoe = shoes.next_shoe()
+        assert sorted(shoe) == sorted(DECK * 2)
+        dealt.append(bytes(shoe))
+        shoe.pop()
+    assert len(set(dealt)) == 7
+    again = ShuffledShoes(2, np.random.default_rng(4), shoes_per_refill=3)
+    assert [bytes(again.next_shoe()) for _ in range(7)] == dealt
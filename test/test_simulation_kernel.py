@@ -0,0 +1,56 @@
+"""Test the compiled simulation kernel against the Python round engine."""
+import os
+from typing import Any, Collection
+
+import pytest
+
+from action_strategies import BaseMover, BasicStrategyDeviationsMover, BasicStrategyMover, CardCountMover, SimpleMover
+from betting_strategies import BaseBetter, MultiSpotBetter, SimpleBetter, Wong6
+from expected_value import expected_value
+from simulation_kernel import supports
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+H17_BASIC = os.path.join(DATA, "h17", "6deck_h17_das_peek_basic.csv")
+
+
+class CardsBetter(BaseBetter):
+    """A better whose bet depends on the cards seen, not only on their count."""
+
+    @staticmethod
+    def get_bet(cards_seen: Collection[int], deck_number: int) -> int:
+        """Bet more after an ace."""
+        return 2 if 11 in cards_seen else 1
+
+
+def play_both(mover: BaseMover, better: BaseBetter, **rules: Any) -> None:
+    """Play the same shoes with the kernel and with the round engine, and check that every hand is the same."""
+    kernel = expected_value(mover, better, 30, progress=False, seed=3, kernel=True, **rules)
+    engine = expected_value(mover, better, 30, progress=False, seed=3, kernel=False, **rules)
+    assert len(engine[0]) > 100
+    assert kernel == engine
+
+
+def test_basic_strategy() -> None:
+    """Test basic strategy with other players, with and without the peek and surrender."""
+    mover = BasicStrategyMover(H17_BASIC)
+    play_both(mover, SimpleBetter(), dealer_stands_soft_17=False, num_of_other_players=3)
+    play_both(mover, SimpleBetter(), dealer_stands_soft_17=False, dealer_peeks_for_blackjack=False, das=False,
+              surrender_allowed=False)
+
+
+def test_counting() -> None:
+    """Test the movers that use the true count, wonging and playing several spots."""
+    play_both(BasicStrategyDeviationsMover(H17_BASIC), Wong6(), dealer_stands_soft_17=False, num_of_other_players=2)
+    play_both(BasicStrategyMover(H17_BASIC), Wong6(), dealer_stands_soft_17=False, phantom_seat=True)
+    mover = CardCountMover({(-1000, 1000): os.path.join(DATA, "s17", "6deck_s17_das_peek_tc_minus_0.csv")})
+    play_both(mover, MultiSpotBetter(Wong6(), (0, 2)), num_of_other_players=1)
+
+
+def test_unsupported() -> None:
+    """Test that the kernel isn't used for the movers it can't play."""
+    assert supports(BasicStrategyMover(H17_BASIC), Wong6())
+    assert not supports(SimpleMover(), Wong6())
+    assert supports(BasicStrategyMover(H17_BASIC), MultiSpotBetter(Wong6()))
+    assert not supports(BasicStrategyMover(H17_BASIC), MultiSpotBetter(CardsBetter()))
+    with pytest.raises(TypeError):
+        expected_value(SimpleMover(), SimpleBetter(), 1, progress=False, kernel=True)
@@ -0,0 +1,52 @@
+"""Test the progress and throughput reports."""
+import io
+import json
+from pathlib import Path
+
+from telemetry import ProgressMonitor, format_duration
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at 0."""
+        self.now = 0.
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+def test_progress_monitor(tmp_path: Path) -> None:
+    """Test that the reports of all the workers are merged into one line and into snapshots."""
+    clock = FakeClock()
+    output = io.StringIO()
+    metrics = tmp_path / "metrics.jsonl"
+    monitor = ProgressMonitor(100, str(metrics), output=output, snapshot_interval=5, clock=clock)
+    clock.now = 2
+    monitor.add(10, 1_000, 2., worker=1)
+    monitor.add(10, 1_000, 2., worker=2)
+    clock.now = 10
+    monitor.add(20, 2_000, 4., worker=1)
+    snapshot = monitor.snapshot()
+    assert snapshot["shoes"] == 40 and snapshot["hands"] == 4_000
+    assert snapshot["hands_per_second"] == 400
+    assert snapshot["hands_per_worker_second"] == 500
+    assert snapshot["eta_seconds"] == 15
+    assert snapshot["workers"]["1"] == {"shoes": 30, "hands": 3_000, "hands_per_second": 500}
+    monitor.close()
+
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 3  # At most one line per second, and the last one.
+    assert lines[-1].startswith("Shoes: 40/100 (40.0%) | hands: 4.0K | 400 hands/s (500/s on 2 workers)")
+    assert lines[-1].endswith("ETA: 15s")
+    snapshots = [json.loads(line) for line in metrics.read_text().splitlines()]
+    assert [snapshot["shoes"] for snapshot in snapshots] == [40, 40]  # After 5 seconds, and at the end.
+
+
+def test_format_duration() -> None:
+    """Test the durations."""
+    assert format_duration(42) == "42s"
+    assert format_duration(3_725) == "1h 02m 05s"
+    assert format_duration(float("nan")) == "?"
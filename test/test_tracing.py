@@ -0,0 +1,39 @@
+"""Test the tracing of simulations."""
+import os
+from pathlib import Path
+import random
+
+import numpy as np
+
+from action_strategies import BasicStrategyMover
+from betting_strategies import Linear2D
+from expected_value import expected_value
+from tracing import MAX_DRAWN, Tracer, format_round, read_trace
+
+STRATEGY = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'h17', '6deck_h17_das_peek_basic.csv')
+
+
+def test_trace(tmp_path: Path) -> None:
+    """Test that tracing records every round and doesn't change the results."""
+    mover = BasicStrategyMover(STRATEGY)
+    random.seed(5)
+    bets, rewards, true_counts = expected_value(mover, Linear2D(), 20, dealer_stands_soft_17=False, progress=False)
+    random.seed(5)
+    path = str(tmp_path / "trace.npy")
+    with Tracer(path, buffer_size=64) as tracer:
+        traced = expected_value(mover, Linear2D(), 20, dealer_stands_soft_17=False, progress=False, tracer=tracer)
+    assert traced == (bets, rewards, true_counts)
+
+    trace = read_trace(path)
+    assert isinstance(trace, np.memmap)
+    assert len(trace) == len(rewards)
+    assert (trace["reward"] == np.array(rewards, dtype=np.float32)).all()
+    assert (trace["true_count"] == np.array(true_counts, dtype=np.float32)).all()
+    assert trace["shoe"][0] == 0 and trace["shoe"][-1] == 19
+    assert (trace["round"][trace["shoe"] == 1] == np.arange(np.count_nonzero(trace["shoe"] == 1))).all()
+    assert all(len(decisions) >= 1 for decisions in trace["decisions"])
+    # Every card of the round is traced, so the cards of a shoe add up to the cards dealt from it.
+    first_shoe = trace[trace["shoe"] == 0]
+    dealt = 4 * len(first_shoe) + int(np.sum(first_shoe["drawn_number"]))
+    assert 6 * 52 * .75 <= dealt < 6 * 52 * .75 + 4 + MAX_DRAWN
+    assert format_round(trace[0]).startswith("shoe 0 round 0: running count 0, true count 0.00")
@@ -1,5 +1,8 @@
 """Test the utilities."""
-from utils import short_to_long_action, long_to_short_action, readable_number, list_range_str
+import random
+
+from utils import (short_to_long_action, long_to_short_action, readable_number, list_range_str, get_cards_seen,
+                   get_hilo_running_count, ShoeState, DECK)
 
 
 def test_utils() -> None:
@@ -22,3 +25,25 @@ def test_utils() -> None:
     assert readable_number(2_580_000) == "2.6M"
 
     assert list_range_str(1, 3) == ["1", "2"]
+
+
+def test_shoe_state() -> None:
+    """Test that the shoe state matches rescanning the shoe."""
+    shoe = DECK * 2
+    random.seed(0)
+    random.shuffle(shoe)
+    shoe_state = ShoeState(2)
+    for _ in range(40):
+        shoe_state.deal(shoe.pop())
+    cards_seen = get_cards_seen(2, shoe)
+    assert len(shoe_state) == len(cards_seen)
+    assert list(shoe_state) == cards_seen
+    assert get_hilo_running_count(shoe_state) == get_hilo_running_count(cards_seen)
+    assert shoe_state.true_count() == get_hilo_running_count(cards_seen) / (len(shoe) / 52)
+
+    down_card = shoe.pop()
+    shoe_state.deal(down_card, hidden=True)
+    assert len(shoe_state) == len(cards_seen)
+    assert shoe_state.cards_remaining == len(shoe)
+    rebuilt = ShoeState.from_shoe(2, shoe, hidden=[down_card])
+    assert rebuilt.counts == shoe_state.counts and rebuilt.running_count == shoe_state.running_count
@@ -0,0 +1,238 @@
+"""Trace every round of a simulation to a compact binary file. Costs nothing when tracing is off."""
+from __future__ import annotations
+
+from typing import Collection, Iterator, MutableSequence
+import argparse
+import os
+
+import numpy as np
+
+from action_strategies import BaseMover
+from hand_records import RecordWriter
+
+"""How many cards drawn after the initial deal are kept per round. Any more are counted but not stored."""
+MAX_DRAWN = 24
+
+"""How many decisions of the mover are kept per round. Any more are dropped."""
+MAX_DECISIONS = 16
+
+"""One record per round played."""
+TRACE_DTYPE = np.dtype([
+    ("shoe", "<u4"),  # The index of the shoe in the run.
+    ("round", "<u4"),  # The index of the round in the shoe. The rounds sat out aren't recorded, but are counted.
+    ("running_count", "<i2"),  # At the start of the round, before the bet.
+    ("true_count", "<f4"),
+    ("bet", "<f4"),  # The bet of every spot.
+    ("spots", "u1"),
+    ("reward", "<f4"),  # The profit/loss of the round, in money (the unit result times the bet), for all the spots.
+    ("player_cards", "u1", (2,)),  # The cards of the first spot.
+    ("dealer_up_card", "u1"),
+    ("dealer_down_card", "u1"),
+    ("insured", "?"),
+    ("decisions", f"S{MAX_DECISIONS}"),  # The actions the mover chose, in order and for all the spots (e.g. b"phs").
+    ("drawn_number", "u1"),  # How many cards were drawn after the initial deal.
+    ("drawn", "u1", (MAX_DRAWN,)),  # The cards drawn after the initial deal, in order, padded with 0.
+])
+
+
+class TracingMover(BaseMover):
+    """Wrap a mover and remember the decisions it makes during a round."""
+
+    def __init__(self, mover: BaseMover) -> None:
+        """
+        Wrap a mover.
+
+        :param mover: The mover that chooses the actions.
+        """
+        self.mover = mover
+        self.decisions: list[str] = []
+        self.insured = False
+        self.spot_starts: list[int] = []  # Where the decisions of every spot start in `decisions`.
+        self.spots_insured: list[bool] = []
+
+    def new_round(self) -> None:
+        """Forget the decisions of the previous round."""
+        self.decisions.clear()
+        self.insured = False
+        self.spot_starts.clear()
+        self.spots_insured.clear()
+
+    def new_spot(self) -> None:
+        """Start the decisions of the next spot of the round."""
+        self.spot_starts.append(len(self.decisions))
+        self.spots_insured.append(False)
+
+    def spot_decisions(self, spot: int) -> tuple[list[str], bool]:
+        """
+        Get the decisions made for one spot of the round.
+
+        :param spot: The index of the spot.
+        :return: The actions chosen for the spot, and whether insurance was taken.
+        """
+        if not self.spot_starts:  # The round was played without `new_spot`, as a single spot.
+            return self.decisions, self.insured
+        end = self.spot_starts[spot + 1] if spot + 1 < len(self.spot_starts) else len(self.decisions)
+        return self.decisions[self.spot_starts[spot]:end], self.spots_insured[spot]
+
+    # Unlike the static `BaseMover.get_move`, it reads the mover it wraps, like the movers of `action_strategies`.
+    def get_move(self, hand_value: int, hand_has_ace: bool, dealer_up_card: int,  # type: ignore[override]
+                 can_double: bool, can_split: bool, can_surrender: bool, can_insure: bool, hand_cards: list[int],
+                 cards_seen: Collection[int], deck_number: int, dealer_peeks_for_blackjack: bool, das: bool,
+                 dealer_stands_soft_17: bool) -> tuple[str, bool]:
+        """
+        Get the move of the wrapped mover and record it.
+
+        :param hand_value: The value of the hand (e.g. 18).
+        :param hand_has_ace: Whether the hand has an ace that is counted as 11.
+        :param dealer_up_card: The dealer's up card.
+        :param can_double: Whether we can double.
+        :param can_split: Whether we can split.
+        :param can_surrender: Whether we can surrender.
+        :param can_insure: Whether we can take insurance.
+        :param hand_cards: The cards in our hand (e.g. 8, 7, 3).
+        :param cards_seen: The cards we have already seen from the shoe.
+        :param deck_number: The number of decks in the starting shoe.
+        :param dealer_peeks_for_blackjack: Whether the dealer peeks for blackjack.
+        :param das: Whether we can double after splitting.
+        :param dealer_stands_soft_17: Whether the dealer stands on soft 17.
+        :return: The action to do, and whether to take insurance.
+        """
+        action, insure = self.mover.get_move(hand_value, hand_has_ace, dealer_up_card, can_double, can_split,
+                                             can_surrender, can_insure, hand_cards, cards_seen, deck_number,
+                                             dealer_peeks_for_blackjack, das, dealer_stands_soft_17)
+        self.decisions.append(action)
+        if insure and can_insure:
+            self.insured = True
+            if self.spots_insured:
+                self.spots_insured[-1] = True
+        return action, insure
+
+
+class Tracer(RecordWriter):
+    """
+    Write a record (`TRACE_DTYPE`) for every round to an `.npy` file, buffering the records and writing them in chunks.
+
+    Pass it to `expected_value.expected_value`. The simulator only checks whether a tracer is given, so a run without
+    one pays nothing. The file can be read with `read_trace`.
+    """
+
+    def __init__(self, path: str, first_shoe: int = 0, buffer_size: int = 4096) -> None:
+        """
+        Create the trace file.
+
+        :param path: The path of the file.
+        :param first_shoe: The index of the first shoe traced, when the run is split in chunks.
+        :param buffer_size: How many records are kept in memory before they are written.
+        """
+        super().__init__(path, TRACE_DTYPE, buffer_size)
+        self.shoe = first_shoe - 1
+        self.round = 0
+        self._top_of_shoe: list[int] = []
+        self._shoe_length = 0
+
+    def new_shoe(self) -> None:
+        """Start the rounds of the next shoe."""
+        self.shoe += 1
+        self.round = 0
+
+    def sit_out(self) -> None:
+        """Skip a round sat out. It isn't recorded, but the next round gets the next index."""
+        self.round += 1
+
+    def start_round(self, shoe: MutableSequence[int]) -> None:
+        """
+        Remember the top of the shoe after the initial deal, to know which cards are drawn in the round.
+
+        :param shoe: The shoe. Cards are drawn from its end.
+        """
+        self._top_of_shoe = list(shoe[-MAX_DRAWN:])
+        self._shoe_length = len(shoe)
+
+    def end_round(self, shoe: MutableSequence[int], running_count: int, true_count: float, bet: float, reward: float,
+                  player_cards: list[int], dealer_up_card: int, dealer_down_card: int, mover: TracingMover,
+                  spots: int = 1) -> None:
+        """
+        Record the round.
+
+        :param shoe: The shoe at the end of the round.
+        :param running_count: The running count at the start of the round.
+        :param true_count: The true count at the start of the round.
+        :param bet: The initial bet of every spot.
+        :param reward: The profit/loss of the round, for all the spots.
+        :param player_cards: The first two cards of the player's first spot.
+        :param dealer_up_card: The dealer's up card.
+        :param dealer_down_card: The dealer's down card.
+        :param mover: The mover that played the round.
+        :param spots: The number of spots played.
+        """
+        drawn_number = self._shoe_length - len(shoe)
+        drawn = self._top_of_shoe[max(0, len(self._top_of_shoe) - drawn_number):][::-1]
+        record = self.record()
+        record["shoe"] = self.shoe
+        record["round"] = self.round
+        record["running_count"] = running_count
+        record["true_count"] = true_count
+        record["bet"] = bet
+        record["spots"] = spots
+        record["reward"] = reward
+        record["player_cards"] = player_cards
+        record["dealer_up_card"] = dealer_up_card
+        record["dealer_down_card"] = dealer_down_card
+        record["insured"] = mover.insured
+        record["decisions"] = "".join(mover.decisions[:MAX_DECISIONS]).encode()
+        record["drawn_number"] = min(drawn_number, 255)
+        record["drawn"] = drawn + [0] * (MAX_DRAWN - len(drawn))
+        self.round += 1
+
+
+def read_trace(path: str) -> np.ndarray:
+    """
+    Read a trace without loading it in memory.
+
+    :param path: A trace file, or a directory of trace files (e.g. from `expected_value.run`), read in name order.
+    :return: The records. For a file, a memory-mapped array.
+    """
+    if os.path.isdir(path):
+        return np.concatenate([np.load(os.path.join(path, name), mmap_mode="r")
+                               for name in sorted(os.listdir(path)) if name.endswith(".npy")])
+    trace: np.ndarray = np.load(path, mmap_mode="r")
+    return trace
+
+
+def format_round(record: np.void) -> str:
+    """
+    Describe a traced round in words.
+
+    :param record: The record of the round.
+    :return: The description.
+    """
+    drawn = record["drawn"][:min(int(record["drawn_number"]), MAX_DRAWN)]
+    spots = f" on {record['spots']} spots" if record["spots"] > 1 else ""
+    return (f"shoe {record['shoe']} round {record['round']}: running count {record['running_count']}, "
+            f"true count {record['true_count']:.2f}, bet {record['bet']:g}{spots}. "
+            f"Player {record['player_cards'][0]} {record['player_cards'][1]}, "
+            f"dealer {record['dealer_up_card']} ({record['dealer_down_card']}). "
+            f"Decisions: {record['decisions'].decode() or '-'}{', insured' if record['insured'] else ''}. "
+            f"Drawn: {' '.join(str(card) for card in drawn) or '-'}. Reward: {record['reward']:g}.")
+
+
+def iter_rounds(trace: np.ndarray, shoe: int | None = None) -> Iterator[str]:
+    """
+    Describe the rounds of a trace in words.
+
+    :param trace: The records.
+    :param shoe: If given, only the rounds of this shoe are described.
+    :return: An iterator over the descriptions.
+    """
+    if shoe is not None:
+        trace = trace[trace["shoe"] == shoe]
+    return map(format_round, trace)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='Trace reader', description='Print the rounds of a trace of a simulation.')
+    parser.add_argument("path", help='The trace file, or the directory of trace files.')
+    parser.add_argument("--shoe", default=None, type=int, help='Only print the rounds of this shoe. (default: all)')
+    args = parser.parse_args()
+    for line in iter_rounds(read_trace(args.path), args.shoe):
+        print(line)
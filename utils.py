@@ -1,6 +1,8 @@
 """Utilities for the rest of the program."""
+from __future__ import annotations
 
 from collections import Counter
+from typing import Iterable, Iterator
 import inspect
 
 """The card that a suit contains."""
@@ -9,6 +11,9 @@ SUIT: list[int] = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11]
 """The cards that a deck contains."""
 DECK: list[int] = SUIT * 4
 
+"""The Hi-Lo value of each card, indexed by the card (an ace is 11)."""
+HILO_VALUES: tuple[int, ...] = (0, 0, 1, 1, 1, 1, 1, 0, 0, 0, -1, -1)
+
 
 def list_range_str(start: int, end: int, step: int = 1) -> list[str]:
     """
@@ -45,7 +50,7 @@ def long_to_short_action(action: str) -> str:
     return long_to_short[action]
 
 
-def get_cards_seen(deck_number: int, shoe: list[int]) -> list[int]:
+def get_cards_seen(deck_number: int, shoe: Iterable[int]) -> list[int]:
     """
     Get the cards that we have already seen from the umber of decks and the shoe.
 
@@ -64,13 +69,131 @@ def get_cards_seen(deck_number: int, shoe: list[int]) -> list[int]:
     return cards_seen
 
 
-def get_hilo_running_count(cards_seen: list[int]) -> int:
+class ShoeState:
+    """
+    Keep track of the cards dealt from a shoe, updated in O(1) every time a card is dealt.
+
+    It can be passed to movers and betters in place of the list of the cards seen. `len` returns the number of cards
+    seen, iterating over it gives the cards seen, and `get_hilo_running_count` reads the running count directly.
+    """
+
+    def __init__(self, deck_number: int) -> None:
+        """
+        Start tracking a full shoe.
+
+        :param deck_number: How many decks the shoe started with.
+        """
+        self.deck_number = deck_number
+        self.counts = [0] * 12  # How many cards of each value we have seen, indexed by the card.
+        self.running_count = 0
+        self.cards_seen_number = 0
+        self.cards_remaining = deck_number * 52
+
+    @classmethod
+    def from_shoe(cls, deck_number: int, shoe: Iterable[int], hidden: Iterable[int] = ()) -> ShoeState:
+        """
+        Create the state of a shoe that has already been partially dealt.
+
+        :param deck_number: How many decks the shoe started with.
+        :param shoe: The cards that are still in the shoe.
+        :param hidden: Cards that are no longer in the shoe but that we haven't seen (e.g. the dealer's down card).
+        :return: The state of the shoe.
+        """
+        shoe_state = cls(deck_number)
+        remaining = [4 * deck_number] * 12
+        remaining[10] *= 4
+        for card in shoe:
+            remaining[card] -= 1
+        for card in hidden:
+            remaining[card] -= 1
+            shoe_state.cards_remaining -= 1
+        for card in range(2, 12):
+            shoe_state.cards_remaining -= remaining[card]
+            shoe_state.counts[card] = remaining[card]
+            shoe_state.cards_seen_number += remaining[card]
+            shoe_state.running_count += HILO_VALUES[card] * remaining[card]
+        return shoe_state
+
+    def deal(self, card: int, hidden: bool = False) -> None:
+        """
+        Remove a card from the shoe.
+
+        :param card: The card dealt.
+        :param hidden: Whether the card was dealt face down (e.g. the dealer's down card). Hidden cards must be revealed
+            with `see` once they are turned over.
+        """
+        self.cards_remaining -= 1
+        if not hidden:
+            self.see(card)
+
+    def see(self, card: int) -> None:
+        """
+        Add a card to the cards we have seen.
+
+        :param card: The card we saw.
+        """
+        self.counts[card] += 1
+        self.cards_seen_number += 1
+        self.running_count += HILO_VALUES[card]
+
+    def true_count(self) -> float:
+        """
+        Get the Hi-Lo true count of the cards remaining in the shoe.
+
+        :return: The true count.
+        """
+        return self.running_count / (self.cards_remaining / 52)
+
+    def copy(self) -> ShoeState:
+        """
+        Copy the state of the shoe.
+
+        :return: An independent copy.
+        """
+        shoe_state = ShoeState(self.deck_number)
+        shoe_state.counts = self.counts.copy()
+        shoe_state.running_count = self.running_count
+        shoe_state.cards_seen_number = self.cards_seen_number
+        shoe_state.cards_remaining = self.cards_remaining
+        return shoe_state
+
+    def __len__(self) -> int:
+        """
+        Get the number of cards we have seen.
+
+        :return: The number of cards seen.
+        """
+        return self.cards_seen_number
+
+    def __contains__(self, card: object) -> bool:
+        """
+        Get whether we have seen a card.
+
+        :param card: The card to look for.
+        :return: Whether the card has been seen at least once.
+        """
+        return isinstance(card, int) and 2 <= card <= 11 and self.counts[card] > 0
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        Iterate over the cards we have seen, in ascending order.
+
+        :return: An iterator over the cards seen.
+        """
+        for card in range(2, 12):
+            for _ in range(self.counts[card]):
+                yield card
+
+
+def get_hilo_running_count(cards_seen: Iterable[int]) -> int:
     """
     Get the running count from the cards we have seen.
 
-    :param cards_seen: The cards we have seen.
+    :param cards_seen: The cards we have seen. If it is a `ShoeState`, its running count is returned directly.
     :return: The running count of the shoe.
     """
+    if isinstance(cards_seen, ShoeState):
+        return cards_seen.running_count
     hilo = 0
     for card in cards_seen:
         hilo -= card > 9